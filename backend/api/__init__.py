@@ -1,3 +1,6 @@
 from .modelrouter import create_model_router, ModelCollection
 from .filerouter import FileRouter
 from .authrouter import AuthRouter
+from .poolrouter import PoolRouter
+from .page import Page
+from .batch import BatchRequest, BatchResponse
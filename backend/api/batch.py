@@ -0,0 +1,21 @@
+from typing import Generic, TypeVar
+from pydantic import BaseModel
+
+CreateT = TypeVar('CreateT')
+UpdateT = TypeVar('UpdateT')
+PublicT = TypeVar('PublicT')
+IdT = TypeVar('IdT')
+
+
+class BatchRequest(BaseModel, Generic[CreateT, UpdateT, IdT]):
+    """ Mixed operations applied in one transaction """
+    create: list[CreateT] = []
+    update: list[UpdateT] = []
+    delete: list[IdT] = []
+
+
+class BatchResponse(BaseModel, Generic[PublicT, IdT]):
+    """ Result of the batch operations """
+    created: list[PublicT]
+    updated: list[PublicT]
+    deleted: list[IdT]
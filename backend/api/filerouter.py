@@ -7,6 +7,8 @@ from fastapi.responses import FileResponse
 from ..repository.localstorage import LocalStorage
 from ..repository.managers import ModelManager
 from ..repository.models.common import FileCreate, FilePublic
+from .page import Page
+from .streaming import StreamFormat, stream_response
 
 class FileRouter:
     """ File operations router """
@@ -20,14 +22,36 @@ class FileRouter:
         self.manager = manager
 
         self.router.add_api_route('', self.list, methods=['GET'],
-                                  response_model=Union[list[FilePublic], list[dict[str, Any]]])
+                                  response_model=Union[list[FilePublic], list[dict[str, Any]],
+                                                       Page[FilePublic], Page[dict[str, Any]]])
         self.router.add_api_route('', self.upload, methods=['POST'], response_model=FilePublic)
         self.router.add_api_route('/{uid}', self.download, methods=['GET'], response_class=FileResponse)
         self.router.add_api_route('/{uid}', self.delete, methods=['DELETE'], response_model=FilePublic)
 
     async def list(self, request: Request, limit: int = 100, offset: int = 0,
-                   fields: str = Query(default=None, description='Comma separated fields')):
+                   fields: str = Query(default=None, description='Comma separated fields'),
+                   cursor: str = Query(default=None, description='Cursor of the requested page. '
+                                                                 'Pass empty cursor to start cursor pagination'),
+                   stream: StreamFormat = Query(default=None, description='Stream items in bounded memory: '
+                                                                          'ndjson - one JSON item per line, '
+                                                                          'json - JSON array'),
+                   with_total: bool = Query(default=False, description='Return items in envelope with total count. '
+                                                                       'Total of large tables is estimated, '
+                                                                       'then total_is_estimate is true')):
         requested_fields = fields.split(',') if fields else None
+        if stream is not None:
+            pages = self.manager.stream(session=request.state.db_session, limit=limit, offset=offset,
+                                        fields=requested_fields)
+            return stream_response(pages, stream, None if requested_fields else FilePublic)
+        if cursor is not None:
+            page = await self.manager.get_page(session=request.state.db_session, limit=limit, cursor=cursor,
+                                               fields=requested_fields, with_total=with_total)
+            return {'items': page[0], 'next_cursor': page[1], 'total': page[2] if with_total else None,
+                    'total_is_estimate': page[3] if with_total else None}
+        if with_total:
+            items, total, estimated = await self.manager.get(session=request.state.db_session, limit=limit,
+                                                             offset=offset, fields=requested_fields, with_total=True)
+            return {'items': items, 'total': total, 'total_is_estimate': estimated}
         return await self.manager.get(session=request.state.db_session, limit=limit, offset=offset, fields=requested_fields)
 
     async def upload(self, request: Request, file: UploadFile):
@@ -39,6 +63,7 @@ class FileRouter:
 
     async def download(self, request: Request, uid: UUID):
         record = await self.manager.get_by_id(session=request.state.db_session, uid=uid)
+        await request.state.db_session.release()
         return FileResponse(self.storage.file_path(record.path))
 
     async def delete(self, request: Request, uid: UUID):
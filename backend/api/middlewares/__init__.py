@@ -1,3 +1,6 @@
 from .exceptions import HttpExceptionMapper
-from .session import DatabaseSessionMiddleware
+from .session import DatabaseSessionMiddleware, PUBLIC_ROUTES, ADMIN_ROUTES
+from .admission import AdmissionGate, AdmissionRejected
+from .routes import RouteMatcher, read_only, read_only_paths, DB_ROUTES, READ_ROUTES, AUTH_ROUTES, STATIC_ROUTES, \
+    VIEW_ROUTES
 from .oauth import OAuthMiddleware
@@ -0,0 +1,45 @@
+import asyncio
+
+
+class AdmissionRejected(Exception):
+    """ Request is not admitted: the wait queue is full or the waiting deadline is passed """
+
+
+class AdmissionGate:
+    """ Admission control of a route class. At most limit requests of the class use the database at once,
+    at most queue_size requests wait for a free slot and none of them waits longer than timeout.
+    Other requests are rejected at once instead of queueing inside the connection pool
+    """
+    def __init__(self, limit: int, queue_size: int, timeout: float):
+        """ Initializer
+        :param limit: number of requests admitted at once
+        :param queue_size: number of requests waiting for admission
+        :param timeout: waiting deadline in seconds
+        """
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def acquire(self) -> None:
+        """ Take an admission slot, waiting for it in the bounded queue
+        :raises AdmissionRejected: if the wait queue is full or the slot is not freed before the deadline
+        """
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+            return
+
+        if self.waiting >= self.queue_size:
+            raise AdmissionRejected()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+        except TimeoutError:
+            raise AdmissionRejected()
+        finally:
+            self.waiting -= 1
+
+    def release(self) -> None:
+        """ Free the taken admission slot """
+        self._semaphore.release()
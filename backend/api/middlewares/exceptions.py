@@ -2,7 +2,7 @@ from fastapi import HTTPException, status
 
 from common import get_logger, settings
 
-from backend.repository.exceptions import EntityNotFound
+from backend.repository.exceptions import EntityNotFound, InvalidCursor, InvalidQuery
 
 log = get_logger(settings, 'backend')
 
@@ -14,3 +14,15 @@ class HttpExceptionMapper:
             """ Handle database EntityNotFound exception"""
             log.info(f'Map http exception {exc.__class__.__name__} to 404 Not Found')
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc))
+
+        @app.exception_handler(InvalidCursor)
+        async def invalid_cursor(request, exc):
+            """ Handle database InvalidCursor exception"""
+            log.info(f'Map http exception {exc.__class__.__name__} to 400 Bad Request')
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+        @app.exception_handler(InvalidQuery)
+        async def invalid_query(request, exc):
+            """ Handle database InvalidQuery exception"""
+            log.info(f'Map http exception {exc.__class__.__name__} to 400 Bad Request')
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
@@ -1,33 +1,53 @@
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
-from fastapi import Request, HTTPException, status
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Scope, Receive, Send
 
+from backend.auth.exceptions import CouldNotValidateCredentials, UserNotFound
+from .routes import RouteMatcher, DB_ROUTES, READ_ROUTES
 
-class OAuthMiddleware(BaseHTTPMiddleware):
-    """ Middleware for oauth handling.
-    While dispatching a request, it waits for an open DB session in the request.state.db_session
+
+class OAuthMiddleware:
+    """ ASGI middleware for oauth handling. The user is put to scope['state'] and is available as request.state.user.
+    While dispatching a request, it waits for an open DB session in the request.state.db_session, so it must be
+    added before DatabaseSessionMiddleware. Requests without valid bearer token get 401
     """
-    def __init__(self, app, auth_system, allowed_routes: list[str] = None):
+    def __init__(self, app: ASGIApp, auth_system, matcher: RouteMatcher):
         """ Initializer
         :param app: fastapi application
-        :param allowed_routes: handled routes
+        :param auth_system: auth system resolving user by access token
+        :param matcher: shared route matcher classifying request paths. DB_ROUTES and READ_ROUTES are handled
         """
-        BaseHTTPMiddleware.__init__(self, app)
+        self.app = app
         self.auth_system = auth_system
-        self.routes = allowed_routes if allowed_routes is not None else []
+        self.matcher = matcher
 
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """ Route handler. If request path in routes then extract user from token payload """
-        if any(request.url.path.startswith(route) for route in self.routes):
-            auth = request.headers.get('authorization')
-            if not auth:
-                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+        if scope['type'] != 'http' or self.matcher.classify(scope) not in (DB_ROUTES, READ_ROUTES):
+            await self.app(scope, receive, send)
+            return
+
+        auth = Headers(scope=scope).get('authorization')
+        if not auth:
+            await self._unauthorized('Not authenticated')(scope, receive, send)
+            return
 
-            scheme, _, token = auth.partition(' ')
+        scheme, _, token = auth.partition(' ')
+        if scheme.lower() != 'bearer' or not token:
+            await self._unauthorized('Invalid authorization header')(scope, receive, send)
+            return
 
-            if scheme.lower() != 'bearer' or not token:
-                raise HTTPException( status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid authorization header')
+        state = scope.setdefault('state', {})
+        try:
+            state['user'] = await self.auth_system.user_by_token(state['db_session'], token)
+        except (CouldNotValidateCredentials, UserNotFound) as e:
+            await self._unauthorized(str(e))(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
 
-            request.state.user = await self.auth_system.get_user_by_token(request.state.db_session, token)
-            return await call_next(request)
-        else:
-            return await call_next(request)
+    @staticmethod
+    def _unauthorized(detail: str) -> JSONResponse:
+        """ Response to a request without valid credentials """
+        return JSONResponse({'detail': detail}, status_code=status.HTTP_401_UNAUTHORIZED,
+                            headers={'WWW-Authenticate': 'Bearer'})
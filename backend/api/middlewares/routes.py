@@ -0,0 +1,71 @@
+import re
+
+from fastapi import APIRouter
+from starlette.types import Scope
+
+
+DB_ROUTES = 'db'
+READ_ROUTES = 'read'
+AUTH_ROUTES = 'auth'
+STATIC_ROUTES = 'static'
+VIEW_ROUTES = 'view'
+ROUTE_KIND = 'route_kind'
+READ_ONLY = 'read_only'
+
+
+def read_only(endpoint):
+    """ Mark endpoint only reading the database whatever its method, e.g. POST query with filters in the body.
+    Its path is classified as READ_ROUTES, so it is served as a public read without unit of work
+    :param endpoint: router endpoint
+    :return: the same endpoint
+    """
+    setattr(endpoint, READ_ONLY, True)
+    return endpoint
+
+
+def read_only_paths(router: APIRouter) -> list[str]:
+    """ Find paths of read only endpoints of the router. Paths with parameters are not supported
+    :param router: fastapi router
+    :return: full paths of read only endpoints
+    """
+    return [route.path for route in router.routes if getattr(getattr(route, 'endpoint', None), READ_ONLY, False)]
+
+
+class RouteMatcher:
+    """ Precompiled matcher of route prefixes. All prefixes are compiled once into one regular expression,
+    so a path is matched in a single pass instead of a startswith call per route.
+    One matcher is shared by all middlewares: the first middleware classifies the request path and the others
+    read the kind from the request scope
+    """
+    def __init__(self, routes: dict[str, list[str]]):
+        """ Initializer
+        :param routes: route prefixes by label. The longest matched prefix wins, on equal prefixes
+                       the first label wins
+        """
+        self.routes = routes
+        prefixes = [(prefix, label) for label, prefixes in routes.items() for prefix in prefixes]
+        prefixes.sort(key=lambda item: len(item[0]), reverse=True)
+        self.labels = [label for _, label in prefixes]
+        pattern = '|'.join(f'({re.escape(prefix)})' for prefix, _ in prefixes)
+        self._regex = re.compile(pattern) if prefixes else None
+
+    def match(self, path: str) -> str | None:
+        """ Find label of the path
+        :param path: request path
+        :return: label of the longest prefix of the path or None if no prefix matches
+        """
+        if self._regex is None:
+            return None
+        match = self._regex.match(path)
+        return self.labels[match.lastindex - 1] if match else None
+
+    def classify(self, scope: Scope) -> str | None:
+        """ Find kind of the request path once per request
+        :param scope: request scope
+        :return: label of the request path, e.g. DB_ROUTES, READ_ROUTES, AUTH_ROUTES, STATIC_ROUTES or VIEW_ROUTES
+        """
+        matcher, kind = scope.get(ROUTE_KIND, (None, None))
+        if matcher is not self:
+            kind = self.match(scope['path'])
+            scope[ROUTE_KIND] = (self, kind)
+        return kind
@@ -1,24 +1,100 @@
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
-from fastapi import Request
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
 
+from backend.repository.unitofwork import begin_unit_of_work, end_unit_of_work, in_unit_of_work
+from backend.repository.lazysession import LazySession
+from .admission import AdmissionGate, AdmissionRejected
+from .routes import RouteMatcher, DB_ROUTES, READ_ROUTES, AUTH_ROUTES
 
-class DatabaseSessionMiddleware(BaseHTTPMiddleware):
-    """ Middleware for handling database session """
-    def __init__(self, app, session, allowed_routes: list[str] = None):
+
+MUTATING_METHODS = frozenset({'POST', 'PUT', 'PATCH', 'DELETE'})
+PUBLIC_ROUTES = 'public'
+ADMIN_ROUTES = 'admin'
+SESSION_ROUTES = frozenset({DB_ROUTES, READ_ROUTES, AUTH_ROUTES})
+
+
+class DatabaseSessionMiddleware:
+    """ ASGI middleware for handling database session. The session is put to scope['state'] and is available
+    as request.state.db_session. It is a LazySession: a connection is checked out on the first query and
+    a handler can release it early with request.state.db_session.release() when its database work is done.
+    A mutating request is one unit of work: its changes are committed once when the handler starts
+    a successful response or rolled back once if it fails, unless the handler has released the session.
+    Sessions are opened for DB_ROUTES, READ_ROUTES and AUTH_ROUTES of the shared route matcher. Every such request
+    belongs to a route class: AUTH_ROUTES for auth routes, otherwise ADMIN_ROUTES for mutating requests and
+    PUBLIC_ROUTES for reads. READ_ROUTES, e.g. POST queries, are reads whatever their method. A class may have
+    own session class, i.e. own connection pool, and own admission gate, so a saturated class does not slow down
+    the others.
+    Requests pass the admission gate of their route class before the session is opened and hold it until
+    the session is released or closed. Rejected requests get 503 with Retry-After without touching
+    the connection pool
+    """
+    def __init__(self, app: ASGIApp, session, matcher: RouteMatcher, admission: dict[str, AdmissionGate] = None,
+                 retry_after: int = 1, sessions: dict = None):
         """ Initializer
         :param app: fastapi application
-        :param session: database session class
-        :param allowed_routes: handled routes
+        :param session: database session class of route classes without own session class
+        :param matcher: shared route matcher classifying request paths
+        :param admission: admission gates by route class. Without a gate requests of the class are admitted at once
+        :param retry_after: seconds sent in Retry-After header of rejected requests
+        :param sessions: database session classes by route class
         """
-        BaseHTTPMiddleware.__init__(self, app)
+        self.app = app
         self.session = session
-        self.routes = allowed_routes if allowed_routes is not None else []
+        self.matcher = matcher
+        self.admission = admission if admission is not None else {}
+        self.retry_after = retry_after
+        self.sessions = sessions if sessions is not None else {}
 
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """ Route handler. If request path in routes then opening database session else do nothing """
-        if any(request.url.path.startswith(route) for route in self.routes):
-            async with self.session() as session:
-                request.state.db_session = session
-                return await call_next(request)
-        else:
-            return await call_next(request)
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        kind = self.matcher.classify(scope)
+        if kind not in SESSION_ROUTES:
+            await self.app(scope, receive, send)
+            return
+
+        unit_of_work = kind != READ_ROUTES and scope['method'] in MUTATING_METHODS
+        route_class = kind if kind == AUTH_ROUTES else ADMIN_ROUTES if unit_of_work else PUBLIC_ROUTES
+        gate = self.admission.get(route_class)
+        if gate is not None:
+            try:
+                await gate.acquire()
+            except AdmissionRejected:
+                await self._rejected()(scope, receive, send)
+                return
+
+        admitted = gate is not None
+
+        def free_slot() -> None:
+            nonlocal admitted
+            if admitted:
+                admitted = False
+                gate.release()
+
+        session = LazySession(self.sessions.get(route_class, self.session), on_release=free_slot)
+        scope.setdefault('state', {})['db_session'] = session
+        if unit_of_work:
+            begin_unit_of_work(session)
+
+        async def send_committed(message: Message) -> None:
+            if unit_of_work and message['type'] == 'http.response.start' and in_unit_of_work(session):
+                await end_unit_of_work(session, commit=message['status'] < 400)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_committed)
+        finally:
+            # streaming responses read database while sending body, so the session is closed after the whole
+            # response is sent unless the handler has released it
+            try:
+                await session.close()
+            finally:
+                free_slot()
+
+    def _rejected(self) -> JSONResponse:
+        """ Response to a request rejected by admission control """
+        return JSONResponse({'detail': 'Service is overloaded'}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            headers={'Retry-After': str(self.retry_after)})
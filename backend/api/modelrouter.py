@@ -1,9 +1,34 @@
 import uuid
 from typing import Union, Any
-from fastapi import APIRouter, Query, Request
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Query, Request, Body, HTTPException, status
+from fastapi.responses import JSONResponse, Response
 from dataclasses import dataclass
 
+from .page import Page
+from .batch import BatchRequest, BatchResponse
+from .streaming import StreamFormat, stream_response
+from .middlewares.routes import read_only
+
+QUERY_MAX_LIMIT = 1000
+
+FIELDS_DESCRIPTION = ('Comma separated fields. Fields of related items are separated by dots: '
+                      'title,apartments.items.cost,images.path')
+
+EXPAND_DESCRIPTION = ('Comma separated relationships to load. Nested relationships are separated by dots: '
+                      'apartments.items,images. Use * to load all relationships. '
+                      'Not expanded relationships are returned empty')
+
+STREAM_DESCRIPTION = ('Stream items in bounded memory: ndjson - one JSON item per line, '
+                      'json - JSON array. Items are not limited to the max query limit')
+
+WITH_TOTAL_DESCRIPTION = ('Return items in envelope with total count of items matching filters. '
+                          'Total of large tables without filters is estimated, then total_is_estimate is true. '
+                          'With cursor the total is counted with the first page and carried to the next pages')
+
+FILTERS_DESCRIPTION = ('Dict with filters. Key is a model field, value is an item for equality, a list of items '
+                       'or a dict of operators: eq, ne, in, gt, gte, lt, lte, like (prefix), is_null. '
+                       'Example: {"cost": {"gte": 100, "lte": 500}, "title": {"like": "Sun"}, "id": ["..."]}')
+
 
 @dataclass
 class ModelCollection:
@@ -14,11 +39,13 @@ class ModelCollection:
     id_type: uuid.UUID = uuid.UUID
 
 
-def create_model_router(manager, model_collections: ModelCollection, *args, **kwargs):
+def create_model_router(manager, model_collections: ModelCollection, *args, database_json: bool = False, **kwargs):
     """ Model router factory
     :param manager: model manager working with the repository
     :param model_collections: model collections. Used for router typing and automatic validation
     :param args: additional args. Will be passed to fast api router
+    :param database_json: list items without fields and cursor are built as JSON by the database and returned
+    without validation
     :param kwargs: additional kwargs. Will be passed to fast api router
     """
     class ModelRouter:
@@ -28,27 +55,97 @@ def create_model_router(manager, model_collections: ModelCollection, *args, **kw
             self.manager = manager
 
             self.router.add_api_route('', self.list, methods=['GET'],
-                                      response_model=Union[list[model_collections.public], list[dict[str, Any]]])
+                                      response_model=Union[list[model_collections.public], list[dict[str, Any]],
+                                                           Page[model_collections.public], Page[dict[str, Any]]])
             self.router.add_api_route('/query', self.query, methods=['POST'],
-                                      response_model=Union[list[model_collections.public], list[dict[str, Any]]])
+                                      response_model=Union[list[model_collections.public], list[dict[str, Any]],
+                                                           Page[model_collections.public], Page[dict[str, Any]]])
             self.router.add_api_route('', self.create, methods=['POST'], response_model=model_collections.public)
             self.router.add_api_route('', self.update, methods=['PATCH'], response_model=model_collections.public)
+            self.router.add_api_route('/batch', self.batch, methods=['POST'],
+                                      response_model=BatchResponse[model_collections.public, model_collections.id_type])
             self.router.add_api_route('/{uid}', self.delete, methods=['DELETE'], response_class=JSONResponse)
 
         async def list(self, request: Request, limit: int = 100, offset: int = 0,
-                       fields: str = Query(default=None, description='Comma separated fields')):
+                       fields: str = Query(default=None, description=FIELDS_DESCRIPTION),
+                       cursor: str = Query(default=None, description='Cursor of the requested page. '
+                                                                     'Pass empty cursor to start cursor pagination'),
+                       expand: str = Query(default=None, description=EXPAND_DESCRIPTION),
+                       stream: StreamFormat = Query(default=None, description=STREAM_DESCRIPTION),
+                       with_total: bool = Query(default=False, description=WITH_TOTAL_DESCRIPTION)):
             requested_fields = fields.split(',') if fields else None
-            return await self.manager.get(session=request.state.db_session, limit=limit, offset=offset, fields=requested_fields)
+            requested_expand = expand.split(',') if expand else None
+            if stream is not None:
+                pages = self.manager.stream(session=request.state.db_session, limit=limit, offset=offset,
+                                            fields=requested_fields, expand=requested_expand)
+                return stream_response(pages, stream, None if requested_fields else model_collections.public)
+            if database_json and not requested_fields and cursor is None and not with_total:
+                content = await self.manager.get_json(session=request.state.db_session,
+                                                      public_type=model_collections.public,
+                                                      limit=limit, offset=offset, expand=requested_expand)
+                return Response(content=content, media_type='application/json')
+            if cursor is not None:
+                page = await self.manager.get_page(session=request.state.db_session, limit=limit, cursor=cursor,
+                                                   fields=requested_fields, expand=requested_expand,
+                                                   with_total=with_total)
+                return {'items': page[0], 'next_cursor': page[1], 'total': page[2] if with_total else None,
+                        'total_is_estimate': page[3] if with_total else None}
+            if with_total:
+                items, total, estimated = await self.manager.get(session=request.state.db_session, limit=limit,
+                                                                 offset=offset, fields=requested_fields,
+                                                                 expand=requested_expand, with_total=True)
+                return {'items': items, 'total': total, 'total_is_estimate': estimated}
+            return await self.manager.get(session=request.state.db_session, limit=limit, offset=offset,
+                                          fields=requested_fields, expand=requested_expand)
 
-        async def query(self, request: Request, filters: dict, fields: str = Query(default=None, description='Comma separated fields')):
+        @read_only
+        async def query(self, request: Request, filters: dict = Body(description=FILTERS_DESCRIPTION),
+                        fields: str = Query(default=None, description=FIELDS_DESCRIPTION),
+                        order_by: str = Query(default=None, description='Comma separated fields to sort by. '
+                                                                        'Prefix field with "-" for descending order'),
+                        limit: int = Query(default=100, ge=1, description=f'Count of items. At most {QUERY_MAX_LIMIT} '
+                                                                          f'if items are not streamed'),
+                        offset: int = 0,
+                        expand: str = Query(default=None, description=EXPAND_DESCRIPTION),
+                        stream: StreamFormat = Query(default=None, description=STREAM_DESCRIPTION),
+                        with_total: bool = Query(default=False, description=WITH_TOTAL_DESCRIPTION)):
             requested_fields = fields.split(',') if fields else None
-            return await self.manager.get(session=request.state.db_session, fields=requested_fields, filters=filters)
+            requested_order = order_by.split(',') if order_by else None
+            requested_expand = expand.split(',') if expand else None
+            if stream is not None:
+                pages = self.manager.stream(session=request.state.db_session, fields=requested_fields,
+                                            filters=filters, order_by=requested_order, limit=limit, offset=offset,
+                                            expand=requested_expand)
+                return stream_response(pages, stream, None if requested_fields else model_collections.public)
+            if limit > QUERY_MAX_LIMIT:
+                raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                    detail=f'limit must be less than or equal to {QUERY_MAX_LIMIT}')
+            if with_total:
+                items, total, estimated = await self.manager.get(session=request.state.db_session,
+                                                                 fields=requested_fields, filters=filters,
+                                                                 order_by=requested_order, limit=limit, offset=offset,
+                                                                 expand=requested_expand, with_total=True)
+                return {'items': items, 'total': total, 'total_is_estimate': estimated}
+            return await self.manager.get(session=request.state.db_session, fields=requested_fields, filters=filters,
+                                          order_by=requested_order, limit=limit, offset=offset,
+                                          expand=requested_expand)
 
         async def create(self, request: Request, new_el: model_collections.create):
             return await self.manager.create(session=request.state.db_session, new_model=new_el)
 
-        async def update(self, request: Request, update: model_collections.update):
-            return await self.manager.update(session=request.state.db_session, update_model=update)
+        async def update(self, request: Request, update: model_collections.update,
+                         expand: str = Query(default=None, description=EXPAND_DESCRIPTION)):
+            requested_expand = expand.split(',') if expand else None
+            return await self.manager.update(session=request.state.db_session, update_model=update,
+                                             expand=requested_expand)
+
+        async def batch(self, request: Request,
+                        operations: BatchRequest[model_collections.create, model_collections.update, model_collections.id_type]):
+            created, updated, deleted = await self.manager.batch(session=request.state.db_session,
+                                                                 create=operations.create,
+                                                                 update=operations.update,
+                                                                 delete=operations.delete)
+            return {'created': created, 'updated': updated, 'deleted': deleted}
 
         async def delete(self, request: Request, uid: model_collections.id_type):
             await self.manager.delete(session=request.state.db_session, model_id=uid)
@@ -0,0 +1,14 @@
+from typing import Generic, TypeVar
+from pydantic import BaseModel
+
+T = TypeVar('T')
+
+
+class Page(BaseModel, Generic[T]):
+    """ Page of items returned in cursor pagination mode or with total count. Total of large tables without
+    filters is the statistics estimate, then total_is_estimate is true
+    """
+    items: list[T]
+    next_cursor: str | None = None
+    total: int | None = None
+    total_is_estimate: bool | None = None
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Request, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from ..repository.models.common.user import Privilege
+from ..repository.pool import pool_status
+
+
+class PoolRouter:
+    """ Internal router reporting database connection pools status. The status is read from the pools
+    without queries. It must be a DB route: the user is authenticated by OAuthMiddleware and must be an admin
+    """
+    def __init__(self, engines: dict[str, AsyncEngine], *args, **kwargs):
+        """ Initializer
+        :param engines: reported engines by name, e.g. primary and replica
+        """
+        self.router = APIRouter(*args, **kwargs)
+        self.engines = engines
+
+        self.router.add_api_route('', self.status, methods=['GET'])
+
+    async def status(self, request: Request):
+        user = getattr(request.state, 'user', None)
+        if user is None or user.privilege != Privilege.admin:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail='Admin privilege required')
+        return {name: pool_status(engine.pool) for name, engine in self.engines.items()}
+
+    def __str__(self):
+        """ To debug output """
+        return f'Name: {self.__class__.__name__}, Engines: {", ".join(self.engines)}'
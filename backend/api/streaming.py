@@ -0,0 +1,44 @@
+from enum import Enum
+from typing import AsyncIterator, Callable
+from fastapi.responses import StreamingResponse
+from pydantic_core import to_json
+
+
+class StreamFormat(str, Enum):
+    """ Format of streamed items """
+    ndjson = 'ndjson'
+    json = 'json'
+
+
+MEDIA_TYPES = {StreamFormat.ndjson: 'application/x-ndjson', StreamFormat.json: 'application/json'}
+
+
+def stream_response(pages: AsyncIterator[list], stream_format: StreamFormat, public_type=None) -> StreamingResponse:
+    """ Create streaming response of item pages. Every page is serialized and sent as soon as it is fetched
+    :param pages: async iterator of item pages
+    :param stream_format: ndjson - one JSON item per line, json - JSON array built incrementally
+    :param public_type: model type to serialize SQLModel items. Dicts are serialized as is if None
+    :return: streaming response
+    """
+    if public_type is not None:
+        serialize = lambda item: public_type.model_validate(item).model_dump_json().encode()
+    else:
+        serialize = to_json
+
+    body = _ndjson(pages, serialize) if stream_format == StreamFormat.ndjson else _json_array(pages, serialize)
+    return StreamingResponse(body, media_type=MEDIA_TYPES[stream_format])
+
+
+async def _ndjson(pages: AsyncIterator[list], serialize: Callable) -> AsyncIterator[bytes]:
+    async for page in pages:
+        yield b''.join(serialize(item) + b'\n' for item in page)
+
+
+async def _json_array(pages: AsyncIterator[list], serialize: Callable) -> AsyncIterator[bytes]:
+    yield b'['
+    separator = b''
+    async for page in pages:
+        if page:
+            yield separator + b','.join(serialize(item) for item in page)
+            separator = b','
+    yield b']'
@@ -3,10 +3,13 @@ import hashlib
 from uuid import UUID
 from datetime import datetime, UTC, timedelta
 from pydantic import BaseModel
+from jose import JWTError
 
 from common import settings
 from ..repository.models.common import User, UserCreate
 from ..repository.models.auth import RefreshToken
+from ..repository.unitofwork import transaction
+from ..repository.lazysession import release_session
 from .exceptions import *
 
 
@@ -92,6 +95,8 @@ class AuthSystem:
             raise TooManyAttempts(blocked.blocked_until)
 
         user = await self.repo.get_user(session, login=username)
+        # password check is slow and does not need the database, so the connection goes back to the pool before it
+        await release_session(session)
         if not user or not await self.hasher.verify(password, user.password_hash):
             await self._fail_attempt(username)
             raise InvalidCredentials()
@@ -158,7 +163,7 @@ class AuthSystem:
         :raises RefreshTokenExpired: if the refresh token has expired
         :raises CsrfFailed: if the provided CSRF token does not match the stored one
         """
-        async with session.begin():
+        async with transaction(session):
             rec = await self.repo.get_token_for_update(session=session, token=token)
             if not rec:
                 raise RefreshUnknownToken()
@@ -192,7 +197,7 @@ class AuthSystem:
 
         :return: None
         """
-        async with session.begin():
+        async with transaction(session):
             rec = await self.repo.get_token_for_update(session=session, token=token)
             if rec:
                 self._mark_as_revoked([rec])
@@ -207,7 +212,7 @@ class AuthSystem:
 
         :return: None
         """
-        async with session.begin():
+        async with transaction(session):
             rec = await self.repo.get_token(session, token)
             if rec:
                 tokens = await self.repo.get_user_tokens_for_update(session=session, user_id=rec.user_id)
@@ -226,16 +231,16 @@ class AuthSystem:
         :raises RegistrationError: if the login or password does not meet validation requirements
         """
         # TODO add limit for creating user from same ip
-        existing_user = await self.repo.get_user(session=session, login=new_user.login)
-        if existing_user:
-            raise LoginAlreadyUsed()
-
         if not self._login_is_valid(new_user.login) or not self._password_is_valid(new_user.password):
             raise RegistrationError()
 
+        # the password is hashed before the first query, so no connection is held while hashing
         user = User.model_validate(new_user)
         user.password_hash = await self.hasher.hash(new_user.password)
-        return await self.repo.create_user(session=session, new_user=user)
+        created = await self.repo.create_user(session=session, new_user=user)
+        if created is None:
+            raise LoginAlreadyUsed()
+        return created
 
     async def user_by_token(self, session, token: str) -> User:
         """ Get user model by token
@@ -244,10 +249,15 @@ class AuthSystem:
 
         :return: User model object
 
+        :raises CouldNotValidateCredentials: if token is invalid or expired
         :raises UserNotFound: if user not found by token payload
         """
-        payload = self.token_manager.decode(token)
-        user = await self.repo.get_user(session, uid=UUID(payload.sub))
+        try:
+            payload = self.token_manager.decode(token)
+            uid = UUID(payload.sub)
+        except (JWTError, KeyError, ValueError):
+            raise CouldNotValidateCredentials()
+        user = await self.repo.get_user(session, uid=uid)
         if not user:
             raise UserNotFound()
         return user
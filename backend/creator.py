@@ -9,8 +9,10 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 from common import settings, get_logger, DatabaseDSN
 
-from .api import create_model_router, ModelCollection, FileRouter, AuthRouter
-from .api.middlewares import HttpExceptionMapper, DatabaseSessionMiddleware, OAuthMiddleware
+from .api import create_model_router, ModelCollection, FileRouter, AuthRouter, PoolRouter
+from .api.middlewares import HttpExceptionMapper, DatabaseSessionMiddleware, OAuthMiddleware, AdmissionGate, \
+    RouteMatcher, read_only_paths, PUBLIC_ROUTES, ADMIN_ROUTES, DB_ROUTES, READ_ROUTES, AUTH_ROUTES, STATIC_ROUTES, \
+    VIEW_ROUTES
 from .api.openapi import custom_openapi
 from .auth import AuthSystem, Hasher, TokenManager, AuthSecrets, TokenConfig
 from .auth.secrets import SECRET_KEY
@@ -21,6 +23,7 @@ from .repository.managers import *
 from .repository.models.promotion import *
 from .repository.models.common import *
 from .repository.database import AsyncRepository
+from .repository.pool import pool_options
 from .repository.localstorage import LocalStorage
 from .repository.redis import RedisLocal, RedisRemote, RedisFacade
 
@@ -36,8 +39,28 @@ def register(app, lifespan) -> None:
     """
     log.info(f'registering backend')
 
+    db_dsn = DatabaseDSN(settings)
+    # public reads, admin writes and auth flows get own pools, so one of them can not exhaust the others
+    pool_sizes = {PUBLIC_ROUTES: (settings.db_pool_size, settings.db_max_overflow),
+                  ADMIN_ROUTES: (settings.db_admin_pool_size, settings.db_admin_max_overflow),
+                  AUTH_ROUTES: (settings.db_auth_pool_size, settings.db_auth_max_overflow)}
+    engines, sessions = {}, {}
+    for route_class, (pool_size, max_overflow) in pool_sizes.items():
+        log.debug(f'creating {route_class} async engine. url: {db_dsn}, echo: {settings.debug}, '
+                  f'pool size: {pool_size}, max overflow: {max_overflow}')
+        engines[route_class] = create_async_engine(db_dsn.to_url(), echo=settings.debug, future=True,
+                                                   **pool_options(settings, pool_size, max_overflow))
+        sessions[route_class] = sessionmaker(bind=engines[route_class], class_=AsyncSession, expire_on_commit=False)
+
+    replica_engine = None
+    if settings.db_replica_host:
+        replica_dsn = DatabaseDSN(settings, host=settings.db_replica_host, port=settings.db_replica_port)
+        log.debug(f'creating replica async engine. url: {replica_dsn}')
+        replica_engine = create_async_engine(replica_dsn.to_url(), echo=settings.debug, future=True,
+                                             **pool_options(settings))
+
     log.info(f'creating async repository')
-    repo = AsyncRepository()
+    repo = AsyncRepository(replica=replica_engine)
 
     elements = [(ApartImageManager(ApartImage, repo),
                  ModelCollection(public=ApartImagePublic, create=ApartImageCreate, update=ApartImageUpdate),
@@ -56,7 +79,7 @@ def register(app, lifespan) -> None:
                  {'prefix': '/api/project/details', 'tags': ['Project Details']}),
                 (ProjectManager(Project, repo),
                  ModelCollection(public=ProjectPublic, create=ProjectCreate, update=ProjectUpdate),
-                 {'prefix': '/api/project', 'tags': ['Project']}),
+                 {'prefix': '/api/project', 'tags': ['Project'], 'database_json': True}),
                 (PromotionManager(Promotion, repo),
                  ModelCollection(public=PromotionPublic, create=PromotionCreate, update=PromotionUpdate),
                  {'prefix': '/api/promotion', 'tags': ['Promotion']}),
@@ -75,7 +98,8 @@ def register(app, lifespan) -> None:
     token_config = TokenConfig(access_ttl_minutes=settings.access_token_ttl_minutes,
                                refresh_ttl_days=settings.refresh_token_ttl_days)
     token_manager = TokenManager(secrets=token_secrets, config=token_config)
-    auth_model_manager = AuthModelManager(repo=repo)
+    # auth reads must see just written tokens and users, so they are not routed to the replica
+    auth_model_manager = AuthModelManager(repo=AsyncRepository())
     redis_local = RedisLocal(capacity=settings.redis_local_capacity)
     redis_client = Redis(host=settings.redis_host, port=settings.redis_port, decode_responses=True)
     redis_remote = RedisRemote(client=redis_client)
@@ -84,22 +108,38 @@ def register(app, lifespan) -> None:
     auth_router = AuthRouter(auth_system=auth_system, prefix='/api/auth', tags=['Authorization'])
     routers.append(auth_router)
 
+    if settings.db_pool_metrics:
+        log.info('adding pool metrics router')
+        metered_engines = {**engines, 'replica': replica_engine} if replica_engine else engines
+        # pool router is a DB route, so it is served to admins authenticated by oauth middleware only
+        routers.append(PoolRouter(metered_engines, prefix='/internal/pool', tags=['Internal'], include_in_schema=False))
+
     for r in routers:
         log.debug(f'''register router: {r}''')
         app.include_router(r.router)
 
-    db_dsn = DatabaseDSN(settings)
-    log.debug(f'creating async engine. url: {db_dsn}, echo: {settings.debug}')
-    async_engine = create_async_engine(db_dsn.to_url(), echo=settings.debug, future=True)
-    async_session = sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False)
-
-    db_allowed_routes = [router.router.prefix for router in routers]
-    log.info('adding session middleware')
-    app.add_middleware(DatabaseSessionMiddleware, session=async_session, allowed_routes=db_allowed_routes)
-
-    oauth_allowed_routes = [router.router.prefix for router in routers if router != auth_router]
+    view_routers = [MainViewRouter()]
+    log.info('creating route matcher')
+    route_matcher = RouteMatcher({AUTH_ROUTES: [auth_router.router.prefix],
+                                  DB_ROUTES: [router.router.prefix for router in routers if router != auth_router],
+                                  READ_ROUTES: [path for router in routers if router != auth_router
+                                                for path in read_only_paths(router.router)],
+                                  STATIC_ROUTES: ['/static'],
+                                  VIEW_ROUTES: [router.router.prefix for router in view_routers]})
+
+    # middlewares added later wrap earlier ones: oauth middleware needs the session opened by the session middleware
     log.info('adding oauth middleware')
-    app.add_middleware(OAuthMiddleware, auth_system=auth_system, allowed_routes=oauth_allowed_routes)
+    app.add_middleware(OAuthMiddleware, auth_system=auth_system, matcher=route_matcher)
+
+    admission_limits = {PUBLIC_ROUTES: settings.db_admission_public_limit,
+                        ADMIN_ROUTES: settings.db_admission_admin_limit,
+                        AUTH_ROUTES: settings.db_admission_auth_limit}
+    admission = {route_class: AdmissionGate(limit=limit, queue_size=settings.db_admission_queue_size,
+                                            timeout=settings.db_admission_timeout_secs)
+                 for route_class, limit in admission_limits.items()}
+    log.info('adding session middleware')
+    app.add_middleware(DatabaseSessionMiddleware, session=sessions[PUBLIC_ROUTES], matcher=route_matcher,
+                       admission=admission, retry_after=settings.db_admission_retry_after_secs, sessions=sessions)
 
     log.info('creating http exception mapper')
     _ = HttpExceptionMapper(app)
@@ -112,14 +152,13 @@ def register(app, lifespan) -> None:
     scheduler = AsyncIOScheduler()
 
     log.info('adding clearing expired refresh tokens task')
-    clear_token_task = ClearTokenTask(async_session, repo, settings.refresh_token_ttl_days_after_expired)
+    clear_token_task = ClearTokenTask(sessions[ADMIN_ROUTES], repo, settings.refresh_token_ttl_days_after_expired)
     scheduler.add_job(clear_token_task.execute, trigger='interval', days=1, id='refresh_token_cleaning')
 
     lifespan.add_starting_task(scheduler.start)
     lifespan.add_shutdown_task(scheduler.shutdown)
 
     app.mount('/static', static_files, name='static')
-    view_routers = [MainViewRouter()]
     for router in view_routers:
         log.debug(f'register view router: {router}')
         app.include_router(router.router)
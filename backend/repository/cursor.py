@@ -0,0 +1,59 @@
+import json
+import base64
+
+from pydantic import TypeAdapter
+
+from .exceptions import InvalidCursor
+
+
+def encode_cursor(values: list, total: tuple[int, bool] = None) -> str:
+    """ Pack keyset values into an opaque url safe cursor
+    :param values: values of the order attributes of the last item on the page
+    :param total: total count of items and whether it is an estimate. Carried to the next pages, so they are
+    not counted again
+    :return: cursor string
+    """
+    payload = values if total is None else {'after': values, 'total': total[0], 'estimate': total[1]}
+    raw = json.dumps(payload, default=str, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def decode_cursor(cursor: str, model_type, keys: list[str]) -> list:
+    """ Unpack keyset values from an opaque cursor and convert them to the model attribute types
+    :param cursor: cursor string made by encode_cursor
+    :param model_type: model type the cursor belongs to. Must be inherited from SQLModel
+    :param keys: order attributes of model_type
+    :return: list of values in the keys order
+    :raises InvalidCursor: if cursor is malformed or does not match keys
+    """
+    try:
+        payload = _load(cursor)
+        values = payload.get('after') if isinstance(payload, dict) else payload
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise InvalidCursor(cursor)
+        return [TypeAdapter(model_type.model_fields[key].annotation).validate_python(value)
+                for key, value in zip(keys, values)]
+    except ValueError:
+        raise InvalidCursor(cursor)
+
+
+def decode_cursor_total(cursor: str) -> tuple[int, bool] | None:
+    """ Unpack total carried by an opaque cursor
+    :param cursor: cursor string made by encode_cursor
+    :return: total count of items and whether it is an estimate. None if the cursor does not carry total
+    :raises InvalidCursor: if cursor is malformed
+    """
+    try:
+        payload = _load(cursor)
+    except ValueError:
+        raise InvalidCursor(cursor)
+    if not isinstance(payload, dict):
+        return None
+    total, estimate = payload.get('total'), payload.get('estimate')
+    if type(total) is not int or total < 0 or not isinstance(estimate, bool):
+        raise InvalidCursor(cursor)
+    return total, estimate
+
+
+def _load(cursor: str):
+    return json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
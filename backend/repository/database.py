@@ -1,17 +1,103 @@
 import asyncio
+import time
 
-from sqlmodel import SQLModel, select, and_, or_
-from sqlalchemy.orm import selectinload
-from typing import Iterable
+from sqlmodel import SQLModel, select, and_, tuple_
+from sqlalchemy import insert, update, delete, inspect, values, column, any_, bindparam, ARRAY, Integer
+from sqlalchemy import func, cast, null, literal_column, table as table_clause, Text, BigInteger
+from sqlalchemy.dialects.postgresql import aggregate_order_by, REGCLASS, insert as pg_insert
+from sqlalchemy import event
+from sqlalchemy.orm import Session, selectinload, lazyload, raiseload
+from sqlalchemy.orm.attributes import set_committed_value
+from typing import Iterable, AsyncIterator, get_args
+from pydantic import BaseModel
+
+from .exceptions import InvalidQuery
+from .statements import StatementCache
+from .unitofwork import in_unit_of_work
+
+
+# Max rows per one multi-row statement. Keeps bind parameters count under the driver limit
+BATCH_PAGE_SIZE = 1000
+
+# Max count of cached select templates
+STATEMENT_CACHE_SIZE = 512
+
+# Rows fetched from a server-side cursor at once by streaming reads
+STREAM_PAGE_SIZE = 500
+
+# Tables with more estimated rows are not counted for totals without filters, the estimate is used
+COUNT_ESTIMATE_THRESHOLD = 100_000
+
+# Seconds to keep table row estimate
+COUNT_ESTIMATE_TTL = 60
+READ_REPLICA = 'read_replica'
+WRITTEN = 'written'
 
 
 def _is_collection(obj):
     return isinstance(obj, Iterable) and not isinstance(obj, str) and not isinstance(obj, SQLModel)
 
 
+def _chunks(items: list, size: int) -> Iterable[list]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _public_model(annotation):
+    """ Get model type from a field annotation: list[FilePublic] or FilePublic | None -> FilePublic """
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    for argument in get_args(annotation):
+        model = _public_model(argument)
+        if model is not None:
+            return model
+    return None
+
+
+def _like_prefix(value: str) -> str:
+    """ Escape LIKE wildcards in value and make a prefix pattern from it """
+    return value.replace('/', '//').replace('%', '/%').replace('_', '/_') + '%'
+
+
+# Filter operators. key - operator name used in filters, value - condition factory of attribute and bind parameter
+FILTER_OPERATORS = {
+    'eq': lambda attr, param: attr == param,
+    'ne': lambda attr, param: attr != param,
+    'in': lambda attr, param: attr == any_(param),
+    'gt': lambda attr, param: attr > param,
+    'gte': lambda attr, param: attr >= param,
+    'lt': lambda attr, param: attr < param,
+    'lte': lambda attr, param: attr <= param,
+    'like': lambda attr, param: attr.like(param, escape='/'),
+    'is_null': None,
+}
+
+
+def _route_to_replica(orm_execute_state) -> None:
+    """ Session execute hook. Binds statements executed with READ_REPLICA option to the replica engine.
+    The option is propagated to relationship loads, so eager loaded items are read from the replica too
+    """
+    replica = orm_execute_state.execution_options.get(READ_REPLICA)
+    if replica is not None:
+        orm_execute_state.bind_arguments['bind'] = replica
+
+
 class AsyncRepository:
     """ Class for async CRUD operations with database """
-    async def get_items(self, session, model_type, *, filters=None, limit=None, offset=None) -> list[SQLModel]:
+    def __init__(self, replica=None):
+        """ Initialize
+        :param replica: optional async engine of a read replica. Reads of get_items, get_fields, get_json, count and
+        streams are routed to it, writes and get_for_update stay on the session engine. Reads of a session that
+        has written or has an opened unit of work stay on the session engine too, so they see own writes
+        """
+        self.statements = StatementCache(STATEMENT_CACHE_SIZE)
+        self.estimates = {}
+        self.replica = replica
+        if replica is not None and not event.contains(Session, 'do_orm_execute', _route_to_replica):
+            event.listen(Session, 'do_orm_execute', _route_to_replica)
+
+    async def get_items(self, session, model_type, *, filters=None, limit=None, offset=None,
+                        order_by=None, after=None, expand=None, with_total=False) -> list[SQLModel] | tuple:
         """
         Get item collection
         :param session: Opened session for database interaction
@@ -19,18 +105,31 @@ class AsyncRepository:
         :param filters: dict with filters. key - is a model attribute as string, value - item or collection for compare
         :param limit: count of request item from DB
         :param offset: offset relative to the first element in the query
-        :return: collection of model items less than or equal to the limit
+        :param order_by: model attributes as string used to sort items. Must be unique in combination
+        :param after: values of the order_by attributes. If not None return only items placed after them (keyset seek)
+        :param expand: relationships to load. Nested relationships are separated by dots: 'apartments.items'.
+        Eager relationships that are not expanded are not loaded and set empty
+        :param with_total: also count all items matching filters in the same query. See _get_with_total
+        :return: collection of model items less than or equal to the limit.
+        tuple[collection, total, total is estimate] if with_total
+
+        :raise InvalidQuery: if expand contains unknown relationship
         """
-        conditions = self._to_model_conditions(model_type, filters)
-        return await self.get(model_type,
-                              session=session,
-                              conditions=conditions,
-                              limit=limit,
-                              offset=offset,
-                              options=None,
-                              for_update=False)
+        tree = self._to_expand_tree(model_type, expand)
+        if with_total:
+            items, total, estimated = await self._get_with_total(model_type, session=session, model_type=model_type,
+                                                                 filters=filters, limit=limit, offset=offset,
+                                                                 order_by=order_by, after=after, expand=tree)
+            self._set_unexpanded_empty(model_type, items, tree)
+            return items, total, estimated
+
+        items = await self.get_template(model_type, session=session, model_type=model_type, filters=filters,
+                                        limit=limit, offset=offset, order_by=order_by, after=after, expand=tree)
+        self._set_unexpanded_empty(model_type, items, tree)
+        return items
 
-    async def get_fields(self, session, model_type, *fields, filters=None, limit=None, offset=None):
+    async def get_fields(self, session, model_type, *fields, filters=None, limit=None, offset=None,
+                         order_by=None, after=None, with_total=False):
         """
         Get model fields collection
         :param session: Opened session for database interaction
@@ -39,16 +138,254 @@ class AsyncRepository:
         :param filters: dict with filters. key - is a model attribute as string, value - item or collection for compare
         :param limit: count of request item from DB
         :param offset: offset relative to the first element in the query
-        :return: collection of dict with model fields. Result size less than or equal to the limit
+        :param order_by: model attributes as string used to sort items. Must be unique in combination
+        :param after: values of the order_by attributes. If not None return only items placed after them (keyset seek)
+        :param with_total: also count all items matching filters in the same query. See _get_with_total
+        :return: collection of dict with model fields. Result size less than or equal to the limit.
+        tuple[collection, total, total is estimate] if with_total
+        """
+        if with_total:
+            return await self._get_with_total(*fields, session=session, model_type=model_type, filters=filters,
+                                              limit=limit, offset=offset, order_by=order_by, after=after)
+        return await self.get_template(*fields, session=session, model_type=model_type, filters=filters,
+                                       limit=limit, offset=offset, order_by=order_by, after=after)
+
+    async def count(self, session, model_type, *, filters=None) -> int:
+        """
+        Count items
+        :param session: Opened session for database interaction
+        :param model_type: model type for count. Must be inherited from SQLModel
+        :param filters: dict with filters. See _normalize_filters
+        :return: count of items matching filters
+        """
+        filters = self._normalize_filters(filters)
+        key = ('count', model_type, tuple((name, op, value if op == 'is_null' else None) for name, op, value in filters))
+
+        def build():
+            return self._select(func.count(), conditions=self._to_model_conditions(model_type, filters), limit=None,
+                                offset=None, options=None, for_update=False).select_from(model_type)
+
+        result = await self._execute(session, self.statements.get(key, build), self._to_filter_params(filters),
+                                     self._read_options(session))
+        return result[0]
+
+    async def estimate_count(self, session, model_type) -> int | None:
+        """
+        Get estimated count of table rows from PostgreSQL statistics (pg_class.reltuples). The estimate is cached
+        for COUNT_ESTIMATE_TTL seconds
+        :param session: Opened session for database interaction
+        :param model_type: model type. Must be inherited from SQLModel
+        :return: estimated count or None if the table has never been analyzed
+        """
+        table = model_type.__tablename__
+        cached = self.estimates.get(table)
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+
+        statement = (select(cast(column('reltuples'), BigInteger))
+                     .select_from(table_clause('pg_class'))
+                     .where(column('oid') == cast(bindparam('table', table), REGCLASS)))
+        result = await self._execute(session, statement, execution_options=self._read_options(session))
+        estimate = result[0] if result and result[0] >= 0 else None
+        self.estimates[table] = (estimate, time.monotonic() + COUNT_ESTIMATE_TTL)
+        return estimate
+
+    async def _get_with_total(self, *args, session, model_type, filters, limit, offset, order_by, after,
+                              expand: dict = None) -> tuple[list, int, bool]:
+        """
+        Get items with count of all items matching filters in one query. The count is a 'count(*) OVER ()' column.
+        With keyset the count is a scalar subquery without keyset condition. Without filters, tables larger than
+        COUNT_ESTIMATE_THRESHOLD rows are not counted, the statistics estimate is returned instead
+        :return: tuple[collection of items, total, True if total is the statistics estimate]
+        """
+        if not filters:
+            estimate = await self.estimate_count(session, model_type)
+            if estimate is not None and estimate >= COUNT_ESTIMATE_THRESHOLD:
+                items = await self.get_template(*args, session=session, model_type=model_type, filters=filters,
+                                                limit=limit, offset=offset, order_by=order_by, after=after,
+                                                expand=expand)
+                return items, estimate, True
+
+        statement, params = self._to_template(*args, model_type=model_type, filters=filters, limit=limit,
+                                              offset=offset, order_by=order_by, after=after, expand=expand,
+                                              with_total=True)
+        rows = await self._execute(session, statement, params, self._read_options(session))
+        if not rows:
+            total = await self.count(session, model_type, filters=filters) if offset or after else 0
+            return [], total, False
+
+        items = [row[0] if len(args) == 1 else tuple(row[:-1]) for row in rows]
+        return items, rows[0][-1], False
+
+    async def get_template(self, *args, session, model_type, filters, limit, offset, order_by, after,
+                           expand: dict = None) -> list:
+        """
+        Get items using cached statement template. See _to_template
+        :param args: parameters for pass to select() instruction
+        :param session: Opened session for database interaction
+        :param model_type: model type for get. Must be inherited from SQLModel
+        :param filters: dict with filters. See _to_model_conditions
+        :param limit: count of request item from DB
+        :param offset: offset relative to the first element in the query
+        :param order_by: model attributes as string used to sort items
+        :param after: values of the order_by attributes of the last item on the previous page
+        :param expand: tree of relationships to load. See _to_expand_tree. Loader options are not used if None
+        :return: collection of items
+        """
+        statement, params = self._to_template(*args, model_type=model_type, filters=filters, limit=limit,
+                                              offset=offset, order_by=order_by, after=after, expand=expand)
+        return await self._execute(session, statement, params, self._read_options(session))
+
+    async def stream_items(self, session, model_type, *, filters=None, limit=None, offset=None,
+                           order_by=None, expand=None, page_size: int = STREAM_PAGE_SIZE) -> AsyncIterator[list]:
+        """
+        Stream item collection by pages using a server-side cursor. Only one page is kept in memory
+        :param session: Opened session for database interaction
+        :param model_type: model type for get. Must be inherited from SQLModel
+        :param filters: dict with filters. See get_items
+        :param limit: count of request item from DB
+        :param offset: offset relative to the first element in the query
+        :param order_by: model attributes as string used to sort items
+        :param expand: relationships to load. See get_items
+        :param page_size: count of items fetched from the cursor at once
+        :return: async iterator of item pages
+        """
+        tree = self._to_expand_tree(model_type, expand)
+        statement, params = self._to_template(model_type, model_type=model_type, filters=filters, limit=limit,
+                                              offset=offset, order_by=order_by, after=None, expand=tree)
+        result = await session.stream_scalars(statement, params,
+                                              execution_options={'yield_per': page_size, **self._read_options(session)})
+        async for page in result.partitions():
+            self._set_unexpanded_empty(model_type, page, tree)
+            yield page
+
+    async def stream_fields(self, session, model_type, *fields, filters=None, limit=None, offset=None,
+                            order_by=None, page_size: int = STREAM_PAGE_SIZE) -> AsyncIterator[list]:
+        """
+        Stream model fields by pages using a server-side cursor. Only one page is kept in memory
+        :param session: Opened session for database interaction
+        :param model_type: model type for get. Must be inherited from SQLModel
+        :param fields: fields for get of mode_type
+        :param filters: dict with filters. See get_fields
+        :param limit: count of request item from DB
+        :param offset: offset relative to the first element in the query
+        :param order_by: model attributes as string used to sort items
+        :param page_size: count of rows fetched from the cursor at once
+        :return: async iterator of row pages. Every row is a tuple of fields
+        """
+        statement, params = self._to_template(*fields, model_type=model_type, filters=filters, limit=limit,
+                                              offset=offset, order_by=order_by, after=None)
+        result = await session.stream(statement, params,
+                                      execution_options={'yield_per': page_size, **self._read_options(session)})
+        async for page in result.partitions():
+            yield page
+
+    def _to_template(self, *args, model_type, filters, limit, offset, order_by, after, expand: dict = None,
+                     with_total: bool = False) -> tuple:
+        """
+        Get cached statement template and its bind parameters. The template is built once per query shape:
+        selected columns, filter keys with operators, order, presence of limit, offset and keyset. Filter values,
+        limit, offset and keyset values are passed as bind parameters. If with_total, the last selected column
+        is count of all items matching filters
+        :return: tuple[statement, bind parameters]
+        """
+        filters = self._normalize_filters(filters)
+        order_by = tuple(order_by) if order_by else ()
+        key = (args, model_type, tuple((name, op, value if op == 'is_null' else None) for name, op, value in filters),
+               order_by, bool(limit), bool(offset), bool(after), self._to_tree_key(expand), with_total)
+
+        def build():
+            conditions = self._to_model_conditions(model_type, filters)
+            columns = args
+            if with_total and after:
+                total = (select(func.count()).select_from(model_type).where(*conditions).correlate(None)
+                         .scalar_subquery().label('total'))
+                columns = args + (total,)
+            elif with_total:
+                columns = args + (func.count().over().label('total'),)
+            conditions.extend(self._to_keyset_conditions(model_type, order_by, after))
+            return self._select(*columns,
+                                conditions=conditions,
+                                limit=bindparam('limit', limit, type_=Integer) if limit else None,
+                                offset=bindparam('offset', offset, type_=Integer) if offset else None,
+                                options=self._to_loader_options(model_type, expand) if expand is not None else None,
+                                for_update=False,
+                                order_by=self._to_order_clauses(model_type, order_by))
+
+        statement = self.statements.get(key, build)
+        params = self._to_filter_params(filters)
+        if limit:
+            params['limit'] = limit
+        if offset:
+            params['offset'] = offset
+        if after:
+            params.update({f'after_{i}': value for i, value in enumerate(after)})
+        return statement, params
+
+    async def get_json(self, session, model_type, public_type, *, filters=None, limit=None, offset=None,
+                       order_by=None, expand=None) -> str:
+        """
+        Get items as JSON array built by the database with json_build_object/json_agg (PostgreSQL only).
+        Every item is a public_type document. Expanded relationships are nested by correlated subqueries,
+        so items with all relationships are got by one statement and never hydrated to models
+        :param session: Opened session for database interaction
+        :param model_type: model type for get. Must be inherited from SQLModel
+        :param public_type: public model type. Its fields are document keys
+        :param filters: dict with filters. See _normalize_filters
+        :param limit: count of request item from DB
+        :param offset: offset relative to the first element in the query
+        :param order_by: model attributes as string used to sort items
+        :param expand: relationships to include. See _to_expand_tree. Not expanded relationships are empty
+        :return: JSON array as string
+
+        :raise InvalidQuery: if filters, order or expand are invalid
+        """
+        filters = self._normalize_filters(filters)
+        tree = self._to_expand_tree(model_type, expand)
+        order_by = tuple(order_by) if order_by else ()
+        key = ('json', model_type, public_type,
+               tuple((name, op, value if op == 'is_null' else None) for name, op, value in filters),
+               order_by, bool(limit), bool(offset), self._to_tree_key(tree))
+
+        def build():
+            order_clauses = self._to_order_clauses(model_type, order_by)
+            items = self._select(self._to_json_object(model_type, public_type, model_type.__table__, tree).label('document'),
+                                 func.row_number().over(order_by=order_clauses).label('position'),
+                                 conditions=self._to_model_conditions(model_type, filters),
+                                 limit=bindparam('limit', limit, type_=Integer) if limit else None,
+                                 offset=bindparam('offset', offset, type_=Integer) if offset else None,
+                                 options=None,
+                                 for_update=False,
+                                 order_by=order_clauses).subquery()
+            documents = func.json_agg(aggregate_order_by(items.c.document, items.c.position))
+            return select(cast(func.coalesce(documents, literal_column("'[]'::json")), Text))
+
+        statement = self.statements.get(key, build)
+        params = self._to_filter_params(filters)
+        if limit:
+            params['limit'] = limit
+        if offset:
+            params['offset'] = offset
+        result = await self._execute(session, statement, params, self._read_options(session))
+        return result[0]
+
+    async def get_related_fields(self, session, model_type, relationship: str, ids: list, *fields) -> list:
+        """
+        Get fields of items related to several parents with one joined query
+        :param session: Opened session for database interaction
+        :param model_type: parent model type. Must be inherited from SQLModel
+        :param relationship: name of the parent relationship
+        :param ids: parents id
+        :param fields: fields of the related model type
+        :return: collection of rows (parent id, *fields)
         """
-        conditions = self._to_model_conditions(model_type, filters)
-        return await self.get(*fields,
-                              session=session,
-                              conditions=conditions,
-                              limit=limit,
-                              offset=offset,
-                              options=None,
-                              for_update=False)
+        def build():
+            return (select(model_type.id, *fields)
+                    .join(getattr(model_type, relationship))
+                    .where(model_type.id == any_(bindparam('ids', type_=ARRAY(model_type.id.type)))))
+
+        statement = self.statements.get(('related', model_type, relationship, fields), build)
+        return await self._execute(session, statement, {'ids': list(ids)}, self._read_options(session))
 
     async def get_for_update(self, session, model_type, *, filters=None, limit=None, offset=None, selectin_fields=None) -> list[SQLModel]:
         """
@@ -58,43 +395,68 @@ class AsyncRepository:
         :param filters: dict with filters. key - is a model attribute as string, value - item or collection for compare
         :param limit: count of request item from DB
         :param offset: offset relative to the first element in the query
-        :param selectin_fields: list of fields that should be loaded immediately
+        :param selectin_fields: list of relationship attributes that should be loaded immediately.
+        Other eager relationships are not loaded and set empty
         :return: collection of model items less than or equal to the limit
         """
-        conditions = self._to_model_conditions(model_type, filters)
-        return await self.get(model_type,
-                              session=session,
-                              conditions=conditions,
-                              limit=limit,
-                              offset=offset,
-                              options=[selectinload(*selectin_fields)],
-                              for_update=True)
+        conditions = self._to_model_conditions(model_type, self._normalize_filters(filters))
+        tree = {field.key: {} for field in selectin_fields or []}
+        items = await self.get(model_type,
+                               session=session,
+                               conditions=conditions,
+                               limit=limit,
+                               offset=offset,
+                               options=self._to_loader_options(model_type, tree),
+                               for_update=True)
+        self._set_unexpanded_empty(model_type, items, tree)
+        return items
 
-    async def create(self, session, model_type, model=None, **kwargs) -> SQLModel:
+    async def create(self, session, model_type, model=None, commit: bool = True, **kwargs) -> SQLModel:
         """
         Create item. Use 'model' arg to create new item from prototype. Use kwargs if you want to create
         item from key-value arguments. The model arg has a higher priority.
         :param session: Opened session for database interaction
         :param model_type: model type for create. Must be inherited from SQLModel
         :param model: model prototype. Fields this model used for create item
+        :param commit: commit session changes. Pass False to continue the transaction
         :param kwargs: key-value model params used for create item
         :return: new created item
         """
         new = model if model else model_type(**kwargs)
-        created = await self.create_all(session, model_type, [new])
+        created = await self.create_all(session, model_type, [new], commit=commit)
         return created[0]
 
-    async def create_all(self, session, model_type, elements) -> list[SQLModel]:
+    async def create_all(self, session, model_type, elements, commit: bool = True) -> list[SQLModel]:
         """
-        Create item collection.
+        Create item collection with multi-row INSERT ... RETURNING statements.
         :param session: Opened session for database interaction
         :param model_type: model type for create. Must be inherited from SQLModel
         :param elements: collection of a model prototype. Fields of elements used for create items
+        :param commit: commit session changes. Pass False to continue the transaction
         :return: collection of created model items
         """
         new_items = [model_type.model_validate(el) for el in elements]
-        await self.add_and_commit(session, new_items)
-        return await self.refresh(session, new_items)
+        created = await self.insert(session, model_type, new_items)
+        if commit:
+            await self.commit(session)
+        return created
+
+    async def create_if_absent(self, session, model_type, model, conflict_keys: list[str],
+                               commit: bool = True) -> SQLModel | None:
+        """
+        Create item with a single INSERT ... ON CONFLICT DO NOTHING RETURNING statement. Existence of the item
+        is checked by the database unique index, so concurrent creates of the same item do not race
+        :param session: Opened session for database interaction
+        :param model_type: model type for create. Must be inherited from SQLModel
+        :param model: model prototype. Fields this model used for create item
+        :param conflict_keys: columns of the unique index that identifies the item
+        :param commit: commit session changes. Pass False to continue the transaction
+        :return: new created item or None if the item with the same conflict keys already exists
+        """
+        created = await self.insert(session, model_type, [model_type.model_validate(model)], conflict_keys)
+        if commit and created:
+            await self.commit(session)
+        return created[0] if created else None
 
     async def update(self, session, updatable, model=None, **kwargs) -> SQLModel:
         """
@@ -109,26 +471,107 @@ class AsyncRepository:
         if model is None:
             model = updatable.__class__(**kwargs)
 
-        await self.update_all(session, [updatable], [model])
+        exclude_fields = set(model.model_fields.keys()) - set(updatable.model_fields.keys())
+        exclude_fields.add('id')
+        data = model.model_dump(exclude_unset=True, exclude_none=True, exclude=exclude_fields)
+        for key, val in data.items():
+            setattr(updatable, key, val)
+
+        await self.add_and_commit(session, updatable)
+        await self.refresh(session, updatable)
         return updatable
 
-    async def update_all(self, session, updatable_items, updates) -> list[SQLModel]:
+    async def update_all(self, session, model_type, updates, commit: bool = True,
+                         expand: list[str] = None) -> list[SQLModel | None]:
         """
-        Update item collection. Collection 'updatable_items' will be matched to collection 'updates' to apply updates
+        Update item collection by id with UPDATE ... FROM (VALUES ...) RETURNING statements. Items are not loaded
+        before update. Updates setting the same fields share one statement
         :param session: Opened session for database interaction
-        :param updatable_items: Collection of items for update.
-        :param updates: collection of prototypes for updating.
-        :return: collection of updated items
+        :param model_type: model type for update. Must be inherited from SQLModel
+        :param updates: collection of prototypes for updating. Field id is required, set fields used to update
+        :param commit: commit session changes. Pass False to continue the transaction
+        :param expand: relationships to load with updated items. Eager relationships that are not expanded
+        are not loaded and set empty
+        :return: collection of updated items in the updates order. Item is None if its id does not exist
         """
-        for item, update in zip(updatable_items, updates):
-            exclude_fields = set(update.model_fields.keys()) - set(item.model_fields.keys())
-            exclude_fields.add('id')
-            data = update.model_dump(exclude_unset=True, exclude_none=True, exclude=exclude_fields)
-            for key, val in data.items():
-                setattr(item, key, val)
+        updated = await self.update_rows(session, model_type, updates, expand)
+        if commit:
+            await self.commit(session)
+        return updated
 
-        await self.add_and_commit(session, updatable_items)
-        return await self.refresh(session, updatable_items)
+    async def update_by_id(self, session, model_type, uid, model, commit: bool = True,
+                           expand: list[str] = None) -> SQLModel | None:
+        """
+        Update existing item by id with a single UPDATE ... RETURNING statement. The item is not loaded before update
+        :param session: Opened session for database interaction
+        :param model_type: model type for update. Must be inherited from SQLModel
+        :param uid: id of the updatable item
+        :param model: model prototype. Set fields of this model used for update item
+        :param commit: commit session changes. Pass False to continue the transaction
+        :param expand: relationships to load with updated item. Eager relationships that are not expanded
+        are not loaded and set empty, so the update cost does not depend on the size of related data
+        :return: updated item or None if item with uid does not exist
+
+        :raise InvalidQuery: if expand contains unknown relationship
+        """
+        data = self._to_column_values(model_type, model)
+        tree = self._to_expand_tree(model_type, expand)
+        options = self._to_loader_options(model_type, tree)
+        try:
+            if data:
+                statement = (update(model_type)
+                             .where(model_type.id == uid)
+                             .values(**data)
+                             .returning(model_type)
+                             .options(*options)
+                             .execution_options(populate_existing=True))
+                items = (await session.exec(statement)).scalars().all()
+            else:
+                items = await self.get(model_type, session=session, conditions=[model_type.id == uid],
+                                       limit=None, offset=None, options=options, for_update=False)
+        except Exception as e:
+            await session.rollback()
+            raise e
+
+        self._set_unexpanded_empty(model_type, items, tree)
+
+        if commit:
+            await self.commit(session)
+        return items[0] if items else None
+
+    async def delete_by_id(self, session, model_type, uid) -> SQLModel | None:
+        """
+        Delete existing item by id with a single DELETE ... RETURNING statement. The item is not loaded before delete,
+        child rows are removed by the database foreign key cascade
+        :param session: Opened session for database interaction
+        :param model_type: model type for delete. Must be inherited from SQLModel
+        :param uid: id of the item to delete
+        :return: deleted item built from the returned row or None if item with uid does not exist
+        """
+        statement = delete(model_type).where(model_type.id == uid).returning(*model_type.__table__.columns)
+        try:
+            row = (await session.exec(statement)).first()
+        except Exception as e:
+            await session.rollback()
+            raise e
+
+        await self.commit(session)
+        return model_type(**row._mapping) if row else None
+
+    async def delete_all(self, session, model_type, uids, commit: bool = True) -> list:
+        """
+        Delete items by id with DELETE ... WHERE id IN (...) RETURNING statements. Items are not loaded before delete,
+        child rows are removed by the database foreign key cascade
+        :param session: Opened session for database interaction
+        :param model_type: model type for delete. Must be inherited from SQLModel
+        :param uids: collection of item ids to delete
+        :param commit: commit session changes. Pass False to continue the transaction
+        :return: collection of deleted ids
+        """
+        deleted = await self.delete_rows(session, model_type, uids)
+        if commit:
+            await self.commit(session)
+        return deleted
 
     async def delete(self, session, to_delete) -> None:
         """
@@ -150,6 +593,107 @@ class AsyncRepository:
         await asyncio.gather(*[session.refresh(el) for el in to_refresh])
         return items
 
+    @staticmethod
+    async def insert(session, model_type, items, conflict_keys: list[str] = None) -> list[SQLModel]:
+        """
+        Facade for insert items into database with a single INSERT ... RETURNING statement
+        :param session: opened database session
+        :param model_type: model type for insert. Must be inherited from SQLModel
+        :param items: collection of validated model_type items
+        :param conflict_keys: columns of a unique index. If set, items conflicting on them are skipped
+        with ON CONFLICT DO NOTHING and are not returned
+        :return: collection of inserted items attached to the session in the same order
+        """
+        if not items:
+            return []
+
+        columns = model_type.__table__.columns.keys()
+        rows = [{key: getattr(item, key) for key in columns} for item in items]
+        if conflict_keys:
+            statement = pg_insert(model_type).on_conflict_do_nothing(index_elements=conflict_keys)
+            statement = statement.returning(model_type).options(lazyload('*'))
+        else:
+            statement = insert(model_type).returning(model_type, sort_by_parameter_order=True).options(lazyload('*'))
+        try:
+            created = (await session.exec(statement, params=rows)).scalars().all()
+        except Exception as e:
+            await session.rollback()
+            raise e
+
+        # A just inserted row can not have related rows, so relationships are set empty instead of loading them
+        relationships = inspect(model_type).relationships
+        for item in created:
+            for rel in relationships:
+                set_committed_value(item, rel.key, [] if rel.uselist else None)
+        return created
+
+    @staticmethod
+    async def update_rows(session, model_type, updates, expand: list[str] = None) -> list[SQLModel | None]:
+        """
+        Facade for update items by id. Updates are grouped by the set of updatable columns,
+        every group is applied with UPDATE ... FROM (VALUES ...) RETURNING statement
+        :param session: opened database session
+        :param model_type: model type for update. Must be inherited from SQLModel
+        :param updates: collection of prototypes for updating
+        :param expand: relationships to load with updated items. Other eager relationships are set empty
+        :return: collection of updated items in the updates order. Item is None if its id does not exist
+        """
+        tree = AsyncRepository._to_expand_tree(model_type, expand)
+        options = AsyncRepository._to_loader_options(model_type, tree)
+        groups = {}
+        for model in updates:
+            data = AsyncRepository._to_column_values(model_type, model)
+            groups.setdefault(tuple(data.keys()), []).append([model.id, *data.values()])
+
+        table = model_type.__table__
+        found = {}
+        try:
+            for keys, rows in groups.items():
+                for chunk in _chunks(rows, BATCH_PAGE_SIZE):
+                    if keys:
+                        source = (values(column('id', table.c.id.type), *[column(key, table.c[key].type) for key in keys],
+                                         name='batch')
+                                  .data([tuple(row) for row in chunk]))
+                        statement = (update(model_type)
+                                     .where(model_type.id == source.c.id)
+                                     .values({key: source.c[key] for key in keys})
+                                     .returning(model_type)
+                                     .options(*options)
+                                     .execution_options(populate_existing=True, synchronize_session=False))
+                        items = (await session.exec(statement)).scalars().all()
+                    else:
+                        items = await AsyncRepository.get(model_type, session=session,
+                                                          conditions=[model_type.id.in_([row[0] for row in chunk])],
+                                                          limit=None, offset=None, options=options, for_update=False)
+                    found.update({item.id: item for item in items})
+        except Exception as e:
+            await session.rollback()
+            raise e
+
+        AsyncRepository._set_unexpanded_empty(model_type, list(found.values()), tree)
+
+        return [found.get(model.id) for model in updates]
+
+    @staticmethod
+    async def delete_rows(session, model_type, uids) -> list:
+        """
+        Facade for delete items by id with DELETE ... RETURNING statements
+        :param session: opened database session
+        :param model_type: model type for delete. Must be inherited from SQLModel
+        :param uids: collection of item ids to delete
+        :return: collection of deleted ids
+        """
+        deleted = []
+        try:
+            for chunk in _chunks(list(uids), BATCH_PAGE_SIZE):
+                statement = delete(model_type).where(model_type.id.in_(chunk)).returning(model_type.id)
+                deleted.extend((await session.exec(statement)).scalars().all())
+        except Exception as e:
+            await session.rollback()
+            raise e
+
+        return deleted
+
     @staticmethod
     async def add_and_commit(session, data) -> None:
         """
@@ -162,7 +706,8 @@ class AsyncRepository:
         await AsyncRepository.commit(session)
 
     @staticmethod
-    async def get(*args, session, conditions: list, limit: int, offset: int, options: list, for_update: bool) -> list[SQLModel]:
+    async def get(*args, session, conditions: list, limit: int, offset: int, options: list, for_update: bool,
+                  order_by: list = None) -> list[SQLModel]:
         """
         Facade for get item/items from database.
         :param args: parameters for pass to select() instruction
@@ -172,23 +717,65 @@ class AsyncRepository:
         :param offset: offset relative to the first element in the query
         :param options: collection of options used in 'options' instruction
         :param for_update: use with_for_update instruction
+        :param order_by: collection of clauses used in 'order by' instruction
+        :return: collection of items
+        """
+        statement = AsyncRepository._select(*args, conditions=conditions, limit=limit or None, offset=offset or None,
+                                            options=options, for_update=for_update, order_by=order_by)
+        return await AsyncRepository._execute(session, statement)
+
+    @staticmethod
+    def _select(*args, conditions: list, limit, offset, options: list, for_update: bool, order_by: list = None):
+        """
+        Build select statement.
+        :param args: parameters for pass to select() instruction
+        :param conditions: collection of conditions used in 'where' instruction. All conditions concat from and_()
+        :param limit: count of request item from database or bind parameter. Not limited if None
+        :param offset: offset relative to the first element in the query or bind parameter. Not used if None
+        :param options: collection of options used in 'options' instruction
+        :param for_update: use with_for_update instruction
+        :param order_by: collection of clauses used in 'order by' instruction
+        :return: select statement
+        """
+        statement = select(*args)
+
+        if order_by:
+            statement = statement.order_by(*order_by)
+        if limit is not None:
+            statement = statement.limit(limit)
+        if offset is not None:
+            statement = statement.offset(offset)
+        if conditions:
+            statement = statement.where(and_(*conditions))
+        if options:
+            statement = statement.options(*options)
+        if for_update:
+            statement = statement.with_for_update()
+        return statement
+
+    def _read_options(self, session) -> dict:
+        """
+        Execution options of a read. Reads are routed to the replica if it is configured, unless the session
+        has written or has an opened unit of work (read your writes)
+        :param session: opened database session
+        :return: execution options
+        """
+        if self.replica is None or in_unit_of_work(session) or session.info.get(WRITTEN):
+            return {}
+        return {READ_REPLICA: self.replica.sync_engine}
+
+    @staticmethod
+    async def _execute(session, statement, params: dict = None, execution_options: dict = None) -> list:
+        """
+        Facade for execute select statement
+        :param session: Opened session for database interaction
+        :param statement: select statement
+        :param params: values of the statement bind parameters
+        :param execution_options: statement execution options
         :return: collection of items
         """
         try:
-            statement = select(*args)
-
-            if limit:
-                statement = statement.limit(limit)
-            if offset:
-                statement = statement.offset(offset)
-            if conditions:
-                statement = statement.where(and_(*conditions))
-            if options:
-                statement = statement.options(*options)
-            if for_update:
-                statement = statement.with_for_update()
-
-            res = await session.exec(statement)
+            res = await session.exec(statement, params=params, execution_options=execution_options or {})
             return list(res)
         except Exception as e:
             await session.rollback()
@@ -204,11 +791,12 @@ class AsyncRepository:
         """
         try:
             await asyncio.gather(*[session.delete(el) for el in items])
-            await session.commit()
         except Exception as e:
             await session.rollback()
             raise e
 
+        await AsyncRepository.commit(session)
+
     @staticmethod
     async def add(session, data) -> None:
         """
@@ -229,31 +817,288 @@ class AsyncRepository:
     @staticmethod
     async def commit(session) -> None:
         """
-        Commit session changed
+        Commit session changed. Changes are only flushed if the session has an opened unit of work,
+        the unit of work owner commits them once. Later reads of the session are not routed to the replica
         :param session: opened database session
         :return: None
         """
+        session.info[WRITTEN] = True
         try:
-            await session.commit()
+            if in_unit_of_work(session):
+                await session.flush()
+            else:
+                await session.commit()
         except Exception as e:
             await session.rollback()
             raise e
 
     @staticmethod
-    def _to_model_conditions(model_type, filters: dict) -> list:
+    def _normalize_filters(filters: dict | None) -> list[tuple]:
+        """
+        Convert filters to list of (attribute, operator, value). 'filters' keys must be equal of 'model' fields.
+        Filter value may be:
+            item - compare for equality
+            None - compare with NULL
+            collection - compare for equality with any of items
+            dict - key is an operator from FILTER_OPERATORS, value is an operand. All operators concat from and_()
+        :param filters: dict with filters. key - is a model attribute as string, value - item, collection or operators
+        :return: list of (attribute, operator, value). Empty list if filters is empty
+
+        :raise InvalidQuery: if operator is unknown or operand has invalid type
+        """
+        if not filters:
+            return []
+
+        result = []
+        for key, val in filters.items():
+            if isinstance(val, dict):
+                operators = val.items()
+            elif val is None:
+                operators = [('is_null', True)]
+            elif _is_collection(val):
+                operators = [('in', val)]
+            else:
+                operators = [('eq', val)]
+
+            for operator, operand in operators:
+                if operator not in FILTER_OPERATORS:
+                    raise InvalidQuery(f'unknown operator {operator}')
+                if operator == 'in':
+                    if not _is_collection(operand):
+                        raise InvalidQuery(f'{key} expected collection, got {operand}')
+                    operand = list(operand)
+                elif operator == 'like':
+                    if not isinstance(operand, str):
+                        raise InvalidQuery(f'{key} expected string, got {operand}')
+                    operand = _like_prefix(operand)
+                elif operator == 'is_null':
+                    operand = bool(operand)
+                result.append((key, operator, operand))
+        return result
+
+    @staticmethod
+    def _to_model_conditions(model_type, filters: list[tuple]) -> list:
         """
-        Convert filters to list of model conditions. 'filters' keys must be equal of 'model' fields
+        Convert normalized filters to list of model conditions. Every value is a named bind parameter,
+        so conditions with the same attributes and operators compile to the same statement.
+        Collections compile to attribute = ANY(:array) with one parameter for any collection size
         :param model_type: model type for create conditions. Must be inherited from SQLModel
-        :param filters: dict with filters. key - is a model attribute as string, value - item or collection for compare
+        :param filters: list of (attribute, operator, value) from _normalize_filters
         :return: list of conditions. Empty list if filters is empty
         """
-        if filters:
-            result = []
-            for key, val in filters.items():
-                if _is_collection(val):
-                    result.append(or_(*[getattr(model_type, key) == el for el in val]))
+        result = []
+        for key, operator, value in filters:
+            attr = getattr(model_type, key)
+            if operator == 'is_null':
+                result.append(attr.is_(None) if value else attr.is_not(None))
+            else:
+                param_type = ARRAY(attr.type) if operator == 'in' else attr.type
+                param = bindparam(AsyncRepository._param_name(key, operator), value, type_=param_type)
+                result.append(FILTER_OPERATORS[operator](attr, param))
+        return result
+
+    @staticmethod
+    def _param_name(key: str, operator: str) -> str:
+        return f'{key}_{operator}'
+
+    @staticmethod
+    def _to_filter_params(filters: list[tuple]) -> dict:
+        """ Get bind parameters of normalized filters """
+        return {AsyncRepository._param_name(key, operator): value
+                for key, operator, value in filters if operator != 'is_null'}
+
+    @staticmethod
+    def _to_column_values(model_type, model) -> dict:
+        """
+        Collect set and not None fields of the model prototype that are columns of the model_type, except id
+        :param model_type: model type for update. Must be inherited from SQLModel
+        :param model: model prototype
+        :return: dict with column-value
+        """
+        columns = set(model_type.__table__.columns.keys())
+        columns.discard('id')
+        return model.model_dump(exclude_unset=True, exclude_none=True, include=columns)
+
+    @staticmethod
+    def _to_order_clauses(model_type, order_by: list[str] | None) -> list:
+        """
+        Convert model attribute names to 'order by' clauses
+        :param model_type: model type for create clauses. Must be inherited from SQLModel
+        :param order_by: model attributes as string. Attribute with '-' prefix sorted in descending order
+        :return: list of clauses. Empty list if order_by is empty
+
+        :raise InvalidQuery: if attribute is not a model column
+        """
+        if not order_by:
+            return []
+
+        clauses = []
+        for key in order_by:
+            name = key.removeprefix('-')
+            if name not in model_type.__table__.columns:
+                raise InvalidQuery(f'unknown order field {name}')
+            attr = getattr(model_type, name)
+            clauses.append(attr.desc() if key.startswith('-') else attr)
+        return clauses
+
+    @staticmethod
+    def _to_expand_tree(model_type, expand: list[str] | None) -> dict:
+        """
+        Convert dotted relationship paths to a tree: ['apartments.items', 'images'] -> {'apartments': {'items': {}},
+        'images': {}}. Path '*' expands all relationships on all levels
+        :param model_type: root model type. Must be inherited from SQLModel
+        :param expand: relationship paths
+        :return: tree of relationships. Empty dict if expand is empty
+
+        :raise InvalidQuery: if path contains unknown relationship
+        """
+        if expand and '*' in expand:
+            return AsyncRepository._to_full_tree(model_type, ())
+
+        tree = {}
+        for path in expand or []:
+            node, node_type = tree, model_type
+            for key in path.split('.'):
+                relationship = inspect(node_type).relationships.get(key)
+                if relationship is None:
+                    raise InvalidQuery(f'unknown relationship {path}')
+                node = node.setdefault(key, {})
+                node_type = relationship.mapper.class_
+        return tree
+
+    @staticmethod
+    def _to_json_object(model_type, public_type, table, tree: dict):
+        """
+        Build json_build_object() of public_type fields for a row of table
+        :param model_type: model type of the table. Must be inherited from SQLModel
+        :param public_type: public model type. Its columns and relationships are object keys
+        :param table: model table or its alias
+        :param tree: tree of expanded relationships. Not expanded relationships are empty list or null
+        :return: json object expression
+        """
+        relationships = inspect(model_type).relationships
+        arguments = []
+        for name, field in public_type.model_fields.items():
+            if name in table.c:
+                value = table.c[name]
+            elif name in relationships:
+                relationship = relationships[name]
+                if name in tree:
+                    value = AsyncRepository._to_json_relationship(relationship, _public_model(field.annotation),
+                                                                  table, tree[name])
                 else:
-                    result.append(getattr(model_type, key) == val)
-            return result
+                    value = literal_column("'[]'::json") if relationship.uselist else null()
+            else:
+                continue
+            arguments.extend([literal_column(f"'{name}'"), value])
+        return func.json_build_object(*arguments)
+
+    @staticmethod
+    def _to_json_relationship(relationship, public_type, parent, tree: dict):
+        """
+        Build correlated subquery of related json objects: json array for collections, json object for scalars
+        :param relationship: relationship property of the parent model
+        :param public_type: public model type of related items
+        :param parent: parent table or its alias
+        :param tree: tree of expanded relationships of related items
+        :return: scalar subquery
+        """
+        target_type = relationship.mapper.class_
+        target = target_type.__table__.alias()
+        document = AsyncRepository._to_json_object(target_type, public_type, target, tree)
+        if relationship.uselist:
+            document = func.coalesce(func.json_agg(document), literal_column("'[]'::json"))
+
+        statement = select(document).select_from(target)
+        if relationship.secondary is not None:
+            secondary = relationship.secondary.alias()
+            statement = (statement
+                         .join(secondary, and_(*[target.c[target_column.key] == secondary.c[link_column.key]
+                                                 for target_column, link_column
+                                                 in relationship.secondary_synchronize_pairs]))
+                         .where(*[secondary.c[link_column.key] == parent.c[parent_column.key]
+                                  for parent_column, link_column in relationship.synchronize_pairs]))
         else:
+            statement = statement.where(*[target.c[remote.key] == parent.c[local.key]
+                                          for local, remote in relationship.local_remote_pairs])
+        if not relationship.uselist:
+            statement = statement.limit(1)
+        return statement.scalar_subquery()
+
+    @staticmethod
+    def _to_full_tree(model_type, parents: tuple) -> dict:
+        """ Build tree of all relationships. Relationships back to a parent model are skipped """
+        parents = parents + (model_type,)
+        return {relationship.key: AsyncRepository._to_full_tree(relationship.mapper.class_, parents)
+                for relationship in inspect(model_type).relationships
+                if relationship.mapper.class_ not in parents}
+
+    @staticmethod
+    def _to_tree_key(tree: dict | None) -> tuple | None:
+        if tree is None:
+            return None
+        return tuple(sorted((key, AsyncRepository._to_tree_key(node)) for key, node in tree.items()))
+
+    @staticmethod
+    def _to_loader_options(model_type, tree: dict) -> list:
+        """
+        Convert relationship tree to loader options. Expanded relationships are loaded by selectinload,
+        relationships declared as eager and not expanded are replaced by raiseload on every loaded level
+        :param model_type: model type for create options. Must be inherited from SQLModel
+        :param tree: tree of relationships from _to_expand_tree
+        :return: list of loader options
+        """
+        options = []
+        for relationship in inspect(model_type).relationships:
+            attr = getattr(model_type, relationship.key)
+            if relationship.key in tree:
+                nested = AsyncRepository._to_loader_options(relationship.mapper.class_, tree[relationship.key])
+                options.append(selectinload(attr).options(*nested) if nested else selectinload(attr))
+            elif relationship.lazy == 'selectin':
+                options.append(raiseload(attr))
+        return options
+
+    @staticmethod
+    def _set_unexpanded_empty(model_type, items: list, tree: dict) -> None:
+        """
+        Set not loaded eager relationships of items to empty values (empty list or None) without database access,
+        so not expanded relationships serialize as empty
+        :param model_type: type of items. Must be inherited from SQLModel
+        :param items: loaded items
+        :param tree: tree of expanded relationships from _to_expand_tree
+        """
+        for relationship in inspect(model_type).relationships:
+            if relationship.key in tree:
+                nested = [related for item in items
+                          for related in AsyncRepository._as_list(getattr(item, relationship.key))]
+                AsyncRepository._set_unexpanded_empty(relationship.mapper.class_, nested, tree[relationship.key])
+            elif relationship.lazy == 'selectin':
+                for item in items:
+                    if relationship.key in inspect(item).unloaded:
+                        set_committed_value(item, relationship.key, [] if relationship.uselist else None)
+
+    @staticmethod
+    def _as_list(value) -> list:
+        if value is None:
+            return []
+        return value if isinstance(value, list) else [value]
+
+    @staticmethod
+    def _to_keyset_conditions(model_type, order_by: list[str] | None, after: list | None) -> list:
+        """
+        Convert keyset values to a seek condition: (key1, key2, ...) > (value1, value2, ...).
+        The condition is served by the index on the order_by attributes, so every page costs the same
+        :param model_type: model type for create conditions. Must be inherited from SQLModel
+        :param order_by: model attributes as string used to sort items
+        :param after: values of the order_by attributes of the last item on the previous page
+        :return: list of conditions. Empty list if after is empty
+        """
+        if not order_by or not after:
             return []
+
+        params = [bindparam(f'after_{i}', value, type_=getattr(model_type, key).type)
+                  for i, (key, value) in enumerate(zip(order_by, after))]
+        if len(order_by) == 1:
+            return [getattr(model_type, order_by[0]) > params[0]]
+        else:
+            return [tuple_(*[getattr(model_type, key) for key in order_by]) > tuple_(*params)]
\ No newline at end of file
@@ -19,3 +19,15 @@ class InvalidSlug(DatabaseException):
     """ Invalid slug exception """
     def __init__(self, slug):
         DatabaseException.__init__(self, f'Invalid slug: {slug}')
+
+
+class InvalidCursor(DatabaseException):
+    """ Invalid pagination cursor exception """
+    def __init__(self, cursor):
+        DatabaseException.__init__(self, f'Invalid cursor: {cursor}')
+
+
+class InvalidQuery(DatabaseException):
+    """ Invalid query exception. Thrown when filters or order can not be compiled to a query """
+    def __init__(self, reason):
+        DatabaseException.__init__(self, f'Invalid query: {reason}')
@@ -0,0 +1,81 @@
+from .unitofwork import in_unit_of_work, end_unit_of_work
+
+
+class LazySession:
+    """ Proxy of a database session. The session is created on first use, so requests which do not query
+    the database do not make it, and it can be released as soon as the database work of a request is done,
+    e.g. before a slow password check or a file download. A released proxy creates a new session on next use.
+    All other attributes are taken from the proxied session
+    """
+    def __init__(self, factory, on_release=None):
+        """ Initializer
+        :param factory: database session class
+        :param on_release: callback called when the database work is released, e.g. freeing an admission slot
+        """
+        self._factory = factory
+        self._on_release = on_release
+        self._session = None
+        self._info = {}
+
+    @property
+    def info(self) -> dict:
+        """ Session info. It is kept by the proxy until the session is created and after it is released """
+        return self._session.info if self._session is not None else self._info
+
+    @property
+    def acquired(self) -> bool:
+        """ True if the proxied session is created and not released """
+        return self._session is not None
+
+    def __getattr__(self, name: str):
+        if self._session is None:
+            self._session = self._factory()
+            self._session.info.update(self._info)
+        return getattr(self._session, name)
+
+    async def commit(self) -> None:
+        """ Commit the session if it is created """
+        if self._session is not None:
+            await self._session.commit()
+
+    async def rollback(self) -> None:
+        """ Roll back the session if it is created """
+        if self._session is not None:
+            await self._session.rollback()
+
+    async def close(self) -> None:
+        """ Close the session if it is created """
+        if self._session is not None:
+            await self._session.close()
+
+    async def release(self) -> None:
+        """ Finish the database work of the request and return the connection to the pool. An opened unit
+        of work is committed first, loaded models stay usable without the session
+        """
+        try:
+            if self._session is not None:
+                session, self._session = self._session, None
+                try:
+                    await release_session(session)
+                finally:
+                    self._info = dict(session.info)
+        finally:
+            if self._on_release is not None:
+                self._on_release()
+
+
+async def release_session(session) -> None:
+    """ Finish the database work on the session and return its connection to the pool before a slow
+    operation without database, e.g. password hashing. An opened unit of work is committed first.
+    The session opens a new connection on next use
+    :param session: opened database session or LazySession
+    """
+    if isinstance(session, LazySession):
+        await session.release()
+        return
+
+    try:
+        if in_unit_of_work(session):
+            await end_unit_of_work(session, commit=True)
+    finally:
+        await session.close()
@@ -1,4 +1,5 @@
 from .base import ModelManager
+from .filelink import FileLinkManager
 from .apartimage import ApartImageManager
 from .apartment import ApartmentManager
 from .project import ProjectManager
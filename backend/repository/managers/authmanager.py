@@ -29,13 +29,13 @@ class AuthModelManager:
         items = await self.user_manager.get(session=session, filters=filters)
         return items[0] if items else None
 
-    async def create_user(self, session, new_user: User) -> SQLModel:
-        """ Create new user and return it
+    async def create_user(self, session, new_user: User) -> SQLModel | None:
+        """ Create new user and return it. Uniqueness of the login is checked by the database in the same statement
         :param session: opened database session
         :param new_user: user to create
-        :return created User
+        :return created User or None if the login is already used
         """
-        return await self.user_manager.create(session=session, new_model=new_user)
+        return await self.user_manager.create_if_absent(session=session, new_model=new_user, conflict_keys=['login'])
 
     async def get_token(self, session, token: str) -> SQLModel | None:
         """ Get token record by token string
@@ -1,9 +1,12 @@
 import uuid
 from sqlmodel import SQLModel
+from sqlalchemy import inspect
 
-from typing import Iterable
+from typing import Iterable, AsyncIterator
+from pydantic import TypeAdapter, ValidationError
 
-from ..exceptions import EntityNotFound
+from ..exceptions import EntityNotFound, InvalidQuery
+from ..cursor import encode_cursor, decode_cursor, decode_cursor_total
 
 
 class ModelManager:
@@ -16,27 +19,55 @@ class ModelManager:
         """
         self.repo = repo
         self.model = model_type
+        self.order_keys = ['id']
 
     async def create(self, session, new_model: SQLModel) -> SQLModel:
         """
-        Create new item and return it
+        Create new item with its links and return it. Changes are committed once
         :param session: opened database session
         :param new_model: item prototype to create
         :return: created item
         """
-        return await self.repo.create(session, self.model, model=new_model)
+        created = await self.repo.create(session, self.model, model=new_model, commit=False)
+        await self._set_links(session, [created], [new_model])
+        await self.commit(session)
+        return created
 
-    async def update(self, session, update_model: SQLModel) -> SQLModel:
+    async def create_if_absent(self, session, new_model: SQLModel, conflict_keys: list[str]) -> SQLModel | None:
         """
-        Update existing item.
+        Create new item with its links if no item with the same unique keys exists. Changes are committed once
+        :param session: opened database session
+        :param new_model: item prototype to create
+        :param conflict_keys: fields of the unique index that identifies the item
+        :return: created item or None if the item already exists
+        """
+        created = await self.repo.create_if_absent(session, self.model, new_model, conflict_keys, commit=False)
+        if created is None:
+            return None
+        await self._set_links(session, [created], [new_model])
+        await self.commit(session)
+        return created
+
+    async def update(self, session, update_model: SQLModel, expand: list[str] = None) -> SQLModel:
+        """
+        Update existing item with its links. Changes are committed once. Only the relationships replaced by the
+        update and the expanded ones are loaded
         :param session: opened database session
         :param update_model: item prototype to update. Field id is required, another fields used to update
+        :param expand: relationships to load, nested relationships are separated by dots.
+        Other eager relationships are empty
         :return: updated item
 
-        :raise EntityNotFound: if update_model.id not exists
+        :raise EntityNotFound: if update_model.id not exists. Nothing is committed in this case
         """
-        updatable = await self.get_by_id(session, update_model.id)
-        return await self.repo.update(session, updatable, model=update_model)
+        expand = [*(expand or []), *self._link_relationships([update_model])]
+        updated = await self.repo.update_by_id(session, self.model, update_model.id, model=update_model, commit=False,
+                                               expand=expand)
+        if updated is None:
+            raise EntityNotFound(self.model)
+        await self._set_links(session, [updated], [update_model])
+        await self.commit(session)
+        return updated
 
     async def delete(self, session, model_id: uuid.UUID) -> SQLModel:
         """
@@ -47,10 +78,42 @@ class ModelManager:
 
         :raise EntityNotFound: if model_id not exists
         """
-        item = await self.get_by_id(session, model_id)
-        await self.repo.delete(session, item)
+        item = await self.repo.delete_by_id(session, self.model, model_id)
+        if item is None:
+            raise EntityNotFound(self.model)
         return item
 
+    async def batch(self, session,
+                    create: list[SQLModel] = None,
+                    update: list[SQLModel] = None,
+                    delete: list[uuid.UUID] = None) -> tuple[list[SQLModel], list[SQLModel], list[uuid.UUID]]:
+        """
+        Create, update and delete items in one transaction. Every kind of operation is applied
+        with multi-row statements instead of a statement per item
+        :param session: opened database session
+        :param create: item prototypes to create
+        :param update: item prototypes to update. Field id is required, another fields used to update.
+        Only the relationships replaced by the updates are loaded, other eager relationships are empty
+        :param delete: ids of existing items to delete
+        :return: tuple[created items, updated items, deleted ids]
+
+        :raise EntityNotFound: if any of update or delete ids not exists. Nothing is committed in this case
+        """
+        create = create or []
+        update = update or []
+        delete = delete or []
+
+        created = await self.repo.create_all(session, self.model, create, commit=False)
+        updated = await self.repo.update_all(session, self.model, update, commit=False,
+                                             expand=self._link_relationships(update))
+        deleted = await self.repo.delete_all(session, self.model, delete, commit=False)
+        if any(item is None for item in updated) or len(deleted) != len(set(delete)):
+            raise EntityNotFound(self.model)
+
+        await self._set_links(session, created + updated, create + update)
+        await self.commit(session)
+        return created, updated, deleted
+
     async def get_by_id(self, session, uid: uuid.UUID) -> SQLModel:
         """ Get item by id
         :param session: opened database session
@@ -64,31 +127,194 @@ class ModelManager:
             raise EntityNotFound(self.model)
         return items[0]
 
+    async def get_by_ids(self, session, uids: Iterable[uuid.UUID]) -> dict[uuid.UUID, SQLModel]:
+        """ Get items by ids with one query
+        :param session: opened database session
+        :param uids: items ids. May contain duplicates
+        :return: dict with id-item
+
+        :raise EntityNotFound: if any of uids does not exist
+        """
+        uids = set(uids)
+        if not uids:
+            return {}
+
+        items = await self.get(session=session, filters={'id': list(uids)})
+        found = {item.id: item for item in items}
+        if len(found) != len(uids):
+            raise EntityNotFound(self.model)
+        return found
+
     async def get(self, *args,
                   session,
                   filters: dict = None,
                   limit: int = None,
                   offset: int = None,
-                  fields: list[str] = None) -> list[SQLModel] | list[dict]:
+                  fields: list[str] = None,
+                  order_by: list[str] = None,
+                  expand: list[str] = None,
+                  with_total: bool = False) -> list[SQLModel] | list[dict] | tuple:
         """
         Get item or fields
         :param args: positional arguments are not available
         :param session: opened database session
-        :param filters: dict with filters. key - is a model attribute as string, value - item or collection for compare
+        :param filters: dict with filters. key - is a model attribute as string, value - item, collection or
+        dict of operators for compare. See AsyncRepository._to_model_conditions
         :param limit: count of request items
         :param offset: offset relative to the first element in the query
-        :param fields: fields for get of mode_type
-        :return: return model collection if fields argument is None else return collection of dict with model fields
+        :param fields: fields for get of mode_type. Fields of related items are requested by dotted path:
+        'apartments.items.cost'. Path ending with a relationship requests all columns of related items
+        :param order_by: fields to sort items. Field with '-' prefix sorted in descending order. Items with equal
+        fields are sorted by order_keys
+        :param expand: relationships to load, nested relationships are separated by dots. Not used with fields.
+        Not expanded relationships are empty
+        :param with_total: also count all items matching filters in the same query
+        :return: return model collection if fields argument is None else return collection of dict with model fields.
+        tuple[collection, total, total is estimate] if with_total. See AsyncRepository._get_with_total
+        """
+        filters = self._drop_extra_filters(filters)
+        self._convert_filters(filters)
+        order_by = self._complete_order(order_by)
+
+        if fields:
+            columns, relations = self._to_fields_tree(self.model, fields)
+            select_fields = self._with_keys(columns, ['id'] if relations else [])
+            attrs = [getattr(self.model, field) for field in select_fields]
+            result = await self.repo.get_fields(session, self.model, *attrs, filters=filters, offset=offset, limit=limit,
+                                                order_by=order_by, with_total=with_total)
+            result, total, estimated = result if with_total else (result, None, None)
+            items = self._zip_query_result(select_fields, result)
+            await self._attach_related(session, self.model, items, relations)
+            items = self._drop_extra_keys(items, columns + list(relations), select_fields)
+            return (items, total, estimated) if with_total else items
+        else:
+            return await self.repo.get_items(session, self.model, filters=filters, offset=offset, limit=limit,
+                                             order_by=order_by, expand=expand, with_total=with_total)
+
+    async def stream(self, *args,
+                     session,
+                     filters: dict = None,
+                     limit: int = None,
+                     offset: int = None,
+                     fields: list[str] = None,
+                     order_by: list[str] = None,
+                     expand: list[str] = None) -> AsyncIterator[list[SQLModel] | list[dict]]:
+        """
+        Stream items or fields by pages. Arguments are the same as in get, but only one page is kept in memory
+        :param args: positional arguments are not available
+        :param session: opened database session
+        :param filters: dict with filters. See get
+        :param limit: count of request items
+        :param offset: offset relative to the first element in the query
+        :param fields: fields for get of mode_type. See get
+        :param order_by: fields to sort items. See get
+        :param expand: relationships to load. Not used with fields
+        :return: async iterator of model collections if fields argument is None else of collections of dict
         """
         filters = self._drop_extra_filters(filters)
-        self._transform_id_filters(filters)
+        self._convert_filters(filters)
+        order_by = self._complete_order(order_by)
 
         if fields:
-            attrs = [getattr(self.model, field) for field in fields]
-            result = await self.repo.get_fields(session, self.model, *attrs, filters=filters, offset=offset, limit=limit)
-            return self._zip_query_result(fields, result)
+            columns, relations = self._to_fields_tree(self.model, fields)
+            select_fields = self._with_keys(columns, ['id'] if relations else [])
+            attrs = [getattr(self.model, field) for field in select_fields]
+            pages = self.repo.stream_fields(session, self.model, *attrs, filters=filters, offset=offset, limit=limit,
+                                            order_by=order_by)
+            async for page in pages:
+                items = [dict(zip(select_fields, row)) for row in page]
+                await self._attach_related(session, self.model, items, relations)
+                yield self._drop_extra_keys(items, columns + list(relations), select_fields)
         else:
-            return await self.repo.get_items(session, self.model, filters=filters, offset=offset, limit=limit)
+            pages = self.repo.stream_items(session, self.model, filters=filters, offset=offset, limit=limit,
+                                           order_by=order_by, expand=expand)
+            async for page in pages:
+                yield page
+
+    async def get_json(self, *args,
+                       session,
+                       public_type,
+                       filters: dict = None,
+                       limit: int = None,
+                       offset: int = None,
+                       order_by: list[str] = None,
+                       expand: list[str] = None) -> str:
+        """
+        Get items as JSON array of public_type documents built by the database
+        :param args: positional arguments are not available
+        :param session: opened database session
+        :param public_type: public model type. Its fields are document keys
+        :param filters: dict with filters. See get
+        :param limit: count of request items
+        :param offset: offset relative to the first element in the query
+        :param order_by: fields to sort items. See get
+        :param expand: relationships to include, nested relationships are separated by dots
+        :return: JSON array as string
+        """
+        filters = self._drop_extra_filters(filters)
+        self._convert_filters(filters)
+        return await self.repo.get_json(session, self.model, public_type, filters=filters, limit=limit,
+                                        offset=offset, order_by=self._complete_order(order_by), expand=expand)
+
+    async def get_page(self, *args,
+                       session,
+                       filters: dict = None,
+                       limit: int = None,
+                       cursor: str = None,
+                       fields: list[str] = None,
+                       expand: list[str] = None,
+                       with_total: bool = False) -> tuple:
+        """
+        Get page of items or fields using keyset pagination. Items are sorted by order_keys and the page starts
+        right after the item encoded in the cursor, so any page costs the same as the first one.
+        Total is counted with the first page and carried by the cursor to the next pages
+        :param args: positional arguments are not available
+        :param session: opened database session
+        :param filters: dict with filters. key - is a model attribute as string, value - item or collection for compare
+        :param limit: count of request items
+        :param cursor: opaque cursor returned with the previous page. If empty return the first page
+        :param fields: fields for get of mode_type. Fields of related items are requested by dotted path
+        :param expand: relationships to load, nested relationships are separated by dots. Not used with fields
+        :param with_total: also count all items matching filters in the same query. Pages after the first one
+        return the total carried by the cursor
+        :return: tuple[page items, cursor of the next page]. Cursor is None if page is the last one.
+        tuple[page items, cursor of the next page, total, total is estimate] if with_total
+
+        :raise InvalidCursor: if cursor is malformed
+        """
+        filters = self._drop_extra_filters(filters)
+        self._convert_filters(filters)
+
+        after = decode_cursor(cursor, self.model, self.order_keys) if cursor else None
+        carried = decode_cursor_total(cursor) if cursor and with_total else None
+        count = with_total and carried is None
+        fetch_limit = limit + 1 if limit else None
+
+        if fields:
+            columns, relations = self._to_fields_tree(self.model, fields)
+            select_fields = self._with_keys(columns, self.order_keys + (['id'] if relations else []))
+            attrs = [getattr(self.model, field) for field in select_fields]
+            result = await self.repo.get_fields(session, self.model, *attrs, filters=filters, limit=fetch_limit,
+                                                order_by=self.order_keys, after=after, with_total=count)
+            result, total, estimated = result if count else (result, *(carried or (None, None)))
+            items = self._zip_query_result(select_fields, result)
+        else:
+            items = await self.repo.get_items(session, self.model, filters=filters, limit=fetch_limit,
+                                              order_by=self.order_keys, after=after, expand=expand, with_total=count)
+            items, total, estimated = items if count else (items, *(carried or (None, None)))
+
+        next_cursor = None
+        if limit and len(items) > limit:
+            items = items[:limit]
+            last = items[-1]
+            next_cursor = encode_cursor([last[key] if fields else getattr(last, key) for key in self.order_keys],
+                                        (total, estimated) if with_total else None)
+
+        if fields:
+            await self._attach_related(session, self.model, items, relations)
+            items = self._drop_extra_keys(items, columns + list(relations), select_fields)
+
+        return (items, next_cursor, total, estimated) if with_total else (items, next_cursor)
 
     async def get_for_update(self, *args,
                              session,
@@ -107,7 +333,7 @@ class ModelManager:
         :return: return model collection if fields argument is None else return collection of dict with model fields
         """
         filters = self._drop_extra_filters(filters)
-        self._transform_id_filters(filters)
+        self._convert_filters(filters)
         return await self.repo.get_for_update(session, self.model, filters=filters, limit=limit, offset=offset, selectin_fields=relationships)
 
     async def commit(self, session) -> None:
@@ -116,6 +342,98 @@ class ModelManager:
         """
         await self.repo.commit(session)
 
+    async def _set_links(self, session, items: list[SQLModel], prototypes: list[SQLModel]) -> None:
+        """
+        Set relationships of items from the ids of prototypes. Models without relationships have nothing to set
+        :param session: opened database session
+        :param items: created or updated items
+        :param prototypes: prototypes of items in the same order
+        """
+        pass
+
+    def _link_relationships(self, prototypes: list[SQLModel]) -> list[str]:
+        """
+        Relationships replaced by _set_links for prototypes. They are loaded with updated items,
+        so replacing them removes the previous links
+        :param prototypes: prototypes of created or updated items
+        :return: relationship names
+        """
+        return []
+
+    async def _attach_related(self, session, model_type, items: list[dict], relations: dict) -> None:
+        """
+        Add fields of related items to items as nested dicts. Every relationship is loaded by one joined column
+        query for all items, SQLModel objects are not created
+        :param session: opened database session
+        :param model_type: type of items. Must be inherited from SQLModel
+        :param items: dicts with model fields. Must contain id if relations are not empty
+        :param relations: dict of relationship - list of requested fields of related items. See _to_fields_tree
+        """
+        if not items or not relations:
+            return
+
+        ids = [item['id'] for item in items]
+        for key, fields in relations.items():
+            relationship = inspect(model_type).relationships[key]
+            target = relationship.mapper.class_
+            if fields:
+                columns, nested = self._to_fields_tree(target, fields)
+            else:
+                columns, nested = [column.key for column in target.__table__.columns], {}
+            select_fields = self._with_keys(columns, ['id'] if nested else [])
+
+            rows = await self.repo.get_related_fields(session, model_type, key, ids,
+                                                      *[getattr(target, field) for field in select_fields])
+            related = [dict(zip(select_fields, row[1:])) for row in rows]
+            await self._attach_related(session, target, related, nested)
+            related = self._drop_extra_keys(related, columns + list(nested), select_fields)
+
+            grouped = {}
+            for row, value in zip(rows, related):
+                grouped.setdefault(row[0], []).append(value)
+            for item in items:
+                values = grouped.get(item['id'], [])
+                item[key] = values if relationship.uselist else next(iter(values), None)
+
+    @staticmethod
+    def _to_fields_tree(model_type, fields: list[str]) -> tuple[list[str], dict]:
+        """
+        Split requested fields to model columns and fields of related items
+        :param model_type: model type. Must be inherited from SQLModel
+        :param fields: requested fields. Fields of related items are dotted paths
+        :return: tuple[columns, dict of relationship - list of requested fields of related items]
+
+        :raise InvalidQuery: if field is not a model column or relationship
+        """
+        columns, relations = [], {}
+        for field in fields:
+            key, _, nested = field.partition('.')
+            if key in model_type.__sqlmodel_relationships__:
+                relations.setdefault(key, [])
+                if nested:
+                    relations[key].append(nested)
+            elif key in model_type.model_fields and not nested:
+                if key not in columns:
+                    columns.append(key)
+            else:
+                raise InvalidQuery(f'unknown field {field}')
+
+        for key, nested in relations.items():
+            if nested:
+                ModelManager._to_fields_tree(inspect(model_type).relationships[key].mapper.class_, nested)
+        return columns, relations
+
+    @staticmethod
+    def _with_keys(fields: list[str], keys: list[str]) -> list[str]:
+        return fields + [key for key in dict.fromkeys(keys) if key not in fields]
+
+    @staticmethod
+    def _drop_extra_keys(items: list[dict], keys: list[str], selected: list[str]) -> list[dict]:
+        """ Keep only requested keys in items. Do nothing if no extra key was selected """
+        if all(key in keys for key in selected):
+            return items
+        return [{key: item[key] for key in keys} for item in items]
+
     @staticmethod
     def _zip_query_result(fields: list[str], query_result: list) -> list:
         """
@@ -129,26 +447,61 @@ class ModelManager:
         else:
             return [dict(zip(fields, values)) for values in query_result]
 
-    @staticmethod
-    def _transform_id_filters(filters: dict | None) -> None:
+    def _convert_filters(self, filters: dict | None) -> None:
         """
-        Transform id field from string (or list of string) to uuid.UUID (or list of uuid.UUID).
-        Attention: id field from filters would be update
+        Convert filter operands to the types of the model fields, e.g. id from string to uuid.UUID.
+        Operands of comparison operators and items of collections are converted, like and is_null operands are not.
+        Attention: filters would be updated
         If filters is None or empty do nothing.
-        If filters[id] is none then del this field.
-        :param filters: dict for transform
+        If filters[id] is empty then del this field.
+        :param filters: dict with filters. See get
+        :raise InvalidQuery: if an operand does not match the type of the model field
         """
         if not filters:
             return
 
-        if 'id' in filters:
-            if not filters['id']:
-                del filters['id']
-            else:
-                if not isinstance(filters['id'], str) and isinstance(filters['id'], Iterable):
-                    filters['id'] = [uuid.UUID(str(el)) for el in filters['id']]
-                else:
-                    filters['id'] = uuid.UUID(str(filters['id']))
+        if 'id' in filters and not filters['id']:
+            del filters['id']
+        for key, value in filters.items():
+            adapter = TypeAdapter(self.model.model_fields[key].annotation)
+            if isinstance(value, dict):
+                filters[key] = {operator: self._convert_operand(adapter, key, operator, operand)
+                                for operator, operand in value.items()}
+            elif value is not None:
+                operator = 'in' if not isinstance(value, str) and isinstance(value, Iterable) else 'eq'
+                filters[key] = self._convert_operand(adapter, key, operator, value)
+
+    @staticmethod
+    def _convert_operand(adapter: TypeAdapter, key: str, operator: str, operand):
+        """
+        Convert filter operand to the type of the model field
+        :param adapter: type adapter of the model field
+        :param key: model field
+        :param operator: filter operator
+        :param operand: filter operand
+        :return: converted operand. Operands of like, is_null and unknown operators are returned as is
+        :raise InvalidQuery: if the operand does not match the type of the model field
+        """
+        try:
+            if operator == 'in':
+                if isinstance(operand, str) or not isinstance(operand, Iterable):
+                    return operand
+                return [adapter.validate_python(item) for item in operand]
+            if operator in ('eq', 'ne', 'gt', 'gte', 'lt', 'lte'):
+                return adapter.validate_python(operand)
+            return operand
+        except ValidationError:
+            raise InvalidQuery(f'{key} has invalid {operator} operand {operand}')
+
+    def _complete_order(self, order_by: list[str] | None) -> list[str]:
+        """
+        Append order keys to the requested order, so the items order is stable
+        :param order_by: requested order fields
+        :return: order fields ending with order_keys
+        """
+        order_by = list(order_by) if order_by else []
+        requested = {key.removeprefix('-') for key in order_by}
+        return order_by + [key for key in self.order_keys if key not in requested]
 
     def _drop_extra_filters(self, filters: dict) -> dict:
         if filters:
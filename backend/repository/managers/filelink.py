@@ -0,0 +1,46 @@
+from sqlmodel import SQLModel
+
+from .base import ModelManager
+from ..models.common import File
+
+
+class FileLinkManager(ModelManager):
+    """ Base manager of models linked to File models by id. Subclasses declare links: prototype id field
+    to relationship name, e.g. {'images_ids': 'images'}. Fields ending with _ids link lists of files.
+    All file ids of an operation are resolved with one get_by_ids call of the shared file manager
+    """
+    links: dict[str, str] = {}
+
+    def __init__(self, model_type, repo):
+        super().__init__(model_type, repo)
+        self.file_manager = ModelManager(File, repo)
+
+    async def _set_links(self, session, items: list[SQLModel], prototypes: list[SQLModel]) -> None:
+        """ Updating model links with files. A list link is replaced if its ids are set, a single link
+        is replaced if its id is set. Repeated ids are resolved and linked once
+        """
+        ids = [uid for model in prototypes for field in self.links if self._touches(model, field)
+               for uid in self._as_ids(getattr(model, field), field)]
+        files = await self.file_manager.get_by_ids(session, list(dict.fromkeys(ids)))
+        for item, model in zip(items, prototypes):
+            for field, relationship in self.links.items():
+                if self._touches(model, field):
+                    value = getattr(model, field)
+                    setattr(item, relationship, [files[uid] for uid in self._as_ids(value, field)]
+                            if self._is_list_link(field) else files[value])
+
+    def _link_relationships(self, prototypes: list[SQLModel]) -> list[str]:
+        return [relationship for field, relationship in self.links.items()
+                if any(self._touches(model, field) for model in prototypes)]
+
+    def _touches(self, model: SQLModel, field: str) -> bool:
+        value = getattr(model, field, None)
+        return value is not None if self._is_list_link(field) else bool(value)
+
+    def _as_ids(self, value, field: str) -> list:
+        """ Ids of a link field. Repeated ids of a list link are dropped keeping their order, a file is linked once """
+        return list(dict.fromkeys(value)) if self._is_list_link(field) else [value]
+
+    @staticmethod
+    def _is_list_link(field: str) -> bool:
+        return field.endswith('_ids')
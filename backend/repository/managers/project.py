@@ -1,54 +1,29 @@
-from sqlmodel import SQLModel
-
-from .base import ModelManager
+from .filelink import FileLinkManager
 
 from ..models.project import ProjectUpdate, ProjectCreate
-from ..models.common import File
 from ..utils import raise_for_invalid_slug
 
 
-class ProjectManager(ModelManager):
-    """ Project model manager. Override create and update methods for creating links
-    to File models from an id
-    """
+class ProjectManager(FileLinkManager):
+    """ Project model manager. Links images and master plan to File models from an id """
+    links = {'images_ids': 'images', 'master_plan_id': 'master_plan'}
+
     async def create(self, session, new_model: ProjectCreate):
         raise_for_invalid_slug(new_model.slug)
 
-        new_item = await super().create(session, new_model)
-
-        await self._set_images_field(session, new_item, new_model.images_ids)
-        if new_model.master_plan_id:
-            await self._set_master_plan_field(session, new_item, new_model.master_plan_id)
-        if new_model.images_ids or new_model.master_plan_id:
-            await self.commit(session)
-
-        return new_item
+        return await super().create(session, new_model)
 
-    async def update(self, session, update_model: ProjectUpdate):
+    async def update(self, session, update_model: ProjectUpdate, expand: list[str] = None):
         if update_model.slug:
             raise_for_invalid_slug(update_model.slug)
 
-        updated_item = await super().update(session, update_model)
-
-        if update_model.images_ids is not None:
-            await self._set_images_field(session, updated_item, update_model.images_ids)
-        if update_model.master_plan_id is not None:
-            await self._set_master_plan_field(session, updated_item, update_model.master_plan_id)
-        if update_model.images_ids is not None or update_model.master_plan_id is not None:
-            updated_item = await super().update(session, updated_item)
-
-        return updated_item
-
-    async def _set_images_field(self, session, item: SQLModel, images_ids: list):
-        """ Updating model links with images """
-        item.images.clear()
+        return await super().update(session, update_model, expand)
 
-        if images_ids:
-            tmp_manager = ModelManager(File, self.repo)
-            item.images = await tmp_manager.get(session=session, filters={'id': images_ids})
+    async def batch(self, session, create: list[ProjectCreate] = None, update: list[ProjectUpdate] = None, delete=None):
+        for model in create or []:
+            raise_for_invalid_slug(model.slug)
+        for model in update or []:
+            if model.slug:
+                raise_for_invalid_slug(model.slug)
 
-    async def _set_master_plan_field(self, session, item: SQLModel, master_plan_id):
-        """ Updating model links with master plan """
-        tmp_manager = ModelManager(File, self.repo)
-        item.master_plan = await tmp_manager.get_by_id(session, master_plan_id)
-        return item
+        return await super().batch(session, create, update, delete)
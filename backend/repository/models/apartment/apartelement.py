@@ -1,18 +1,19 @@
 """ An apartment element represents a set of data: floor, apartment number, price """
 
-from uuid import UUID, uuid4
+from uuid import UUID
 from sqlmodel import SQLModel, Field
+from ..common.ids import new_id
 
 
 class ApartElementBase(SQLModel):
-    id: UUID | None = Field(default_factory=uuid4, primary_key=True)
+    id: UUID | None = Field(default_factory=new_id, primary_key=True)
     floor: int
     number: int
     cost: int
 
 
 class ApartElement(ApartElementBase, table=True):
-    apartment_id: UUID | None = Field(default=None, foreign_key='apartment.id', ondelete='CASCADE')
+    apartment_id: UUID | None = Field(default=None, foreign_key='apartment.id', ondelete='CASCADE', index=True)
 
 
 class ApartElementPublic(ApartElementBase):
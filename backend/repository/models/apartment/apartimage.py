@@ -1,30 +1,31 @@
 """ An apartment image represents. Used to create a block with switchable images of apartments by category """
 
-from uuid import UUID, uuid4
+from uuid import UUID
 from sqlmodel import SQLModel, Field, Relationship
+from ..common.ids import new_id
 
 from ..common import File, FilePublic
 
 
 class ApartImageIconLink(SQLModel, table=True):
     apart_image_id: UUID | None = Field(default=None, foreign_key='apartimage.id', primary_key=True, ondelete='CASCADE')
-    icon_id: UUID | None = Field(default=None, foreign_key='file.id', primary_key=True, ondelete='CASCADE')
+    icon_id: UUID | None = Field(default=None, foreign_key='file.id', primary_key=True, ondelete='CASCADE', index=True)
 
 
 class ApartImageImageLink(SQLModel, table=True):
     apart_image_id: UUID | None = Field(default=None, foreign_key='apartimage.id', primary_key=True, ondelete='CASCADE')
-    image_id: UUID | None = Field(default=None, foreign_key='file.id', primary_key=True, ondelete='CASCADE')
+    image_id: UUID | None = Field(default=None, foreign_key='file.id', primary_key=True, ondelete='CASCADE', index=True)
 
 
 class ApartImageBase(SQLModel):
-    id: UUID | None = Field(default_factory=uuid4, primary_key=True)
+    id: UUID | None = Field(default_factory=new_id, primary_key=True)
     category: str
 
 
 class ApartImage(ApartImageBase, table=True):
     category_icon: File | None = Relationship(back_populates=None, link_model=ApartImageIconLink, sa_relationship_kwargs={"lazy": "selectin"})
     image: File | None = Relationship(back_populates=None, link_model=ApartImageImageLink, sa_relationship_kwargs={"lazy": "selectin"})
-    apartment_id: UUID | None = Field(default=None, foreign_key='apartment.id', ondelete='CASCADE')
+    apartment_id: UUID | None = Field(default=None, foreign_key='apartment.id', ondelete='CASCADE', index=True)
 
 
 class ApartImagePublic(ApartImageBase):
@@ -1,7 +1,8 @@
 """ An apartment represents. The basic model for building an apartment page """
 
-from uuid import UUID, uuid4
+from uuid import UUID
 from sqlmodel import SQLModel, Field, Relationship
+from ..common.ids import new_id
 
 from .apartimage import ApartImage, ApartImagePublic
 from .apartelement import ApartElement, ApartElementPublic
@@ -10,21 +11,21 @@ from ..common import File, FilePublic
 
 class ApartmentPdfLink(SQLModel, table=True):
     apartment_id: UUID | None = Field(default=None, foreign_key='apartment.id', primary_key=True, ondelete='CASCADE')
-    pdf_id: UUID | None = Field(default=None, foreign_key='file.id', primary_key=True, ondelete='CASCADE')
+    pdf_id: UUID | None = Field(default=None, foreign_key='file.id', primary_key=True, ondelete='CASCADE', index=True)
 
 
 class ApartmentBase(SQLModel):
-    id: UUID | None = Field(default_factory=uuid4, primary_key=True)
+    id: UUID | None = Field(default_factory=new_id, primary_key=True)
     title: str
     size: float
     type: str
 
 
 class Apartment(ApartmentBase, table=True):
-    images: list[ApartImage] = Relationship(back_populates=None, cascade_delete=True, sa_relationship_kwargs={"lazy": "selectin"})
-    items: list[ApartElement] = Relationship(back_populates=None, cascade_delete=True, sa_relationship_kwargs={"lazy": "selectin"})
-    pdf: File | None = Relationship(back_populates=None, link_model=ApartmentPdfLink, sa_relationship_kwargs={"lazy": "selectin"})
-    project_id: UUID | None = Field(default=None, foreign_key='project.id', ondelete='CASCADE')
+    images: list[ApartImage] = Relationship(back_populates=None, cascade_delete=True, passive_deletes=True, sa_relationship_kwargs={"lazy": "selectin"})
+    items: list[ApartElement] = Relationship(back_populates=None, cascade_delete=True, passive_deletes=True, sa_relationship_kwargs={"lazy": "selectin"})
+    pdf: File | None = Relationship(back_populates=None, link_model=ApartmentPdfLink, passive_deletes=True, sa_relationship_kwargs={"lazy": "selectin"})
+    project_id: UUID | None = Field(default=None, foreign_key='project.id', ondelete='CASCADE', index=True)
 
 
 class ApartmentPublic(ApartmentBase):
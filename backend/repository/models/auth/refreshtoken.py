@@ -1,7 +1,8 @@
-from uuid import uuid4, UUID
+from uuid import UUID
 from datetime import datetime, timedelta, UTC
 
 from sqlmodel import SQLModel, Field, Relationship
+from ..common.ids import new_id
 from common import settings
 from ..common.user import User
 
@@ -12,10 +13,10 @@ def ttl_factory() -> datetime:
 
 
 class RefreshToken(SQLModel, table=True):
-    id: UUID | None = Field(default_factory=uuid4, primary_key=True)
+    id: UUID | None = Field(default_factory=new_id, primary_key=True)
     token: str = Field(nullable=False, index=True, unique=True)
     csrf: str = Field(nullable=False, index=True, unique=True)
-    user_id: UUID | None = Field(default=None, nullable=False, foreign_key='user.id')
+    user_id: UUID | None = Field(default=None, nullable=False, foreign_key='user.id', index=True)
     user: User | None = Relationship(back_populates="refresh_tokens")
     revoked: bool = Field(default=False, nullable=False)
     expires: datetime = Field(default_factory=ttl_factory, nullable=False)
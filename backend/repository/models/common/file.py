@@ -1,11 +1,12 @@
 """ File description models """
 
-from uuid import UUID, uuid4
+from uuid import UUID
 from sqlmodel import SQLModel, Field
+from .ids import new_id
 
 
 class FileBase(SQLModel):
-    id: UUID | None = Field(default_factory=uuid4, primary_key=True)
+    id: UUID | None = Field(default_factory=new_id, primary_key=True)
     path: str
     name: str
     ext: str
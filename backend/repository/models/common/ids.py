@@ -0,0 +1,40 @@
+import os
+import time
+import threading
+from uuid import UUID, uuid4
+
+from common import settings
+
+
+_lock = threading.Lock()
+_last_ms = 0
+_sequence = 0
+
+
+def uuid7() -> UUID:
+    """ Time-ordered UUID version 7 (RFC 9562): 48 bit unix time in milliseconds, 12 bit sequence and 62 random bits.
+    Ids generated by the process increase, so new rows are appended to the end of the primary key index
+    """
+    global _last_ms, _sequence
+    with _lock:
+        ms = time.time_ns() // 1_000_000
+        if ms > _last_ms:
+            _last_ms, _sequence = ms, 0
+        else:
+            _sequence += 1
+            if _sequence > 0xfff:
+                _last_ms, _sequence = _last_ms + 1, 0
+        ms, sequence = _last_ms, _sequence
+
+    random = int.from_bytes(os.urandom(8)) & 0x3fff_ffff_ffff_ffff
+    return UUID(int=ms << 80 | 0x7 << 76 | sequence << 64 | 0b10 << 62 | random)
+
+
+ID_GENERATORS = {'uuid4': uuid4, 'uuid7': uuid7}
+
+
+def new_id() -> UUID:
+    """ Primary key factory of models. The generator is selected by the id_generator setting.
+    Both generators produce UUIDs of the same column type, so switching does not need a schema migration
+    """
+    return ID_GENERATORS[settings.id_generator]()
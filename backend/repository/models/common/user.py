@@ -1,6 +1,7 @@
-from uuid import UUID, uuid4
+from uuid import UUID
 from enum import Enum
 from sqlmodel import SQLModel, Field, Relationship
+from .ids import new_id
 
 
 class Privilege(str, Enum):
@@ -9,8 +10,8 @@ class Privilege(str, Enum):
 
 
 class UserBase(SQLModel):
-    id: UUID | None = Field(default_factory=uuid4, primary_key=True)
-    login: str
+    id: UUID | None = Field(default_factory=new_id, primary_key=True)
+    login: str = Field(unique=True, index=True)
 
 
 class User(UserBase, table=True):
@@ -1,25 +1,26 @@
 """ A description represents. Project's detail description """
 
-from uuid import UUID, uuid4
+from uuid import UUID
 from sqlmodel import SQLModel, Field, Relationship
+from ..common.ids import new_id
 
 from ..common.file import File, FilePublic
 
 
 class ProjectDetailsFileLink(SQLModel, table=True):
     project_detail_id: UUID | None = Field(default=None, foreign_key='projectdetails.id', primary_key=True, ondelete='CASCADE')
-    file_id: UUID | None = Field(default=None, foreign_key='file.id', primary_key=True, ondelete='CASCADE')
+    file_id: UUID | None = Field(default=None, foreign_key='file.id', primary_key=True, ondelete='CASCADE', index=True)
 
 
 class ProjectDetailsBase(SQLModel):
-    id: UUID | None = Field(default_factory=uuid4, primary_key=True)
+    id: UUID | None = Field(default_factory=new_id, primary_key=True)
     title: str | None = Field(default=None)
     text: str
 
 
 class ProjectDetails(ProjectDetailsBase, table=True):
     images: list[File] = Relationship(back_populates=None, link_model=ProjectDetailsFileLink, sa_relationship_kwargs={"lazy": "selectin"})
-    project_id: UUID | None = Field(default=None, foreign_key='project.id', ondelete='CASCADE')
+    project_id: UUID | None = Field(default=None, foreign_key='project.id', ondelete='CASCADE', index=True)
 
 
 class ProjectDetailsPublic(ProjectDetailsBase):
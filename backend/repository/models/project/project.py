@@ -1,7 +1,8 @@
 """ A Project represents. Basic model for building a project page """
 
-from uuid import UUID, uuid4
+from uuid import UUID
 from sqlmodel import SQLModel, Field, Relationship
+from ..common.ids import new_id
 
 from .shortdescription import ProjectShortDescription, ProjectShortDescriptionPublic
 from .details import ProjectDetails, ProjectDetailsPublic
@@ -11,16 +12,16 @@ from ..common import File, FilePublic
 
 class ProjectImageLink(SQLModel, table=True):
     project_id: UUID | None = Field(default=None, foreign_key='project.id', primary_key=True, ondelete='CASCADE')
-    image_id: UUID | None = Field(default=None, foreign_key='file.id', primary_key=True, ondelete='CASCADE')
+    image_id: UUID | None = Field(default=None, foreign_key='file.id', primary_key=True, ondelete='CASCADE', index=True)
 
 
 class ProjectMasterPlanLink(SQLModel, table=True):
     project_id: UUID | None = Field(default=None, foreign_key='project.id', primary_key=True, ondelete='CASCADE')
-    master_plan_id: UUID | None = Field(default=None, foreign_key='file.id', primary_key=True, ondelete='CASCADE')
+    master_plan_id: UUID | None = Field(default=None, foreign_key='file.id', primary_key=True, ondelete='CASCADE', index=True)
 
 
 class ProjectBase(SQLModel):
-    id: UUID | None = Field(default_factory=uuid4, primary_key=True)
+    id: UUID | None = Field(default_factory=new_id, primary_key=True)
     title: str
     square_max: int
     square_min: int
@@ -32,11 +33,11 @@ class ProjectBase(SQLModel):
 class Project(ProjectBase, table=True):
     slug: str | None = Field(default=None, unique=True, index=True)
     active: bool = Field(default=False)
-    images: list[File] = Relationship(back_populates=None, link_model=ProjectImageLink, sa_relationship_kwargs={"lazy": "selectin"})
-    master_plan: File | None = Relationship(back_populates=None, link_model=ProjectMasterPlanLink, sa_relationship_kwargs={"lazy": "selectin"})
-    short_description: ProjectShortDescription | None = Relationship(back_populates=None, cascade_delete=True, sa_relationship_kwargs={"lazy": "selectin"})
-    details: list[ProjectDetails] = Relationship(back_populates=None, cascade_delete=True, sa_relationship_kwargs={"lazy": "selectin"})
-    apartments: list[Apartment] = Relationship(back_populates=None, cascade_delete=True, sa_relationship_kwargs={"lazy": "selectin"})
+    images: list[File] = Relationship(back_populates=None, link_model=ProjectImageLink, passive_deletes=True, sa_relationship_kwargs={"lazy": "selectin"})
+    master_plan: File | None = Relationship(back_populates=None, link_model=ProjectMasterPlanLink, passive_deletes=True, sa_relationship_kwargs={"lazy": "selectin"})
+    short_description: ProjectShortDescription | None = Relationship(back_populates=None, cascade_delete=True, passive_deletes=True, sa_relationship_kwargs={"lazy": "selectin"})
+    details: list[ProjectDetails] = Relationship(back_populates=None, cascade_delete=True, passive_deletes=True, sa_relationship_kwargs={"lazy": "selectin"})
+    apartments: list[Apartment] = Relationship(back_populates=None, cascade_delete=True, passive_deletes=True, sa_relationship_kwargs={"lazy": "selectin"})
 
 
 class ProjectPublic(ProjectBase):
@@ -1,25 +1,26 @@
 """ A description represents. Project's short description, something like a slogan """
 
-from uuid import UUID, uuid4
+from uuid import UUID
 from sqlmodel import SQLModel, Field, Relationship
+from ..common.ids import new_id
 
 from ..common import File, FilePublic
 
 
 class ProjectShortDescriptionFileLink(SQLModel, table=True):
     project_short_description_id: UUID | None = Field(default=None, foreign_key='projectshortdescription.id', primary_key=True, ondelete='CASCADE')
-    file_id: UUID | None = Field(default=None, foreign_key='file.id', primary_key=True, ondelete='CASCADE')
+    file_id: UUID | None = Field(default=None, foreign_key='file.id', primary_key=True, ondelete='CASCADE', index=True)
 
 
 class ProjectShortDescriptionBase(SQLModel):
-    id: UUID | None = Field(default_factory=uuid4, primary_key=True)
+    id: UUID | None = Field(default_factory=new_id, primary_key=True)
     title: str
     sales_status: str
 
 
 class ProjectShortDescription(ProjectShortDescriptionBase, table=True):
     image: File | None = Relationship(back_populates=None, link_model=ProjectShortDescriptionFileLink, sa_relationship_kwargs={"lazy": "selectin"})
-    project_id: UUID | None = Field(default=None, foreign_key='project.id', ondelete='CASCADE')
+    project_id: UUID | None = Field(default=None, foreign_key='project.id', ondelete='CASCADE', index=True)
 
 class ProjectShortDescriptionPublic(ProjectShortDescriptionBase):
     id: UUID
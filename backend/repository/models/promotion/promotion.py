@@ -1,18 +1,19 @@
 """ Promotion represents. The basic model for building promotions page """
 
-from uuid import uuid4, UUID
+from uuid import UUID
 from sqlmodel import SQLModel, Field, Relationship
+from ..common.ids import new_id
 
 from ..common import File, FilePublic
 
 
 class PromotionImageLink(SQLModel, table=True):
     promotion_id: UUID | None = Field(default=None, foreign_key='promotion.id', primary_key=True, ondelete='CASCADE')
-    image_id: UUID | None = Field(default=None, foreign_key='file.id', primary_key=True, ondelete='CASCADE')
+    image_id: UUID | None = Field(default=None, foreign_key='file.id', primary_key=True, ondelete='CASCADE', index=True)
 
 
 class PromotionBase(SQLModel):
-    id: UUID | None = Field(default_factory=uuid4, primary_key=True)
+    id: UUID | None = Field(default_factory=new_id, primary_key=True)
     text: str
 
 
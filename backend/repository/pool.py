@@ -0,0 +1,93 @@
+import time
+from bisect import bisect_left
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class WaitHistogram:
+    """ Cumulative histogram of waiting times in seconds, same layout as prometheus histograms """
+    BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, buckets: tuple[float, ...] = BUCKETS):
+        """ Initializer
+        :param buckets: sorted upper bounds of the buckets
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """ Add waiting time to the histogram
+        :param seconds: waited time
+        """
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def snapshot(self) -> dict:
+        """ Make histogram snapshot
+        :return: count of observations less or equal each bucket bound, total count and sum of the observations
+        """
+        buckets, total = {}, 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            buckets[str(bound)] = total
+        buckets['+Inf'] = self.count
+        return {'buckets': buckets, 'count': self.count, 'sum': self.sum}
+
+
+class MeteredPool(AsyncAdaptedQueuePool):
+    """ Async queue pool measuring how long a connection checkout waits and how many checkouts timed out """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_time = WaitHistogram()
+        self.timeouts = 0
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.wait_time.observe(time.perf_counter() - start)
+
+
+def pool_options(settings, pool_size: int = None, max_overflow: int = None) -> dict:
+    """ Make engine keyword arguments configuring the connection pool
+    :param settings: application settings
+    :param pool_size: pool size used instead of the settings pool size, e.g. size of a route class pool
+    :param max_overflow: max overflow used instead of the settings max overflow
+    :return: keyword arguments for create_async_engine
+    """
+    options = {'poolclass': MeteredPool,
+               'pool_size': settings.db_pool_size if pool_size is None else pool_size,
+               'max_overflow': settings.db_max_overflow if max_overflow is None else max_overflow,
+               'pool_timeout': settings.db_pool_timeout_secs,
+               'pool_pre_ping': settings.db_pool_pre_ping,
+               'pool_recycle': settings.db_pool_recycle_secs}
+    if 'asyncpg' in settings.db_driver:
+        options['connect_args'] = {'statement_cache_size': settings.db_statement_cache_size}
+    return options
+
+
+def pool_status(pool) -> dict:
+    """ Make connection pool status
+    :param pool: engine connection pool
+    :return: size of the pool, checked out, idle and overflow connections, checkout timeouts and waiting times
+    """
+    if not isinstance(pool, QueuePool):
+        return {'class': pool.__class__.__name__}
+
+    status = {'class': pool.__class__.__name__,
+              'size': pool.size(),
+              'checked_out': pool.checkedout(),
+              'idle': pool.checkedin(),
+              'overflow': max(pool.overflow(), 0)}
+    if isinstance(pool, MeteredPool):
+        status['timeouts'] = pool.timeouts
+        status['wait_seconds'] = pool.wait_time.snapshot()
+    return status
@@ -0,0 +1,36 @@
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+
+class StatementCache:
+    """
+    LRU cache of statement templates. A template is built once per query shape and executed with new bind
+    parameters, so the same statement object reaches SQLAlchemy compiled cache and asyncpg prepared statements
+    """
+    def __init__(self, size: int):
+        """
+        Initialize
+        :param size: max count of cached templates. The least recently used template is dropped on overflow
+        """
+        self.size = size
+        self.templates = OrderedDict()
+
+    def get(self, key: Hashable, build: Callable):
+        """
+        Get template by shape key. Build and store template if it is not cached
+        :param key: query shape. Must not contain bound values
+        :param build: callable without arguments that returns the template
+        :return: statement template
+        """
+        template = self.templates.get(key)
+        if template is None:
+            template = build()
+            self.templates[key] = template
+            if len(self.templates) > self.size:
+                self.templates.popitem(last=False)
+        else:
+            self.templates.move_to_end(key)
+        return template
+
+    def __len__(self):
+        return len(self.templates)
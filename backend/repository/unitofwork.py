@@ -0,0 +1,57 @@
+from contextlib import asynccontextmanager
+
+
+UNIT_OF_WORK = 'unit_of_work'
+
+
+def begin_unit_of_work(session) -> None:
+    """ Open unit of work on the session. Until it is ended, repository commits only flush changes
+    and the whole work is committed or rolled back once by end_unit_of_work
+    :param session: opened database session
+    """
+    session.info[UNIT_OF_WORK] = True
+
+
+def in_unit_of_work(session) -> bool:
+    """ Check if the session has an opened unit of work
+    :param session: opened database session
+    :return: True if the session changes are committed by the unit of work owner
+    """
+    return bool(session.info.get(UNIT_OF_WORK))
+
+
+async def end_unit_of_work(session, commit: bool) -> None:
+    """ End unit of work on the session
+    :param session: opened database session
+    :param commit: commit all changes of the unit of work if True, otherwise roll them back
+    """
+    session.info.pop(UNIT_OF_WORK, None)
+    if not commit:
+        await session.rollback()
+        return
+
+    try:
+        await session.commit()
+    except Exception as e:
+        await session.rollback()
+        raise e
+
+
+@asynccontextmanager
+async def transaction(session):
+    """ Transaction block. Joins the opened unit of work of the session, otherwise opens own unit of work
+    committed on exit. Changes are rolled back if the block raises
+    :param session: opened database session
+    """
+    if in_unit_of_work(session):
+        yield
+        await session.flush()
+        return
+
+    begin_unit_of_work(session)
+    try:
+        yield
+    except BaseException:
+        await end_unit_of_work(session, commit=False)
+        raise
+    await end_unit_of_work(session, commit=True)
@@ -1,4 +1,5 @@
 import re
+from sqlalchemy import UniqueConstraint
 
 from .exceptions import InvalidSlug
 
@@ -12,3 +13,18 @@ def raise_for_invalid_slug(slug: str) -> None:
     """
     if any([not isinstance(slug, str), not (1 <= len(slug) <= 100), not bool(SLUG_REGEX.fullmatch(slug))]):
         raise InvalidSlug(slug)
+
+
+def unindexed_foreign_keys(metadata) -> list[str]:
+    """ Find foreign key columns without an index. A column is indexed if it leads the primary key,
+    an index or a unique constraint of its table
+    :param metadata: metadata with model tables
+    :return: 'table.column' names of unindexed foreign key columns
+    """
+    unindexed = []
+    for table in metadata.sorted_tables:
+        column_sets = [table.primary_key.columns, *(index.columns for index in table.indexes),
+                       *(constraint.columns for constraint in table.constraints if isinstance(constraint, UniqueConstraint))]
+        leading = {next(iter(columns)).name for columns in column_sets if len(columns)}
+        unindexed.extend(f'{table.name}.{fk.parent.name}' for fk in table.foreign_keys if fk.parent.name not in leading)
+    return sorted(set(unindexed))
@@ -0,0 +1,129 @@
+""" Microbenchmark of per-request overhead of the database session and oauth middlewares.
+Compares BaseHTTPMiddleware implementations, as they were before the ASGI rewrite, with the current ASGI
+middlewares on the simplest GET route. Database and auth system are stubbed, so only middleware cost is measured.
+
+Usage: python -m benchmarks.middlewares [requests]
+"""
+import sys
+import time
+import asyncio
+
+from fastapi import FastAPI, Request
+from httpx import AsyncClient, ASGITransport
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+
+from backend.api.middlewares import DatabaseSessionMiddleware, OAuthMiddleware, RouteMatcher, DB_ROUTES, AUTH_ROUTES
+
+
+ROUTES = ['/api/apartment/image', '/api/apartment/element', '/api/apartment', '/api/project/shortdescr',
+          '/api/project/details', '/api/project', '/api/promotion', '/api/file', '/api/auth']
+
+
+class StubSession:
+    """ Database session without database """
+    def __init__(self):
+        self.info = {}
+
+    async def close(self):
+        pass
+
+
+class StubAuthSystem:
+    """ Auth system resolving any token to the same user """
+    async def user_by_token(self, session, token):
+        return 'user'
+
+
+class BaseHTTPSessionMiddleware(BaseHTTPMiddleware):
+    """ Database session middleware built on BaseHTTPMiddleware """
+    def __init__(self, app, session, allowed_routes):
+        BaseHTTPMiddleware.__init__(self, app)
+        self.session = session
+        self.routes = allowed_routes
+
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint):
+        if any(request.url.path.startswith(route) for route in self.routes):
+            session = self.session()
+            request.state.db_session = session
+            try:
+                response = await call_next(request)
+            except BaseException:
+                await session.close()
+                raise
+            response.body_iterator = self._close_after_body(response.body_iterator, session)
+            return response
+        return await call_next(request)
+
+    @staticmethod
+    async def _close_after_body(body, session):
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            await session.close()
+
+
+class BaseHTTPOAuthMiddleware(BaseHTTPMiddleware):
+    """ OAuth middleware built on BaseHTTPMiddleware """
+    def __init__(self, app, auth_system, allowed_routes):
+        BaseHTTPMiddleware.__init__(self, app)
+        self.auth_system = auth_system
+        self.routes = allowed_routes
+
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint):
+        if any(request.url.path.startswith(route) for route in self.routes):
+            _, _, token = request.headers.get('authorization').partition(' ')
+            request.state.user = await self.auth_system.user_by_token(request.state.db_session, token)
+        return await call_next(request)
+
+
+def create_app(asgi: bool) -> FastAPI:
+    """ Make application with the simplest GET route wrapped by the middlewares
+    :param asgi: use ASGI middlewares with a shared route matcher, otherwise BaseHTTPMiddleware ones
+    """
+    app = FastAPI()
+
+    async def item(request: Request):
+        return {'user': request.state.user}
+
+    app.add_api_route('/api/promotion', item, methods=['GET'])
+    if asgi:
+        matcher = RouteMatcher({AUTH_ROUTES: ROUTES[-1:], DB_ROUTES: ROUTES[:-1]})
+        app.add_middleware(OAuthMiddleware, auth_system=StubAuthSystem(), matcher=matcher)
+        app.add_middleware(DatabaseSessionMiddleware, session=StubSession, matcher=matcher)
+    else:
+        app.add_middleware(BaseHTTPOAuthMiddleware, auth_system=StubAuthSystem(), allowed_routes=ROUTES[:-1])
+        app.add_middleware(BaseHTTPSessionMiddleware, session=StubSession, allowed_routes=ROUTES)
+    return app
+
+
+async def measure(app: FastAPI, requests: int) -> float:
+    """ Send requests sequentially
+    :return: mean time of a request in microseconds
+    """
+    async with AsyncClient(transport=ASGITransport(app=app), base_url='http://bench',
+                           headers={'Authorization': 'Bearer token'}) as client:
+        for _ in range(100):
+            await client.get('/api/promotion')
+        start = time.perf_counter()
+        for _ in range(requests):
+            await client.get('/api/promotion')
+        return (time.perf_counter() - start) / requests * 1e6
+
+
+async def main(requests: int) -> None:
+    async def item():
+        return {'user': 'user'}
+
+    bare = FastAPI()
+    bare.add_api_route('/api/promotion', item, methods=['GET'])
+    results = {'no middlewares': await measure(bare, requests),
+               'BaseHTTPMiddleware': await measure(create_app(asgi=False), requests),
+               'ASGI': await measure(create_app(asgi=True), requests)}
+    for name, micros in results.items():
+        overhead = micros - results['no middlewares']
+        print(f'{name:>20}: {micros:8.1f} us/request, middlewares overhead {overhead:7.1f} us')
+
+
+if __name__ == '__main__':
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
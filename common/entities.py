@@ -1,12 +1,17 @@
 
 
 class DatabaseDSN:
-    def __init__(self, settings):
+    def __init__(self, settings, host: str = None, port: int = None):
+        """ Initializer
+        :param settings: application settings
+        :param host: database host used instead of the settings host, e.g. host of a read replica
+        :param port: database port used instead of the settings port
+        """
         self.driver = settings.db_driver
         self.user = settings.db_user
         self.password = settings.db_password
-        self.host = settings.db_host
-        self.port = settings.db_port
+        self.host = host or settings.db_host
+        self.port = port or settings.db_port
         self.database = settings.db_name
 
     def to_url(self) -> str:
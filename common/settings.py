@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings
 
 
@@ -19,6 +21,26 @@ class Settings(BaseSettings):
     db_host: str
     db_port: int
     db_name: str
+    db_replica_host: str | None = None
+    db_replica_port: int | None = None
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_admin_pool_size: int = 2
+    db_admin_max_overflow: int = 3
+    db_auth_pool_size: int = 2
+    db_auth_max_overflow: int = 2
+    db_pool_timeout_secs: float = 30
+    db_pool_pre_ping: bool = False
+    db_pool_recycle_secs: int = -1
+    db_statement_cache_size: int = 100
+    db_pool_metrics: bool = False
+    db_admission_public_limit: int = 15
+    db_admission_admin_limit: int = 5
+    db_admission_auth_limit: int = 4
+    db_admission_queue_size: int = 100
+    db_admission_timeout_secs: float = 5
+    db_admission_retry_after_secs: int = 1
+    id_generator: Literal['uuid4', 'uuid7'] = 'uuid7'
 
     redis_host: str
     redis_port: int
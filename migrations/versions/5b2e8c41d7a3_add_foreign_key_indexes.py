@@ -0,0 +1,55 @@
+"""add foreign key indexes
+
+Revision ID: 5b2e8c41d7a3
+Revises: 
+Create Date: 2026-10-17 02:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b2e8c41d7a3'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Child foreign keys and the file side of link tables. The other side of a link table leads its primary key
+INDEXES = [
+    ('apartment', 'project_id'),
+    ('apartelement', 'apartment_id'),
+    ('apartimage', 'apartment_id'),
+    ('projectdetails', 'project_id'),
+    ('projectshortdescription', 'project_id'),
+    ('refreshtoken', 'user_id'),
+    ('projectimagelink', 'image_id'),
+    ('projectmasterplanlink', 'master_plan_id'),
+    ('projectdetailsfilelink', 'file_id'),
+    ('projectshortdescriptionfilelink', 'file_id'),
+    ('apartmentpdflink', 'pdf_id'),
+    ('apartimageiconlink', 'icon_id'),
+    ('apartimageimagelink', 'image_id'),
+    ('promotionimagelink', 'image_id'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # indexes are built concurrently outside of a transaction, so tables are not locked for writes
+    with op.get_context().autocommit_block():
+        for table, column in INDEXES:
+            op.create_index(op.f(f'ix_{table}_{column}'), table, [column], unique=False,
+                            if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for table, column in reversed(INDEXES):
+            op.drop_index(op.f(f'ix_{table}_{column}'), table_name=table,
+                          if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,33 @@
+"""add user login unique index
+
+Revision ID: 9d4a1f6c2e80
+Revises: 5b2e8c41d7a3
+Create Date: 2026-10-17 02:50:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4a1f6c2e80'
+down_revision: Union[str, Sequence[str], None] = '5b2e8c41d7a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # fails if the table already contains duplicate logins, they must be resolved before the upgrade
+    with op.get_context().autocommit_block():
+        op.create_index(op.f('ix_user_login'), 'user', ['login'], unique=True,
+                        if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f('ix_user_login'), table_name='user', if_exists=True, postgresql_concurrently=True)
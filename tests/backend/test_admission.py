@@ -0,0 +1,174 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, Mock
+from fastapi import FastAPI, APIRouter, Request
+from httpx import AsyncClient, ASGITransport
+
+from backend.api.middlewares import DatabaseSessionMiddleware, AdmissionGate, AdmissionRejected, RouteMatcher, \
+    read_only, read_only_paths, PUBLIC_ROUTES, ADMIN_ROUTES, DB_ROUTES, READ_ROUTES, AUTH_ROUTES
+from backend.repository.unitofwork import in_unit_of_work
+
+
+async def query(request: Request):
+    """ Handler making a database query """
+    await request.state.db_session.execute('select 1')
+    return {}
+
+
+@pytest.mark.asyncio
+async def test_gate_admits_up_to_limit():
+    """ Test then gate admits limit requests at once and a waiting request gets the freed slot """
+    gate = AdmissionGate(limit=1, queue_size=1, timeout=1)
+    await gate.acquire()
+
+    waiting = asyncio.create_task(gate.acquire())
+    await asyncio.sleep(0)
+    assert gate.waiting == 1
+
+    gate.release()
+    await waiting
+    assert gate.waiting == 0
+
+
+@pytest.mark.asyncio
+async def test_gate_rejects_when_queue_is_full():
+    """ Test then gate rejects a request at once when its wait queue is full """
+    gate = AdmissionGate(limit=1, queue_size=0, timeout=1)
+    await gate.acquire()
+
+    with pytest.raises(AdmissionRejected):
+        await gate.acquire()
+
+
+@pytest.mark.asyncio
+async def test_gate_rejects_after_deadline():
+    """ Test then gate rejects a waiting request after the deadline and removes it from the queue """
+    gate = AdmissionGate(limit=1, queue_size=1, timeout=0.01)
+    await gate.acquire()
+
+    with pytest.raises(AdmissionRejected):
+        await gate.acquire()
+    assert gate.waiting == 0
+
+
+@pytest.mark.asyncio
+async def test_middleware_rejects_with_retry_after():
+    """ Test then session middleware answers 503 with Retry-After without opening a session and frees
+    the slot after the session is closed
+    """
+    session = AsyncMock()
+    session.info = {}
+    session_class = Mock(return_value=session)
+    gate = AdmissionGate(limit=1, queue_size=0, timeout=1)
+    app = FastAPI()
+    app.add_api_route('/api/item', query, methods=['GET'])
+    app.add_middleware(DatabaseSessionMiddleware, session=session_class, matcher=RouteMatcher({DB_ROUTES: ['/api']}),
+                       admission={PUBLIC_ROUTES: gate}, retry_after=3)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as client:
+        assert (await client.get('/api/item')).status_code == 200
+        session.close.assert_awaited_once()
+
+        await gate.acquire()
+        response = await client.get('/api/item')
+
+    assert response.status_code == 503
+    assert response.headers['retry-after'] == '3'
+    assert session_class.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_middleware_selects_session_by_route_class():
+    """ Test then session middleware opens the session of the route class: by prefix for auth routes,
+    by method for other routes
+    """
+    sessions = {}
+    for route_class in (PUBLIC_ROUTES, ADMIN_ROUTES, AUTH_ROUTES):
+        session = AsyncMock()
+        session.info = {}
+        sessions[route_class] = Mock(return_value=session)
+    app = FastAPI()
+    app.add_api_route('/api/item', query, methods=['GET', 'POST'])
+    app.add_api_route('/api/auth/token', query, methods=['POST'])
+    matcher = RouteMatcher({AUTH_ROUTES: ['/api/auth'], DB_ROUTES: ['/api']})
+    app.add_middleware(DatabaseSessionMiddleware, session=sessions[PUBLIC_ROUTES], matcher=matcher, sessions=sessions)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as client:
+        await client.get('/api/item')
+        await client.post('/api/item')
+        await client.post('/api/auth/token')
+
+    assert [sessions[route_class].call_count for route_class in (PUBLIC_ROUTES, ADMIN_ROUTES, AUTH_ROUTES)] == [1, 1, 1]
+
+
+@pytest.mark.asyncio
+async def test_middleware_serves_read_only_post_as_public_read():
+    """ Test then session middleware serves a POST query marked read only with the public session and gate
+    and without unit of work, while other POST requests of the router are admin requests
+    """
+    sessions, units_of_work = {}, []
+    for route_class in (PUBLIC_ROUTES, ADMIN_ROUTES):
+        session = AsyncMock()
+        session.info = {}
+        sessions[route_class] = Mock(return_value=session)
+    admission = {route_class: AdmissionGate(limit=1, queue_size=0, timeout=1)
+                 for route_class in (PUBLIC_ROUTES, ADMIN_ROUTES)}
+
+    @read_only
+    async def select(request: Request):
+        units_of_work.append(in_unit_of_work(request.state.db_session))
+        return await query(request)
+
+    router = APIRouter(prefix='/api/item')
+    router.add_api_route('/query', select, methods=['POST'])
+    router.add_api_route('', query, methods=['POST'])
+    app = FastAPI()
+    app.include_router(router)
+    matcher = RouteMatcher({DB_ROUTES: ['/api'], READ_ROUTES: read_only_paths(router)})
+    app.add_middleware(DatabaseSessionMiddleware, session=sessions[PUBLIC_ROUTES], matcher=matcher,
+                       admission=admission, sessions=sessions)
+    assert read_only_paths(router) == ['/api/item/query']
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as client:
+        await admission[ADMIN_ROUTES].acquire()
+        assert (await client.post('/api/item/query', json={})).status_code == 200
+        assert (await client.post('/api/item', json={})).status_code == 503
+        admission[ADMIN_ROUTES].release()
+
+        await admission[PUBLIC_ROUTES].acquire()
+        assert (await client.post('/api/item/query', json={})).status_code == 503
+
+    assert units_of_work == [False]
+    assert [sessions[route_class].call_count for route_class in (PUBLIC_ROUTES, ADMIN_ROUTES)] == [1, 0]
+
+
+@pytest.mark.asyncio
+async def test_middleware_frees_slot_on_release():
+    """ Test then releasing the session frees the admission slot before the response is sent
+    and the slot is freed once
+    """
+    session = AsyncMock()
+    session.info = {}
+    gate = AdmissionGate(limit=1, queue_size=0, timeout=1)
+    locked = []
+
+    async def download(request: Request):
+        await query(request)
+        locked.append(gate._semaphore.locked())
+        await request.state.db_session.release()
+        locked.append(gate._semaphore.locked())
+        return {}
+
+    app = FastAPI()
+    app.add_api_route('/api/file', download, methods=['GET'])
+    app.add_middleware(DatabaseSessionMiddleware, session=Mock(return_value=session),
+                       matcher=RouteMatcher({DB_ROUTES: ['/api']}), admission={PUBLIC_ROUTES: gate})
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as client:
+        assert (await client.get('/api/file')).status_code == 200
+
+    assert locked == [True, False]
+    await gate.acquire()
+    assert gate._semaphore.locked()
+    with pytest.raises(AdmissionRejected):
+        await gate.acquire()
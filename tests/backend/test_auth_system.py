@@ -5,7 +5,9 @@ from uuid import uuid4, UUID
 from unittest.mock import AsyncMock, Mock, ANY
 from datetime import datetime, timedelta, UTC
 
-from backend.auth.exceptions import UserNotFound
+from jose import JWTError
+
+from backend.auth.exceptions import UserNotFound, CouldNotValidateCredentials
 from common import settings
 
 from backend.auth.auth import AuthSystem, User, UserCreate, RefreshToken, AUTH_CODE_TEMPLATE, LOGIN_BLOCKS_TEMPLATE
@@ -47,10 +49,8 @@ def auth_system(token_manager: Mock, repository: AsyncMock, redis: AsyncMock, ha
 @pytest.fixture
 def async_session() -> Mock:
     """ Fixture for create async session """
-    session = Mock()
-    session.begin.return_value = AsyncMock()
-    session.begin.return_value.__aenter__.return_value = None
-    session.begin.return_value.__aexit__.return_value = None
+    session = AsyncMock()
+    session.info = {}
     return session
 
 
@@ -134,10 +134,12 @@ async def test_registration_password_not_strong(auth_system: AuthSystem):
 
 @pytest.mark.asyncio
 async def test_registration_login_already_used(auth_system: AuthSystem):
-    """ Test registration method. Check login repeating
+    """ Test registration method. Check login repeating reported by the insert
     :param auth_system: fixture of an AuthSystem
     """
-    user = UserCreate(login='test', password='test', email=None, name=None)
+    auth_system.repo.create_user.return_value = None
+
+    user = UserCreate(login='Test', password='TestPass6', email=None, name=None)
     with pytest.raises(LoginAlreadyUsed):
         await auth_system.registration(None, user)
 
@@ -152,7 +154,7 @@ async def test_registration_successfully(auth_system: AuthSystem):
     user = UserCreate(login='Test', password='TestPass6', email=None, name=None)
     await auth_system.registration(None, user)
 
-    auth_system.repo.get_user.assert_awaited_once_with(session=None, login=user.login)
+    auth_system.repo.get_user.assert_not_awaited()
     auth_system.hasher.hash.assert_awaited_once_with(user.password)
     auth_system.repo.create_user.assert_awaited_once_with(session=None, new_user=ANY)
 
@@ -169,15 +171,16 @@ async def test_authorize_user_is_blocked(auth_system: AuthSystem):
 
 
 @pytest.mark.asyncio
-async def test_authorize_invalid_credentials(auth_system: AuthSystem):
+async def test_authorize_invalid_credentials(auth_system: AuthSystem, async_session: Mock):
     """ Test authorize method. Authorize failed if user pass invalid credentials
     :param auth_system: fixture of an AuthSystem
+    :param async_session: fixture of an async session
     """
     auth_system.redis.get_dict.return_value = None
     auth_system.hasher.verify.return_value = False
 
     with pytest.raises(InvalidCredentials):
-        await auth_system.authorize(None, 'Username', 'Password1', 'code_challenge', 'state')
+        await auth_system.authorize(async_session, 'Username', 'Password1', 'code_challenge', 'state')
 
     auth_system.redis.add_dict.assert_awaited_once_with(topic=LOGIN_BLOCKS_TEMPLATE.format('Username'),
                                                         data={'attempts': 1, 'blocked_until': None},
@@ -185,20 +188,27 @@ async def test_authorize_invalid_credentials(auth_system: AuthSystem):
 
 
 @pytest.mark.asyncio
-async def test_authorize_successfully(auth_system: AuthSystem):
-    """ Test authorize method. Authorize successful
+async def test_authorize_successfully(auth_system: AuthSystem, async_session: Mock):
+    """ Test authorize method. Authorize successful. The session is released before the password check
     :param auth_system: fixture of an AuthSystem
+    :param async_session: fixture of an async session
     """
     auth_system.redis.get_dict.return_value = None
-    auth_system.hasher.verify.return_value = True
     auth_system.token_manager.generate_simple_tolen.return_value = str(uuid4())
     user = User(login='Username', password_hash=str(uuid4()))
     auth_system.repo.get_user.return_value = user
 
-    code, state = await auth_system.authorize(None, 'Username', 'Password1', 'code_challenge', 'state')
+    async def verify(password, password_hash):
+        async_session.close.assert_awaited_once()
+        return True
+    auth_system.hasher.verify.side_effect = verify
+
+    code, state = await auth_system.authorize(async_session, 'Username', 'Password1', 'code_challenge', 'state')
 
     assert code
     assert state == 'state'
+    auth_system.repo.get_user.assert_awaited_once_with(async_session, login='Username')
+    auth_system.hasher.verify.assert_awaited_once_with('Password1', user.password_hash)
     auth_system.redis.delete_dict.assert_awaited_once_with(topic=LOGIN_BLOCKS_TEMPLATE.format('Username'))
     expected_data = {'user_id': user.id, 'privilege': user.privilege.name, 'challenge': 'code_challenge', 'state': 'state'}
     topic = AUTH_CODE_TEMPLATE.format(code)
@@ -452,4 +462,16 @@ async def test_get_user_by_token_successful(auth_system: AuthSystem):
 
     assert result == user
     auth_system.token_manager.decode.assert_called_once_with(token)
-    auth_system.repo.get_user.assert_awaited_once_with(None, uid=UUID(payload.sub))
\ No newline at end of file
+    auth_system.repo.get_user.assert_awaited_once_with(None, uid=UUID(payload.sub))
+
+@pytest.mark.asyncio
+async def test_get_user_by_token_invalid(auth_system: AuthSystem):
+    """ Test get_user_by_token method. Invalid token is reported as credentials error without database query
+    :param auth_system: fixture of an AuthSystem
+    """
+    auth_system.token_manager.decode.side_effect = JWTError()
+
+    with pytest.raises(CouldNotValidateCredentials):
+        await auth_system.user_by_token(None, 'token')
+
+    auth_system.repo.get_user.assert_not_awaited()
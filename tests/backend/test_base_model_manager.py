@@ -2,8 +2,12 @@ import pytest
 import uuid
 from unittest.mock import AsyncMock, Mock
 
-from backend.repository.exceptions import EntityNotFound
+from backend.repository.exceptions import EntityNotFound, InvalidQuery
 from backend.repository.managers import ModelManager
+from backend.repository.cursor import encode_cursor
+from backend.repository.models.project import Project
+from backend.repository.models.common import File
+from backend.repository.models.auth import RefreshToken  # configures User mapper
 
 
 @pytest.fixture
@@ -11,7 +15,8 @@ def model_type_mock() -> Mock:
     """ Fixture for create sql model type mock """
     mock = Mock()
     mock.__name__ = 'Mock'
-    mock.model_fields = ['id', 'name']
+    mock.model_fields = {'id': Mock(annotation=uuid.UUID | None), 'name': Mock(annotation=str)}
+    mock.__sqlmodel_relationships__ = {}
     return mock
 
 
@@ -38,7 +43,9 @@ def repo_mock() -> AsyncMock:
     repo.create.return_value = Mock()
     repo.get_items.return_value = [Mock()]
     repo.update.return_value = Mock()
+    repo.update_by_id.return_value = Mock()
     repo.delete.return_value = None
+    repo.delete_by_id.return_value = Mock()
 
     return repo
 
@@ -58,20 +65,24 @@ async def test_call_create(manager: ModelManager):
     new_item = Mock()
     await manager.create(None, new_item)
 
-    manager.repo.create.assert_awaited_once_with(None, manager.model, model=new_item)
+    manager.repo.create.assert_awaited_once_with(None, manager.model, model=new_item, commit=False)
+    manager.repo.commit.assert_awaited_once_with(None)
 
 
 @pytest.mark.asyncio
 async def test_call_update(manager: ModelManager, model_mock_with_id: Mock):
     """
-    Test then ModelManager correctly call 'update' method of AsyncRepository
+    Test then ModelManager correctly call 'update_by_id' method of AsyncRepository without loading the item
     :param manager: fixture of a ModelManager
     :param model_mock_with_id: fixture of a sql model mock with id
     """
-    await manager.update(None, model_mock_with_id)
+    item = await manager.update(None, model_mock_with_id)
 
-    manager.repo.get_items.assert_awaited_once_with(None, manager.model, filters={'id': model_mock_with_id.id}, offset=None, limit=None)
-    manager.repo.update.assert_awaited_once_with(None, manager.repo.get_items.return_value[0], model=model_mock_with_id)
+    manager.repo.get_items.assert_not_awaited()
+    manager.repo.update_by_id.assert_awaited_once_with(None, manager.model, model_mock_with_id.id,
+                                                       model=model_mock_with_id, commit=False, expand=[])
+    manager.repo.commit.assert_awaited_once_with(None)
+    assert item == manager.repo.update_by_id.return_value
 
 
 @pytest.mark.asyncio
@@ -81,25 +92,27 @@ async def test_update_exception(manager: ModelManager, model_mock_with_id):
     :param manager: fixture of a ModelManager
     :param model_mock_with_id: fixture of a sql model mock with id
     """
-    manager.repo.get_items.return_value = None
+    manager.repo.update_by_id.return_value = None
 
     with pytest.raises(EntityNotFound):
         await manager.update(None, model_mock_with_id)
 
+    manager.repo.commit.assert_not_awaited()
+
 
 @pytest.mark.asyncio
 async def test_call_delete(manager: ModelManager, model_mock_with_id: Mock):
     """
-    Test then ModelManager correctly call 'delete' method of AsyncRepository
+    Test then ModelManager correctly call 'delete_by_id' method of AsyncRepository without loading the item
     :param manager: fixture of a ModelManager
     :param model_mock_with_id: fixture of a sql model mock with id
     """
-    manager.repo.get_items.return_value = [model_mock_with_id]
+    manager.repo.delete_by_id.return_value = model_mock_with_id
 
     item = await manager.delete(None, model_mock_with_id.id)
 
-    manager.repo.get_items.assert_awaited_once_with(None, manager.model, filters={'id': model_mock_with_id.id}, offset=None, limit=None)
-    manager.repo.delete.assert_awaited_once_with(None, model_mock_with_id)
+    manager.repo.get_items.assert_not_awaited()
+    manager.repo.delete_by_id.assert_awaited_once_with(None, manager.model, model_mock_with_id.id)
     assert item == model_mock_with_id
 
 
@@ -109,12 +122,35 @@ async def test_delete_exception(manager: ModelManager):
     Test then ModelManager raise exception if repository return None
     :param manager: fixture of a ModelManager
     """
-    manager.repo.get_items.return_value = None
+    manager.repo.delete_by_id.return_value = None
 
     with pytest.raises(EntityNotFound):
         await manager.delete(None, uuid.uuid4())
 
 
+@pytest.mark.asyncio
+async def test_get_converts_filter_operands(manager: ModelManager):
+    """
+    Test then ModelManager converts operands of operator filters and items of collections to the model field types
+    :param manager: fixture of a ModelManager
+    """
+    uid = uuid.uuid4()
+    await manager.get(session=None, filters={'id': {'in': [str(uid)], 'ne': str(uid)}, 'name': {'like': 'Sun'}})
+
+    filters = manager.repo.get_items.call_args.kwargs['filters']
+    assert filters == {'id': {'in': [uid], 'ne': uid}, 'name': {'like': 'Sun'}}
+
+
+@pytest.mark.asyncio
+async def test_get_invalid_filter_operand(manager: ModelManager):
+    """
+    Test then ModelManager raises InvalidQuery if an operand does not match the model field type
+    :param manager: fixture of a ModelManager
+    """
+    with pytest.raises(InvalidQuery):
+        await manager.get(session=None, filters={'id': {'in': ['x']}})
+    manager.repo.get_items.assert_not_awaited()
+
 @pytest.mark.asyncio
 async def test_call_get_items(manager: ModelManager, model_mock_with_id: Mock):
     """
@@ -130,10 +166,27 @@ async def test_call_get_items(manager: ModelManager, model_mock_with_id: Mock):
 
     items = await manager.get(session=None, filters=filters, offset=offset, limit=limit)
 
-    manager.repo.get_items.assert_awaited_once_with(None, manager.model,  filters=filters, offset=offset, limit=limit)
+    manager.repo.get_items.assert_awaited_once_with(None, manager.model,  filters=filters, offset=offset, limit=limit,
+                                                   order_by=manager.order_keys, expand=None, with_total=False)
     assert items == manager.repo.get_items.return_value
 
 
+@pytest.mark.asyncio
+async def test_call_get_items_ordered(manager: ModelManager, model_mock_with_id: Mock):
+    """
+    Test then ModelManager completes requested order with order keys
+    :param manager: fixture of a ModelManager
+    :param model_mock_with_id: fixture of a sql model mock with id
+    """
+    manager.repo.get_items.return_value = [model_mock_with_id]
+
+    await manager.get(session=None, order_by=['-name'], expand=['images'])
+
+    manager.repo.get_items.assert_awaited_once_with(None, manager.model, filters=None, offset=None, limit=None,
+                                                   order_by=['-name'] + manager.order_keys, expand=['images'],
+                                                   with_total=False)
+
+
 @pytest.mark.asyncio
 async def test_call_get_one_field(manager: ModelManager, model_mock_with_id: Mock):
     """
@@ -189,4 +242,189 @@ async def test_call_get_for_update(manager: ModelManager, model_mock_with_id: Mo
     items = await manager.get_for_update(session=None, filters=filters, offset=offset, limit=limit, relationships=fields)
 
     manager.repo.get_for_update.assert_awaited_once_with(None, manager.model, filters=filters, limit=limit, offset=offset, selectin_fields=fields)
-    assert items == manager.repo.get_for_update.return_value
\ No newline at end of file
+    assert items == manager.repo.get_for_update.return_value
+
+
+@pytest.mark.asyncio
+async def test_call_get_page(manager: ModelManager):
+    """
+    Test then ModelManager requests one extra item to detect the next page and returns its cursor
+    :param manager: fixture of a ModelManager
+    """
+    items = [Mock(id=uuid.uuid4()) for _ in range(3)]
+    manager.repo.get_items.return_value = items
+
+    page, next_cursor = await manager.get_page(session=None, limit=2, cursor='')
+
+    manager.repo.get_items.assert_awaited_once_with(None, manager.model, filters=None, limit=3,
+                                                    order_by=manager.order_keys, after=None, expand=None,
+                                                    with_total=False)
+    assert page == items[:2]
+    assert next_cursor == encode_cursor([items[1].id])
+
+
+@pytest.mark.asyncio
+async def test_call_get_page_last(manager: ModelManager):
+    """
+    Test then ModelManager returns None cursor for the last page
+    :param manager: fixture of a ModelManager
+    """
+    items = [Mock(id=uuid.uuid4()) for _ in range(2)]
+    manager.repo.get_items.return_value = items
+
+    page, next_cursor = await manager.get_page(session=None, limit=2, cursor='')
+
+    assert page == items
+    assert next_cursor is None
+
+
+@pytest.mark.asyncio
+async def test_call_get_page_fields(manager: ModelManager):
+    """
+    Test then ModelManager selects order keys to build the cursor and drops them from the result
+    :param manager: fixture of a ModelManager
+    """
+    rows = [[uuid.uuid4().hex, uuid.uuid4()] for _ in range(2)]
+    manager.repo.get_fields.return_value = rows
+
+    page, next_cursor = await manager.get_page(session=None, limit=1, cursor='', fields=['name'])
+
+    assert page == [{'name': rows[0][0]}]
+    assert next_cursor == encode_cursor([rows[0][1]])
+
+
+@pytest.mark.asyncio
+async def test_call_batch(manager: ModelManager, model_mock_with_id: Mock):
+    """
+    Test then ModelManager applies batch operations without intermediate commits
+    :param manager: fixture of a ModelManager
+    :param model_mock_with_id: fixture of a sql model mock with id
+    """
+    new_item, deleted_id = Mock(), uuid.uuid4()
+    manager.repo.create_all.return_value = [Mock()]
+    manager.repo.update_all.return_value = [model_mock_with_id]
+    manager.repo.delete_all.return_value = [deleted_id]
+
+    result = await manager.batch(None, create=[new_item], update=[model_mock_with_id], delete=[deleted_id])
+
+    manager.repo.create_all.assert_awaited_once_with(None, manager.model, [new_item], commit=False)
+    manager.repo.update_all.assert_awaited_once_with(None, manager.model, [model_mock_with_id], commit=False,
+                                                     expand=[])
+    manager.repo.delete_all.assert_awaited_once_with(None, manager.model, [deleted_id], commit=False)
+    manager.repo.commit.assert_awaited_once_with(None)
+    assert result == (manager.repo.create_all.return_value, [model_mock_with_id], [deleted_id])
+
+
+@pytest.mark.asyncio
+async def test_batch_exception(manager: ModelManager, model_mock_with_id: Mock):
+    """
+    Test then ModelManager raise exception and does not commit if any updatable item does not exist
+    :param manager: fixture of a ModelManager
+    :param model_mock_with_id: fixture of a sql model mock with id
+    """
+    manager.repo.create_all.return_value = []
+    manager.repo.update_all.return_value = [None]
+    manager.repo.delete_all.return_value = []
+
+    with pytest.raises(EntityNotFound):
+        await manager.batch(None, update=[model_mock_with_id])
+
+    manager.repo.commit.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_get_by_ids_exception(manager: ModelManager, model_mock_with_id: Mock):
+    """
+    Test then ModelManager raise exception if any of requested ids does not exist
+    :param manager: fixture of a ModelManager
+    :param model_mock_with_id: fixture of a sql model mock with id
+    """
+    manager.repo.get_items.return_value = [model_mock_with_id]
+
+    assert await manager.get_by_ids(None, [model_mock_with_id.id]) == {model_mock_with_id.id: model_mock_with_id}
+    with pytest.raises(EntityNotFound):
+        await manager.get_by_ids(None, [model_mock_with_id.id, uuid.uuid4()])
+
+
+@pytest.mark.asyncio
+async def test_call_get_nested_fields(repo_mock: AsyncMock):
+    """
+    Test then ModelManager assembles fields of related items into nested dicts
+    :param repo_mock: fixture of an async repo mock
+    """
+    manager = ModelManager(Project, repo_mock)
+    project_id = uuid.uuid4()
+    repo_mock.get_fields.return_value = [('title', project_id)]
+    repo_mock.get_related_fields.return_value = [(project_id, 'image.png')]
+
+    result = await manager.get(session=None, fields=['title', 'images.path', 'master_plan.path'])
+
+    assert repo_mock.get_fields.await_args.args[2:] == (Project.title, Project.id)
+    assert repo_mock.get_related_fields.await_args_list[0].args[2:] == ('images', [project_id], File.path)
+    assert result == [{'title': 'title', 'images': [{'path': 'image.png'}], 'master_plan': {'path': 'image.png'}}]
+
+
+@pytest.mark.asyncio
+async def test_get_unknown_field(repo_mock: AsyncMock):
+    """
+    Test then ModelManager raises exception for unknown fields
+    :param repo_mock: fixture of an async repo mock
+    """
+    manager = ModelManager(Project, repo_mock)
+
+    with pytest.raises(InvalidQuery):
+        await manager.get(session=None, fields=['title', 'images.unknown'])
+
+
+@pytest.mark.asyncio
+async def test_call_get_with_total(manager: ModelManager, model_mock_with_id: Mock):
+    """
+    Test then ModelManager returns total together with items
+    :param manager: fixture of a ModelManager
+    :param model_mock_with_id: fixture of a sql model mock with id
+    """
+    manager.repo.get_items.return_value = ([model_mock_with_id], 10, True)
+
+    items, total, estimated = await manager.get(session=None, limit=1, with_total=True)
+
+    assert items == [model_mock_with_id]
+    assert (total, estimated) == (10, True)
+
+
+@pytest.mark.asyncio
+async def test_call_get_page_with_total(manager: ModelManager, model_mock_with_id: Mock):
+    """
+    Test then ModelManager returns total together with page of fields
+    :param manager: fixture of a ModelManager
+    :param model_mock_with_id: fixture of a sql model mock with id
+    """
+    manager.repo.get_fields.return_value = ([model_mock_with_id.id], 1, False)
+
+    items, next_cursor, total, estimated = await manager.get_page(session=None, limit=1, fields=['id'],
+                                                                  with_total=True)
+
+    assert items == [{'id': model_mock_with_id.id}]
+    assert next_cursor is None
+    assert (total, estimated) == (1, False)
+
+
+@pytest.mark.asyncio
+async def test_get_page_carries_total(manager: ModelManager):
+    """
+    Test then ModelManager counts total with the first page only and carries it to the next pages by the cursor
+    :param manager: fixture of a ModelManager
+    """
+    ids = [uuid.uuid4() for _ in range(3)]
+    manager.repo.get_fields.return_value = (ids[:2], 3, False)
+
+    _, next_cursor, total, _ = await manager.get_page(session=None, limit=1, fields=['id'], with_total=True)
+    assert manager.repo.get_fields.call_args.kwargs['with_total'] is True
+
+    manager.repo.get_fields.return_value = ids[1:]
+    items, _, total, estimated = await manager.get_page(session=None, limit=1, cursor=next_cursor, fields=['id'],
+                                                        with_total=True)
+
+    assert manager.repo.get_fields.call_args.kwargs['with_total'] is False
+    assert manager.repo.get_fields.call_args.kwargs['after'] == [ids[0]]
+    assert items == [{'id': ids[1]}]
+    assert (total, estimated) == (3, False)
@@ -0,0 +1,50 @@
+import pytest
+import uuid
+from sqlmodel import SQLModel
+
+from backend.repository.cursor import encode_cursor, decode_cursor, decode_cursor_total
+from backend.repository.exceptions import InvalidCursor
+
+
+class CursorModel(SQLModel):
+    id: uuid.UUID
+    number: int
+
+
+def test_cursor_round_trip():
+    """ Test that decoded cursor values have the model attribute types """
+    values = [uuid.uuid4(), 42]
+
+    cursor = encode_cursor(values)
+
+    assert decode_cursor(cursor, CursorModel, ['id', 'number']) == values
+
+
+def test_invalid_cursor():
+    """ Test that malformed cursors raise exception """
+    invalid_cursors = ['not a cursor', encode_cursor([1]), encode_cursor(['not uuid', 1]), encode_cursor({'id': 1})]
+
+    for cursor in invalid_cursors:
+        with pytest.raises(InvalidCursor):
+            decode_cursor(cursor, CursorModel, ['id', 'number'])
+
+
+def test_cursor_with_total():
+    """ Test that cursor carries total together with keyset values """
+    values = [uuid.uuid4(), 42]
+
+    cursor = encode_cursor(values, (1000, True))
+
+    assert decode_cursor(cursor, CursorModel, ['id', 'number']) == values
+    assert decode_cursor_total(cursor) == (1000, True)
+    assert decode_cursor_total(encode_cursor(values)) is None
+
+
+def test_invalid_cursor_total():
+    """ Test that cursors with malformed total raise exception """
+    invalid_cursors = ['not a cursor', encode_cursor([1], (-1, False)), encode_cursor([1], ('10', False)),
+                       encode_cursor([1], (10, None)), encode_cursor({'after': [1]})]
+
+    for cursor in invalid_cursors:
+        with pytest.raises(InvalidCursor):
+            decode_cursor_total(cursor)
@@ -0,0 +1,66 @@
+import pytest
+import uuid
+from unittest.mock import AsyncMock, Mock
+
+from backend.repository.managers import ProjectManager
+from backend.repository.models.project import Project, ProjectUpdate
+from backend.repository.models.auth import RefreshToken  # configures User mapper
+
+
+@pytest.fixture
+def manager() -> ProjectManager:
+    """ Fixture for create ProjectManager with async repo mock """
+    manager = ProjectManager(Project, AsyncMock())
+    manager.file_manager = AsyncMock()
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_update_loads_only_replaced_links(manager: ProjectManager):
+    """
+    Test then update loads only the relationships replaced by the update and the expanded ones
+    :param manager: fixture of a ProjectManager
+    """
+    image_id, plan_id = uuid.uuid4(), uuid.uuid4()
+    image, plan = Mock(), Mock()
+    manager.file_manager.get_by_ids.return_value = {image_id: image, plan_id: plan}
+    update = ProjectUpdate(id=uuid.uuid4(), images_ids=[image_id], master_plan_id=plan_id)
+
+    item = await manager.update(None, update, expand=['details'])
+
+    manager.repo.update_by_id.assert_awaited_once_with(None, Project, update.id, model=update, commit=False,
+                                                       expand=['details', 'images', 'master_plan'])
+    manager.file_manager.get_by_ids.assert_awaited_once_with(None, [image_id, plan_id])
+    assert item.images == [image]
+    assert item.master_plan == plan
+
+
+@pytest.mark.asyncio
+async def test_update_without_links(manager: ProjectManager):
+    """
+    Test then update of columns only does not load relationships
+    :param manager: fixture of a ProjectManager
+    """
+    update = ProjectUpdate(id=uuid.uuid4(), title='title')
+
+    await manager.update(None, update)
+
+    manager.repo.update_by_id.assert_awaited_once_with(None, Project, update.id, model=update, commit=False,
+                                                       expand=[])
+
+
+@pytest.mark.asyncio
+async def test_update_deduplicates_list_link_ids(manager: ProjectManager):
+    """
+    Test then repeated ids of a list link are requested and linked once keeping their order
+    :param manager: fixture of a ProjectManager
+    """
+    first, second = uuid.uuid4(), uuid.uuid4()
+    files = {first: Mock(), second: Mock()}
+    manager.file_manager.get_by_ids.return_value = files
+    update = ProjectUpdate(id=uuid.uuid4(), images_ids=[second, first, second, first])
+
+    item = await manager.update(None, update)
+
+    manager.file_manager.get_by_ids.assert_awaited_once_with(None, [second, first])
+    assert item.images == [files[second], files[first]]
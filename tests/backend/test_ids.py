@@ -0,0 +1,40 @@
+import uuid
+import pytest
+from typing import get_args
+from unittest.mock import patch
+from pydantic import ValidationError
+
+from common import settings
+from common.settings import Settings
+from backend.repository.models.common.ids import uuid7, new_id, ID_GENERATORS
+
+
+def test_uuid7_format():
+    """ Test that generated id is UUID of version 7 with RFC variant """
+    uid = uuid7()
+    assert uid.version == 7
+    assert uid.variant == uuid.RFC_4122
+
+
+def test_uuid7_is_time_ordered():
+    """ Test that ids generated one after another increase, even within one millisecond """
+    ids = [uuid7() for _ in range(10000)]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+
+
+def test_new_id_generator_setting():
+    """ Test that models id generator is switched by the setting """
+    with patch('backend.repository.models.common.ids.settings') as patched:
+        patched.id_generator = 'uuid4'
+        assert new_id().version == 4
+        patched.id_generator = 'uuid7'
+        assert new_id().version == 7
+
+
+def test_id_generator_setting_is_validated():
+    """ Test that unknown id generator fails settings validation at startup instead of the first insert """
+    assert set(get_args(Settings.model_fields['id_generator'].annotation)) == set(ID_GENERATORS)
+
+    with pytest.raises(ValidationError):
+        Settings(**{**settings.model_dump(), 'id_generator': 'uuid8'})
@@ -0,0 +1,102 @@
+import pytest
+from unittest.mock import AsyncMock, Mock
+
+from backend.repository.lazysession import LazySession, release_session
+from backend.repository.unitofwork import begin_unit_of_work, end_unit_of_work, in_unit_of_work
+
+
+def make_session() -> AsyncMock:
+    session = AsyncMock()
+    session.info = {}
+    return session
+
+
+@pytest.fixture
+def factory() -> Mock:
+    """ Fixture for mocking database session class """
+    return Mock(side_effect=make_session)
+
+
+@pytest.mark.asyncio
+async def test_session_created_on_first_use(factory: Mock):
+    """ Test then session is created on first use and keeps info set before
+    :param factory: fixture of a session class
+    """
+    proxy = LazySession(factory)
+    begin_unit_of_work(proxy)
+    await proxy.close()
+
+    factory.assert_not_called()
+    assert not proxy.acquired
+
+    await proxy.execute('select 1')
+
+    factory.assert_called_once()
+    assert proxy.acquired
+    assert in_unit_of_work(proxy)
+
+
+@pytest.mark.asyncio
+async def test_unit_of_work_without_session(factory: Mock):
+    """ Test then ending unit of work of a never used proxy does not create a session
+    :param factory: fixture of a session class
+    """
+    proxy = LazySession(factory)
+    begin_unit_of_work(proxy)
+
+    await end_unit_of_work(proxy, commit=True)
+
+    factory.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_release(factory: Mock):
+    """ Test then release commits the opened unit of work, closes the session and the next use creates
+    a new session keeping the session info
+    :param factory: fixture of a session class
+    """
+    proxy = LazySession(factory)
+    begin_unit_of_work(proxy)
+    await proxy.flush()
+    session = proxy._session
+    session.info['written'] = True
+
+    await proxy.release()
+
+    session.commit.assert_awaited_once()
+    session.close.assert_awaited_once()
+    assert not proxy.acquired
+    assert not in_unit_of_work(proxy)
+
+    await proxy.execute('select 1')
+
+    assert factory.call_count == 2
+    assert proxy.info == {'written': True}
+
+
+@pytest.mark.asyncio
+async def test_release_plain_session():
+    """ Test then releasing a plain session commits the opened unit of work and closes the session """
+    session = make_session()
+    begin_unit_of_work(session)
+
+    await release_session(session)
+
+    session.commit.assert_awaited_once()
+    session.close.assert_awaited_once()
+    assert not in_unit_of_work(session)
+
+
+@pytest.mark.asyncio
+async def test_release_callback(factory: Mock):
+    """ Test then release calls the release callback even if the session is not created
+    :param factory: fixture of a session class
+    """
+    on_release = Mock()
+    proxy = LazySession(factory, on_release=on_release)
+    await proxy.release()
+    on_release.assert_called_once()
+
+    await proxy.execute('select 1')
+    await proxy.release()
+    assert on_release.call_count == 2
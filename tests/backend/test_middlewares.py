@@ -0,0 +1,201 @@
+import pytest
+from unittest.mock import AsyncMock, Mock
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import StreamingResponse
+from httpx import AsyncClient, ASGITransport
+
+from backend.api.middlewares import DatabaseSessionMiddleware, OAuthMiddleware, RouteMatcher, DB_ROUTES, AUTH_ROUTES, \
+    STATIC_ROUTES, VIEW_ROUTES
+from backend.auth.exceptions import CouldNotValidateCredentials
+
+
+@pytest.fixture
+def session() -> AsyncMock:
+    """ Fixture for mocking async session """
+    session = AsyncMock()
+    session.info = {}
+    return session
+
+
+@pytest.fixture
+def app(session: AsyncMock) -> FastAPI:
+    """ Fixture for application with oauth and session middlewares """
+    app = FastAPI()
+
+    async def item(request: Request):
+        await request.state.db_session.execute('select 1')
+        return {'session': request.state.db_session.acquired, 'user': request.state.user}
+
+    async def fail(request: Request):
+        await request.state.db_session.execute('select 1')
+        raise HTTPException(status_code=400)
+
+    async def stream(request: Request):
+        await request.state.db_session.execute('select 1')
+
+        async def body():
+            yield b'open' if not session.close.await_count else b'closed'
+        return StreamingResponse(body())
+
+    app.add_api_route('/api/item', item, methods=['GET', 'POST'])
+    app.add_api_route('/api/fail', fail, methods=['POST'])
+    app.add_api_route('/api/stream', stream, methods=['GET'])
+    app.add_api_route('/free', lambda: {}, methods=['GET'])
+    auth_system = AsyncMock()
+    auth_system.user_by_token.return_value = 'user'
+    matcher = RouteMatcher({DB_ROUTES: ['/api']})
+    app.add_middleware(OAuthMiddleware, auth_system=auth_system, matcher=matcher)
+    app.add_middleware(DatabaseSessionMiddleware, session=Mock(return_value=session), matcher=matcher)
+    app.state.auth_system = auth_system
+    return app
+
+
+def client(app: FastAPI) -> AsyncClient:
+    return AsyncClient(transport=ASGITransport(app=app), base_url='http://test',
+                       headers={'Authorization': 'Bearer token'})
+
+
+def test_route_matcher():
+    """ Test then matcher finds label of the longest prefix and the first label on equal prefixes """
+    matcher = RouteMatcher({'auth': ['/api/auth'], 'db': ['/api/auth', '/api', '/api/project']})
+
+    assert matcher.match('/api/auth/token') == 'auth'
+    assert matcher.match('/api/project/1') == 'db'
+    assert matcher.match('/static/app.js') is None
+    assert RouteMatcher({}).match('/api') is None
+
+
+@pytest.mark.asyncio
+async def test_session_and_user_in_state(app: FastAPI, session: AsyncMock):
+    """ Test then middlewares put session and user to request state and close session after response
+    :param app: fixture of an application
+    :param session: fixture of an async session
+    """
+    async with client(app) as c:
+        response = await c.get('/api/item')
+
+    assert response.json() == {'session': True, 'user': 'user'}
+    session.execute.assert_awaited_once_with('select 1')
+    session.close.assert_awaited_once()
+    session.commit.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_unit_of_work_commit_and_rollback(app: FastAPI, session: AsyncMock):
+    """ Test then mutating request is committed on success and rolled back on error response
+    :param app: fixture of an application
+    :param session: fixture of an async session
+    """
+    async with client(app) as c:
+        await c.post('/api/item')
+        session.commit.assert_awaited_once()
+        session.rollback.assert_not_awaited()
+
+        await c.post('/api/fail')
+
+    session.rollback.assert_awaited_once()
+    assert session.close.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_session_open_while_streaming(app: FastAPI, session: AsyncMock):
+    """ Test then session is closed only after streaming response body is sent
+    :param app: fixture of an application
+    :param session: fixture of an async session
+    """
+    async with client(app) as c:
+        response = await c.get('/api/stream')
+
+    assert response.content == b'open'
+    session.close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('headers', [{}, {'Authorization': 'Basic token'}, {'Authorization': 'Bearer'}])
+async def test_oauth_invalid_header(app: FastAPI, session: AsyncMock, headers: dict):
+    """ Test then request without valid authorization header gets 401 and the handler is not called
+    :param app: fixture of an application
+    :param session: fixture of an async session
+    :param headers: request headers
+    """
+    async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test', headers=headers) as c:
+        response = await c.get('/api/item')
+
+    assert response.status_code == 401
+    app.state.auth_system.user_by_token.assert_not_awaited()
+    session.close.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_oauth_invalid_token(app: FastAPI):
+    """ Test then request with invalid token gets 401 instead of 500
+    :param app: fixture of an application
+    """
+    app.state.auth_system.user_by_token.side_effect = CouldNotValidateCredentials()
+
+    async with client(app) as c:
+        response = await c.get('/api/item')
+
+    assert response.status_code == 401
+    assert response.json() == {'detail': 'Could not validate credentials'}
+
+
+@pytest.mark.asyncio
+async def test_not_handled_route(app: FastAPI, session: AsyncMock):
+    """ Test then routes out of allowed routes pass without session and authorization
+    :param app: fixture of an application
+    :param session: fixture of an async session
+    """
+    async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as c:
+        response = await c.get('/free')
+
+    assert response.status_code == 200
+    session.close.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_shared_route_matcher(session: AsyncMock):
+    """ Test then middlewares sharing a matcher classify a request path once, open session for db and auth
+    routes, authorize only db routes and skip static and view routes
+    :param session: fixture of an async session
+    """
+    matcher = RouteMatcher({AUTH_ROUTES: ['/api/auth'], DB_ROUTES: ['/api/item'], STATIC_ROUTES: ['/static'],
+                            VIEW_ROUTES: ['']})
+    matcher.match = Mock(wraps=matcher.match)
+    auth_system = AsyncMock()
+    app = FastAPI()
+    async def probe(request: Request):
+        return {'session': hasattr(request.state, 'db_session')}
+
+    for path in ('/api/auth/token', '/api/item', '/static/app.js', '/promo'):
+        app.add_api_route(path, probe, methods=['GET'])
+    app.add_middleware(OAuthMiddleware, auth_system=auth_system, matcher=matcher)
+    app.add_middleware(DatabaseSessionMiddleware, session=Mock(return_value=session), matcher=matcher)
+
+    async with client(app) as c:
+        responses = [await c.get(path) for path in ('/api/auth/token', '/api/item', '/static/app.js', '/promo')]
+
+    assert [response.json()['session'] for response in responses] == [True, True, False, False]
+    assert matcher.match.call_count == 4
+    auth_system.user_by_token.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_early_release(app: FastAPI, session: AsyncMock):
+    """ Test then handler releasing the session commits its work at once and the middleware does not commit again
+    :param app: fixture of an application
+    :param session: fixture of an async session
+    """
+    async def release(request: Request):
+        await request.state.db_session.execute('select 1')
+        await request.state.db_session.release()
+        return {'session': request.state.db_session.acquired}
+
+    app.add_api_route('/api/release', release, methods=['POST'])
+
+    async with client(app) as c:
+        response = await c.post('/api/release')
+
+    assert response.json() == {'session': False}
+    session.commit.assert_awaited_once()
+    session.close.assert_awaited_once()
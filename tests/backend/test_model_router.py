@@ -0,0 +1,51 @@
+import pytest
+from unittest.mock import AsyncMock, Mock
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+
+from backend.api import create_model_router, ModelCollection
+from backend.api.middlewares import HttpExceptionMapper, DatabaseSessionMiddleware, RouteMatcher, read_only_paths, \
+    DB_ROUTES, READ_ROUTES
+from backend.repository.database import AsyncRepository
+from backend.repository.managers import ApartmentManager
+from backend.repository.models.apartment import Apartment, ApartmentPublic, ApartmentCreate, ApartmentUpdate
+from backend.repository.models.auth import RefreshToken  # configures User mapper
+
+
+@pytest.fixture
+def session() -> AsyncMock:
+    """ Fixture for mocking async session """
+    session = AsyncMock()
+    session.info = {}
+    return session
+
+
+@pytest.fixture
+def app(session: AsyncMock) -> FastAPI:
+    """ Fixture for application with apartment router """
+    router = create_model_router(ApartmentManager(Apartment, AsyncRepository()),
+                                 ModelCollection(public=ApartmentPublic, create=ApartmentCreate,
+                                                 update=ApartmentUpdate), prefix='/api/apartment')
+    app = FastAPI()
+    app.include_router(router.router)
+    _ = HttpExceptionMapper(app)
+    matcher = RouteMatcher({DB_ROUTES: ['/api'], READ_ROUTES: read_only_paths(router.router)})
+    app.add_middleware(DatabaseSessionMiddleware, session=Mock(return_value=session), matcher=matcher)
+    return app
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('filters', [{'size': {'gte': 'abc'}}, {'size': {'lt': [1]}}, {'size': 'abc'},
+                                     {'id': {'in': ['x']}}, {'id': {'eq': 'x'}}, {'id': ['x']}])
+async def test_query_invalid_operand(app: FastAPI, session: AsyncMock, filters: dict):
+    """
+    Test then query with an operand of a wrong type is rejected with 400 before the database is queried
+    :param app: fixture of an application
+    :param session: fixture of an async session
+    :param filters: filters with a wrong typed operand
+    """
+    async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as client:
+        response = await client.post('/api/apartment/query', json=filters)
+
+    assert response.status_code == 400
+    session.exec.assert_not_awaited()
@@ -0,0 +1,89 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import text, exc
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from backend.api import PoolRouter
+from backend.api.middlewares import DatabaseSessionMiddleware, OAuthMiddleware, RouteMatcher, DB_ROUTES
+from backend.repository.models.common.user import Privilege
+from backend.repository.pool import WaitHistogram, MeteredPool, pool_options, pool_status
+
+
+def test_wait_histogram():
+    """ Test then histogram counts observations cumulatively by bucket bounds """
+    histogram = WaitHistogram(buckets=(0.01, 0.1))
+    for seconds in (0.001, 0.01, 0.05, 2):
+        histogram.observe(seconds)
+
+    snapshot = histogram.snapshot()
+
+    assert snapshot['buckets'] == {'0.01': 2, '0.1': 3, '+Inf': 4}
+    assert snapshot['count'] == 4
+    assert snapshot['sum'] == pytest.approx(2.061)
+
+
+def test_pool_options():
+    """ Test then pool options are taken from settings and asyncpg statement cache is set only for asyncpg """
+    settings = SimpleNamespace(db_driver='postgresql+asyncpg', db_pool_size=20, db_max_overflow=0,
+                               db_pool_timeout_secs=2, db_pool_pre_ping=True, db_pool_recycle_secs=1800,
+                               db_statement_cache_size=0)
+
+    options = pool_options(settings)
+
+    assert options == {'poolclass': MeteredPool, 'pool_size': 20, 'max_overflow': 0, 'pool_timeout': 2,
+                       'pool_pre_ping': True, 'pool_recycle': 1800, 'connect_args': {'statement_cache_size': 0}}
+    settings.db_driver = 'sqlite+aiosqlite'
+    assert 'connect_args' not in pool_options(settings)
+
+
+@pytest.mark.asyncio
+async def test_metered_pool_status():
+    """ Test then metered pool reports checked out connections, waiting times and checkout timeouts """
+    engine = create_async_engine('sqlite+aiosqlite://', poolclass=MeteredPool, pool_size=1, max_overflow=0,
+                                 pool_timeout=0.01)
+    async with engine.connect() as connection:
+        await connection.execute(text('select 1'))
+        status = pool_status(engine.pool)
+        assert (status['size'], status['checked_out'], status['idle'], status['overflow']) == (1, 1, 0, 0)
+
+        with pytest.raises(exc.TimeoutError):
+            async with engine.connect():
+                pass
+
+    status = pool_status(engine.pool)
+    await engine.dispose()
+
+    assert (status['checked_out'], status['idle'], status['timeouts']) == (0, 1, 1)
+    assert status['wait_seconds']['count'] == 2
+
+
+@pytest.mark.asyncio
+async def test_pool_router_requires_admin():
+    """ Test then pool status is served to authenticated admins only """
+    engine = create_async_engine('sqlite+aiosqlite://', poolclass=MeteredPool, pool_size=1, max_overflow=0)
+    session = AsyncMock()
+    session.info = {}
+    auth_system = AsyncMock()
+    router = PoolRouter({'primary': engine}, prefix='/internal/pool')
+    app = FastAPI()
+    app.include_router(router.router)
+    matcher = RouteMatcher({DB_ROUTES: [router.router.prefix]})
+    app.add_middleware(OAuthMiddleware, auth_system=auth_system, matcher=matcher)
+    app.add_middleware(DatabaseSessionMiddleware, session=Mock(return_value=session), matcher=matcher)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as client:
+        assert (await client.get('/internal/pool')).status_code == 401
+
+        headers = {'Authorization': 'Bearer token'}
+        auth_system.user_by_token.return_value = SimpleNamespace(privilege=Privilege.user)
+        assert (await client.get('/internal/pool', headers=headers)).status_code == 403
+
+        auth_system.user_by_token.return_value = SimpleNamespace(privilege=Privilege.admin)
+        response = await client.get('/internal/pool', headers=headers)
+    await engine.dispose()
+
+    assert response.status_code == 200
+    assert response.json()['primary']['size'] == 1
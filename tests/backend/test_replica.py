@@ -0,0 +1,81 @@
+import pytest
+from unittest.mock import AsyncMock, Mock
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+
+from backend.api import create_model_router, ModelCollection
+from backend.api.middlewares import DatabaseSessionMiddleware, RouteMatcher, read_only_paths, DB_ROUTES, READ_ROUTES
+from backend.repository.database import AsyncRepository, READ_REPLICA
+from backend.repository.managers import PromotionManager
+from backend.repository.unitofwork import begin_unit_of_work
+from backend.repository.models.promotion import Promotion, PromotionPublic, PromotionCreate, PromotionUpdate
+from backend.repository.models.auth import RefreshToken  # configures User mapper
+
+
+@pytest.fixture
+def replica() -> Mock:
+    """ Fixture for mocking replica async engine """
+    return Mock()
+
+
+@pytest.fixture
+def session() -> AsyncMock:
+    """ Fixture for mocking async session """
+    session = AsyncMock()
+    session.info = {}
+    return session
+
+
+def test_reads_without_replica(session: AsyncMock):
+    """ Test that reads are not routed if replica is not configured """
+    assert AsyncRepository()._read_options(session) == {}
+
+
+def test_reads_routed_to_replica(replica: Mock, session: AsyncMock):
+    """ Test that reads of a session without writes are routed to replica """
+    assert AsyncRepository(replica=replica)._read_options(session) == {READ_REPLICA: replica.sync_engine}
+
+
+@pytest.mark.asyncio
+async def test_read_your_writes(replica: Mock, session: AsyncMock):
+    """ Test that reads of a session stay on primary after commit """
+    repo = AsyncRepository(replica=replica)
+    await repo.commit(session)
+
+    assert repo._read_options(session) == {}
+
+
+def test_unit_of_work_reads_primary(replica: Mock, session: AsyncMock):
+    """ Test that reads of a mutating request stay on primary """
+    begin_unit_of_work(session)
+
+    assert AsyncRepository(replica=replica)._read_options(session) == {}
+
+
+@pytest.mark.asyncio
+async def test_get_items_routed_to_replica(replica: Mock, session: AsyncMock):
+    """ Test that get_items executes statement with replica option """
+    session.exec.return_value = []
+    await AsyncRepository(replica=replica).get_items(session, Promotion, limit=10)
+
+    assert session.exec.call_args.kwargs['execution_options'] == {READ_REPLICA: replica.sync_engine}
+
+
+@pytest.mark.asyncio
+async def test_query_routed_to_replica(replica: Mock, session: AsyncMock):
+    """ Test that a filtered POST query of the model router is a read routed to replica """
+    session.exec.return_value = []
+    manager = PromotionManager(Promotion, AsyncRepository(replica=replica))
+    router = create_model_router(manager, ModelCollection(public=PromotionPublic, create=PromotionCreate,
+                                                          update=PromotionUpdate), prefix='/api/promotion')
+    app = FastAPI()
+    app.include_router(router.router)
+    matcher = RouteMatcher({DB_ROUTES: ['/api'], READ_ROUTES: read_only_paths(router.router)})
+    app.add_middleware(DatabaseSessionMiddleware, session=Mock(return_value=session), matcher=matcher)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as client:
+        response = await client.post('/api/promotion/query', json={'text': {'like': 'Sun'}})
+
+    assert response.status_code == 200
+    assert session.exec.call_args.kwargs['execution_options'] == {READ_REPLICA: replica.sync_engine}
+    assert 'Sun%' in session.exec.call_args.kwargs['params'].values()
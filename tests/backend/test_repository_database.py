@@ -0,0 +1,205 @@
+import pytest
+import uuid
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, Mock
+from sqlalchemy import event, select, func
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from backend.repository import database as db
+from backend.repository.database import AsyncRepository
+from backend.repository.models.common import *
+from backend.repository.models.auth import *
+from backend.repository.models.promotion import *
+from backend.repository.models.apartment import *
+from backend.repository.models.project import *
+
+
+@asynccontextmanager
+async def database():
+    """ Open a session of an in-memory database with foreign key cascades. Yields the session and the list
+    of statements executed after the tables are created
+    """
+    engine = create_async_engine('sqlite+aiosqlite://')
+    statements = []
+
+    @event.listens_for(engine.sync_engine, 'connect')
+    def enable_foreign_keys(connection, _):
+        connection.execute('PRAGMA foreign_keys=ON')
+
+    async with engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+
+    @event.listens_for(engine.sync_engine, 'before_cursor_execute')
+    def collect(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    try:
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            yield session, statements
+    finally:
+        await engine.dispose()
+
+
+async def count(session, model_type) -> int:
+    return (await session.exec(select(func.count()).select_from(model_type))).scalar_one()
+
+
+def make_project(title: str = 'Project') -> Project:
+    return Project(title=title, square_max=100, square_min=10, release_date='2030')
+
+
+def make_apartment(project_id=None) -> Apartment:
+    return Apartment(title='Apartment', size=42.0, type='flat', project_id=project_id)
+
+
+@pytest.mark.asyncio
+async def test_delete_project_is_single_statement():
+    """ Test that deleting a project is one DELETE statement and its apartments and their elements are removed
+    by the database cascade without loading them
+    """
+    async with database() as (session, statements):
+        project = make_project()
+        apartments = [make_apartment(project.id) for _ in range(3)]
+        elements = [ApartElement(floor=1, number=i, cost=100, apartment_id=apartments[i].id) for i in range(3)]
+        session.add_all([project, *apartments, *elements])
+        await session.commit()
+        session.expunge_all()
+        statements.clear()
+
+        deleted = await AsyncRepository().delete_by_id(session, Project, project.id)
+
+        assert deleted.id == project.id
+        assert len(statements) == 1
+        assert statements[0].startswith('DELETE FROM project')
+        assert (await count(session, Apartment), await count(session, ApartElement)) == (0, 0)
+
+
+@pytest.mark.asyncio
+async def test_delete_apartment_is_single_statement():
+    """ Test that deleting an apartment is one DELETE statement and its elements and pdf link are removed
+    by the database cascade without loading them
+    """
+    async with database() as (session, statements):
+        apartment = make_apartment()
+        pdf = File(path='plan.pdf', name='plan', ext='pdf', size=1)
+        session.add_all([apartment, pdf, ApartElement(floor=1, number=1, cost=100, apartment_id=apartment.id)])
+        await session.commit()
+        session.add(ApartmentPdfLink(apartment_id=apartment.id, pdf_id=pdf.id))
+        await session.commit()
+        session.expunge_all()
+        statements.clear()
+
+        await AsyncRepository().delete_by_id(session, Apartment, apartment.id)
+
+        assert len(statements) == 1
+        assert statements[0].startswith('DELETE FROM apartment')
+        assert (await count(session, ApartElement), await count(session, ApartmentPdfLink)) == (0, 0)
+        assert await count(session, File) == 1
+
+
+def updated(items: list) -> Mock:
+    """ Result of an UPDATE ... RETURNING statement """
+    return Mock(**{'scalars.return_value.all.return_value': items})
+
+
+def sql(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+@pytest.mark.asyncio
+async def test_insert_keeps_order():
+    """ Test that insert is one statement returning items in the order of the given items with empty relationships """
+    async with database() as (session, statements):
+        projects = [make_project(f'Project {i}') for i in range(5)]
+        for project in projects:
+            project.id = uuid.uuid4()
+
+        created = await AsyncRepository.insert(session, Project, projects)
+
+        assert len(statements) == 1
+        assert [item.id for item in created] == [project.id for project in projects]
+        assert [item.title for item in created] == [project.title for project in projects]
+        assert (created[0].apartments, created[0].master_plan) == ([], None)
+
+
+@pytest.mark.asyncio
+async def test_update_rows_groups_by_keys():
+    """ Test that updates with different key sets are separate statements and items are returned in the updates
+    order with None for missing ids
+    """
+    first, second, third = make_project('First'), make_project('Second'), make_project('Third')
+    session = AsyncMock()
+    session.exec.side_effect = [updated([third, first]), updated([second])]
+    updates = [ProjectUpdate(id=first.id, title='First'), ProjectUpdate(id=second.id, title='Second', slug='second'),
+               ProjectUpdate(id=third.id, title='Third'), ProjectUpdate(id=uuid.uuid4(), title='Missing')]
+
+    items = await AsyncRepository.update_rows(session, Project, updates)
+
+    assert items == [first, second, third, None]
+    statements = [sql(call.args[0]) for call in session.exec.call_args_list]
+    assert 'title=batch.title' in statements[0] and 'slug=' not in statements[0]
+    assert 'title=batch.title' in statements[1] and 'slug=batch.slug' in statements[1]
+
+
+@pytest.mark.asyncio
+async def test_update_rows_in_chunks(monkeypatch):
+    """ Test that a group of updates is applied in chunks of the batch page size """
+    monkeypatch.setattr(db, 'BATCH_PAGE_SIZE', 2)
+    session = AsyncMock()
+    session.exec.return_value = updated([])
+
+    items = await AsyncRepository.update_rows(session, Project, [ProjectUpdate(id=uuid.uuid4(), title='Title')
+                                                                 for _ in range(5)])
+
+    assert items == [None] * 5
+    assert session.exec.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_delete_rows_in_chunks(monkeypatch):
+    """ Test that rows are deleted in chunks of the batch page size and all deleted ids are returned """
+    monkeypatch.setattr(db, 'BATCH_PAGE_SIZE', 2)
+    async with database() as (session, statements):
+        projects = [make_project(f'Project {i}') for i in range(5)]
+        session.add_all(projects)
+        await session.commit()
+        statements.clear()
+
+        deleted = await AsyncRepository.delete_rows(session, Project, [project.id for project in projects])
+
+        assert sorted(deleted) == sorted(project.id for project in projects)
+        assert len(statements) == 3
+        assert await count(session, Project) == 0
+
+
+@pytest.mark.asyncio
+async def test_delete_missing_id():
+    """ Test that deleting a missing id returns None """
+    async with database() as (session, statements):
+        assert await AsyncRepository().delete_by_id(session, Project, uuid.uuid4()) is None
+
+
+@pytest.mark.asyncio
+async def test_total_is_estimate_flag():
+    """ Test that total of a large table without filters is the statistics estimate flagged as estimate
+    and other totals are exact counts
+    """
+    async with database() as (session, statements):
+        session.add_all([make_project(f'Project {i}') for i in range(3)])
+        await session.commit()
+        repo = AsyncRepository()
+
+        repo.estimate_count = AsyncMock(return_value=None)
+        items, total, estimated = await repo.get_items(session, Project, limit=2, order_by=['id'], with_total=True)
+        assert (len(items), total, estimated) == (2, 3, False)
+
+        repo.estimate_count = AsyncMock(return_value=db.COUNT_ESTIMATE_THRESHOLD)
+        items, total, estimated = await repo.get_items(session, Project, limit=2, order_by=['id'], with_total=True)
+        assert (len(items), total, estimated) == (2, db.COUNT_ESTIMATE_THRESHOLD, True)
+
+        items, total, estimated = await repo.get_items(session, Project, filters={'title': 'Project 1'},
+                                                       with_total=True)
+        assert (len(items), total, estimated) == (1, 1, False)
@@ -0,0 +1,134 @@
+import pytest
+import uuid
+from unittest.mock import AsyncMock
+from sqlalchemy.dialects import postgresql
+from sqlmodel import SQLModel, Field, and_
+
+from backend.repository.database import AsyncRepository
+from backend.repository.exceptions import InvalidQuery
+from backend.repository.statements import StatementCache
+from backend.repository.models.project import Project, ProjectPublic
+from backend.repository.models.auth import RefreshToken  # configures User mapper
+
+
+class FilterModel(SQLModel, table=True):
+    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    title: str
+    cost: int | None = None
+
+
+def compile_filters(filters: dict) -> str:
+    conditions = AsyncRepository._to_model_conditions(FilterModel, AsyncRepository._normalize_filters(filters))
+    return str(and_(*conditions).compile(dialect=postgresql.dialect()))
+
+
+def test_collection_filter_is_one_bind_parameter():
+    """ Test that collection filter compile to a single = ANY(:array) condition """
+    statement = compile_filters({'id': [uuid.uuid4() for _ in range(100)]})
+
+    assert statement == 'filtermodel.id = ANY (%(id_in)s::UUID[])'
+
+
+def test_operator_filters():
+    """ Test that dict filter compile every operator and concat them with AND """
+    statement = compile_filters({'cost': {'gte': 100, 'lte': 500}, 'title': {'like': 'Sun'}})
+
+    assert 'filtermodel.cost >= ' in statement
+    assert 'filtermodel.cost <= ' in statement
+    assert 'filtermodel.title LIKE ' in statement
+    assert statement.count(' AND ') == 2
+
+
+def test_null_filters():
+    """ Test that None and is_null compile to IS NULL and IS NOT NULL """
+    assert compile_filters({'cost': None}) == 'filtermodel.cost IS NULL'
+    assert compile_filters({'cost': {'is_null': True}}) == 'filtermodel.cost IS NULL'
+    assert compile_filters({'cost': {'is_null': False}}) == 'filtermodel.cost IS NOT NULL'
+
+
+def test_invalid_filters():
+    """ Test that unknown operators and invalid operands raise exception """
+    invalid_filters = [{'cost': {'foo': 1}}, {'cost': {'in': 1}}, {'title': {'like': 1}}]
+
+    for filters in invalid_filters:
+        with pytest.raises(InvalidQuery):
+            AsyncRepository._normalize_filters(filters)
+
+
+def test_order_clauses():
+    """ Test that '-' prefix sorts in descending order and unknown fields raise exception """
+    clauses = AsyncRepository._to_order_clauses(FilterModel, ['-cost', 'id'])
+
+    assert [str(clause.compile()) for clause in clauses] == ['filtermodel.cost DESC', 'filtermodel.id']
+    with pytest.raises(InvalidQuery):
+        AsyncRepository._to_order_clauses(FilterModel, ['unknown'])
+
+
+@pytest.mark.asyncio
+async def test_statement_template_reused():
+    """ Test that queries of the same shape reuse one template and differ in bind parameters only """
+    repo = AsyncRepository()
+    session = AsyncMock()
+    session.exec.return_value = []
+
+    await repo.get_items(session, FilterModel, filters={'id': [uuid.uuid4()], 'cost': {'gte': 1}}, limit=10)
+    await repo.get_items(session, FilterModel, filters={'id': [uuid.uuid4(), uuid.uuid4()], 'cost': {'gte': 5}},
+                         limit=20)
+
+    first, second = session.exec.await_args_list
+    assert len(repo.statements) == 1
+    assert first.args[0] is second.args[0]
+    assert second.kwargs['params']['cost_gte'] == 5
+    assert second.kwargs['params']['limit'] == 20
+    assert len(second.kwargs['params']['id_in']) == 2
+
+
+def test_statement_cache_size():
+    """ Test that the least recently used template is dropped on overflow """
+    cache = StatementCache(2)
+
+    cache.get('a', lambda: 'a')
+    cache.get('b', lambda: 'b')
+    cache.get('a', lambda: 'unused')
+    cache.get('c', lambda: 'c')
+
+    assert len(cache) == 2
+    assert cache.get('a', lambda: 'new a') == 'a'
+    assert cache.get('b', lambda: 'new b') == 'new b'
+
+
+def test_expand_tree():
+    """ Test that dotted relationship paths are merged in one tree and unknown relationships raise exception """
+    tree = AsyncRepository._to_expand_tree(Project, ['apartments.items', 'images', 'apartments.pdf'])
+
+    assert tree == {'apartments': {'items': {}, 'pdf': {}}, 'images': {}}
+    with pytest.raises(InvalidQuery):
+        AsyncRepository._to_expand_tree(Project, ['apartments.unknown'])
+
+
+def test_loader_options():
+    """ Test that expanded relationships are selectin loaded and other eager relationships raise on load """
+    options = AsyncRepository._to_loader_options(Project, {'images': {}})
+    strategies = {load.path[1].key: dict(load.strategy)['lazy'] for option in options for load in option.context}
+
+    assert strategies == {'images': 'selectin', 'master_plan': 'raise', 'short_description': 'raise',
+                          'details': 'raise', 'apartments': 'raise'}
+
+
+def test_full_expand_tree():
+    """ Test that '*' expands all relationships on all levels """
+    tree = AsyncRepository._to_expand_tree(Project, ['*'])
+
+    assert tree['apartments'] == {'images': {'image': {}, 'category_icon': {}}, 'items': {}, 'pdf': {}}
+    assert tree['short_description'] == {'image': {}}
+
+
+def test_json_document():
+    """ Test that a json document contains public fields only and correlates related items through link tables """
+    document = AsyncRepository._to_json_object(Project, ProjectPublic, Project.__table__, {'images': {}})
+    statement = str(document.compile(dialect=postgresql.dialect()))
+
+    assert "'slug'" not in statement
+    assert "'apartments', '[]'::json" in statement
+    assert "'master_plan', NULL" in statement
+    assert 'WHERE projectimagelink_1.project_id = project.id' in statement
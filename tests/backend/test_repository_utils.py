@@ -1,6 +1,13 @@
 import pytest
+from sqlalchemy import MetaData, Table, Column, Integer, ForeignKey
+from sqlmodel import SQLModel
 
-from backend.repository.utils import InvalidSlug, raise_for_invalid_slug
+from backend.repository.utils import InvalidSlug, raise_for_invalid_slug, unindexed_foreign_keys
+from backend.repository.models.common import *
+from backend.repository.models.auth import *
+from backend.repository.models.promotion import *
+from backend.repository.models.apartment import *
+from backend.repository.models.project import *
 
 
 def test_check_invalid_slug():
@@ -24,3 +31,21 @@ def test_check_valid_slug():
 
     for slug in valid_slugs:
         raise_for_invalid_slug(slug)
+
+
+def test_model_foreign_keys_are_indexed():
+    """ Test that every foreign key column of models has an index """
+    assert unindexed_foreign_keys(SQLModel.metadata) == []
+
+
+def test_unindexed_foreign_keys():
+    """ Test that foreign keys without leading index column are found """
+    metadata = MetaData()
+    Table('parent', metadata, Column('id', Integer, primary_key=True))
+    Table('child', metadata, Column('id', Integer, primary_key=True),
+          Column('parent_id', ForeignKey('parent.id')),
+          Column('indexed_parent_id', ForeignKey('parent.id'), index=True))
+    Table('link', metadata, Column('parent_id', ForeignKey('parent.id'), primary_key=True),
+          Column('child_id', ForeignKey('child.id'), primary_key=True))
+
+    assert unindexed_foreign_keys(metadata) == ['child.parent_id', 'link.child_id']
@@ -0,0 +1,41 @@
+import json
+import pytest
+import uuid
+
+from backend.api.streaming import StreamFormat, stream_response
+
+
+async def pages_of(*pages):
+    for page in pages:
+        yield page
+
+
+async def read_body(response) -> bytes:
+    return b''.join([chunk async for chunk in response.body_iterator])
+
+
+@pytest.mark.asyncio
+async def test_stream_json_array():
+    """ Test that pages are joined into one JSON array, empty pages are skipped """
+    uid = uuid.uuid4()
+    response = stream_response(pages_of([{'id': uid}], [], [{'id': 2}, {'id': 3}]), StreamFormat.json)
+
+    assert response.media_type == 'application/json'
+    assert json.loads(await read_body(response)) == [{'id': str(uid)}, {'id': 2}, {'id': 3}]
+
+
+@pytest.mark.asyncio
+async def test_stream_empty_json_array():
+    """ Test that stream without items is an empty JSON array """
+    response = stream_response(pages_of(), StreamFormat.json)
+
+    assert json.loads(await read_body(response)) == []
+
+
+@pytest.mark.asyncio
+async def test_stream_ndjson():
+    """ Test that every item is a JSON line """
+    response = stream_response(pages_of([{'id': 1}], [{'id': 2}]), StreamFormat.ndjson)
+
+    assert response.media_type == 'application/x-ndjson'
+    assert await read_body(response) == b'{"id":1}\n{"id":2}\n'
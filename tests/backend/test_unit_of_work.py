@@ -0,0 +1,87 @@
+import pytest
+from unittest.mock import AsyncMock
+
+from backend.repository.database import AsyncRepository
+from backend.repository.unitofwork import begin_unit_of_work, end_unit_of_work, in_unit_of_work, transaction
+
+
+@pytest.fixture
+def session() -> AsyncMock:
+    """ Fixture for mocking async session """
+    session = AsyncMock()
+    session.info = {}
+    return session
+
+
+@pytest.mark.asyncio
+async def test_repository_commit_without_unit_of_work(session: AsyncMock):
+    """ Test then AsyncRepository commits session if unit of work is not opened
+    :param session: fixture of an async session
+    """
+    await AsyncRepository.commit(session)
+
+    session.commit.assert_awaited_once()
+    session.flush.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_repository_commit_in_unit_of_work(session: AsyncMock):
+    """ Test then AsyncRepository only flushes session in unit of work and the owner commits it once
+    :param session: fixture of an async session
+    """
+    begin_unit_of_work(session)
+    await AsyncRepository.commit(session)
+    await AsyncRepository.commit(session)
+
+    assert session.flush.await_count == 2
+    session.commit.assert_not_awaited()
+
+    await end_unit_of_work(session, commit=True)
+
+    session.commit.assert_awaited_once()
+    assert not in_unit_of_work(session)
+
+
+@pytest.mark.asyncio
+async def test_end_unit_of_work_rollback(session: AsyncMock):
+    """ Test then failed unit of work is rolled back without commit
+    :param session: fixture of an async session
+    """
+    begin_unit_of_work(session)
+    await end_unit_of_work(session, commit=False)
+
+    session.rollback.assert_awaited_once()
+    session.commit.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_transaction(session: AsyncMock):
+    """ Test then transaction block commits once and nested repository commits only flush
+    :param session: fixture of an async session
+    """
+    async with transaction(session):
+        await AsyncRepository.commit(session)
+
+    session.flush.assert_awaited_once()
+    session.commit.assert_awaited_once()
+
+    with pytest.raises(ValueError):
+        async with transaction(session):
+            raise ValueError()
+
+    session.rollback.assert_awaited_once()
+    assert session.commit.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_transaction_joins_unit_of_work(session: AsyncMock):
+    """ Test then transaction block joins the opened unit of work and leaves commit to its owner
+    :param session: fixture of an async session
+    """
+    begin_unit_of_work(session)
+    async with transaction(session):
+        pass
+
+    session.flush.assert_awaited_once()
+    session.commit.assert_not_awaited()
+    assert in_unit_of_work(session)